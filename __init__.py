@@ -24,18 +24,39 @@ Use with Evee to live-preview your lighting.
 import bpy
 
 from bpy.app.handlers import persistent
-from bpy.types import WindowManager, Light, TOPBAR_MT_window
-from bpy.props import BoolProperty, IntProperty, StringProperty, EnumProperty
+from bpy.types import WindowManager, Light, Mesh, Image, Scene, TOPBAR_MT_window
+from bpy.props import BoolProperty, IntProperty, StringProperty, EnumProperty, PointerProperty
 
 from .src.artnet_socket import ArtNetSocket
-from .src.universe_store import UniverseStore, ALL_UNIVERSES
+from .src.universe_store import UniverseStore, ALL_UNIVERSES, ALL_CHANNELS
 from .src.fixture_store import FixtureStore
 from .src.fixture_type_store import FixtureTypeStore
+from .src.fixture_instances import add_instance_attributes
+from .src.pixel_map import PIXEL_TARGETS, PIXEL_ORDERS, START_CORNERS
 from .src.blender_sync import BlenderSynchroniser
 
 from .src.ui.light_panel import LightArtNetPanel
+from .src.ui.mesh_panel import MeshArtNetPanel
+from .src.ui.fixture_type_search import SelectFixtureTypeOperator
+from .src.ui.capture_operators import CAPTURE_OPERATORS, draw_capture_menu
+from .src.ui.scene_panel import SceneArtNetPanel, apply_capture_timeline
+from .src.ui.metrics_panel import METRICS_CLASSES, sample_metrics
+from .src.ui.preferences import (
+    ArtNetPreferences,
+    apply_synchroniser_preferences,
+    apply_universe_filter,
+    get_preferences,
+    load_fixture_library,
+    restart_receiver,
+)
 from .src.globals import GLOBAL_DATA
 
+MESH_MODES = [
+    ('PIXELS', 'Pixels', 'Show a grid of DMX pixels on an image or color attribute'),
+    ('INSTANCES', 'Fixtures', 'Each vertex is a fixture, its values are written to point '
+                              'attributes for geometry nodes to instance fixtures with'),
+]
+
 PAN_TILT_TARGETS = [
     ('lx', 'Light x', 'tilt around light x axis', 0),
     ('ly', 'Light y', 'tilt around light y axis', 1),
@@ -69,33 +90,51 @@ bl_info = {
 
 def _setup():
     # can't get at scene in initialization so run from a timer
-    fixture_store = FixtureStore()
-    GLOBAL_DATA["FixtureStore"] = fixture_store
-    fixture_types = FixtureTypeStore()
+    preferences = get_preferences()
+    # library types are compiled on first use, from the cache if unchanged
+    fixture_types = FixtureTypeStore(load_fixture_library(preferences))
     GLOBAL_DATA["UniverseStore"] = UniverseStore()
     universes = GLOBAL_DATA["UniverseStore"]
-    GLOBAL_DATA["ArtNetSocket"] = ArtNetSocket(universes)
+    fixture_store = FixtureStore(fixture_types, universes)
+    GLOBAL_DATA["FixtureStore"] = fixture_store
+    if preferences is not None:
+        apply_universe_filter(preferences)
+    if preferences is None:
+        GLOBAL_DATA["ArtNetSocket"] = ArtNetSocket(universes)
+    else:
+        restart_receiver(preferences)
     GLOBAL_DATA["BlenderSynchroniser"] = BlenderSynchroniser(
         universes,
         fixture_store,
         fixture_types
     )
+    if preferences is not None:
+        apply_synchroniser_preferences(preferences)
     fixture_store.load_objects_from_scene()
-    universes.notify_universe_change(ALL_UNIVERSES, [])
+    universes.notify_universe_change(ALL_UNIVERSES, ALL_CHANNELS)
+    apply_capture_timeline(bpy.context.scene)
+    # otherwise only added once a file is loaded
+    GLOBAL_DATA["BlenderSynchroniser"].register()
 
     TOPBAR_MT_window.append(draw_artnet_enabled)
     return None
 
 @persistent
 def _on_file_loaded(_, __):
+    if bpy.app.background and GLOBAL_DATA.get("BlenderSynchroniser", None) is None:
+        # command line renders start before timers run, so set up now
+        if bpy.app.timers.is_registered(_setup):
+            bpy.app.timers.unregister(_setup)
+        _setup()
     if "FixtureStore" in GLOBAL_DATA:
         GLOBAL_DATA["FixtureStore"].load_objects_from_scene()
     if "UniverseStore" in GLOBAL_DATA:
         universes = GLOBAL_DATA["UniverseStore"]
-        universes.notify_universe_change(ALL_UNIVERSES, [])
+        universes.notify_universe_change(ALL_UNIVERSES, ALL_CHANNELS)
     if "BlenderSynchroniser" in GLOBAL_DATA:
         synchroniser = GLOBAL_DATA["BlenderSynchroniser"]
         synchroniser.register()
+        apply_capture_timeline(bpy.context.scene)
 
 def register():
     """Called from Blender"""
@@ -106,8 +145,19 @@ def register():
     bpy.app.handlers.load_post.append(_on_file_loaded)
     # add light properties
     register_light_properties()
+    register_mesh_properties()
+    register_scene_properties()
     # register Light UI Panel
     bpy.utils.register_class(LightArtNetPanel)
+    bpy.utils.register_class(MeshArtNetPanel)
+    bpy.utils.register_class(SelectFixtureTypeOperator)
+    bpy.utils.register_class(SceneArtNetPanel)
+    bpy.utils.register_class(ArtNetPreferences)
+    for operator in CAPTURE_OPERATORS:
+        bpy.utils.register_class(operator)
+    for cls in METRICS_CLASSES:
+        bpy.utils.register_class(cls)
+    bpy.app.timers.register(sample_metrics, persistent=True)
 
     WindowManager.addon_blender_artnet_enabled: BoolProperty = BoolProperty(
         name="Listen to ArtNet",
@@ -120,6 +170,7 @@ def draw_artnet_enabled(menu, context):
     layout = menu.layout
     layout.separator()
     layout.prop(context.window_manager, "addon_blender_artnet_enabled", expand=True)
+    draw_capture_menu(layout)
 
 def get_artnet_enabled(window_manager):
     return GLOBAL_DATA.get('BlenderSynchroniser').artnet_enabled
@@ -171,6 +222,118 @@ def register_light_properties():
         default="none"
     )
 
+def register_mesh_properties():
+    Mesh.artnet_enabled: BoolProperty = BoolProperty(
+        name="Enabled",
+        description="Show DMX pixels or fixtures on this mesh",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_mesh_mode: EnumProperty = EnumProperty(
+        name="Mode",
+        items=MESH_MODES,
+        default="PIXELS",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_universe: IntProperty = IntProperty(
+        name="Universe",
+        description="Universe of the first pixel or fixture, the rest carry on "
+                    "into the next universes",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_base_address: IntProperty = IntProperty(
+        name="Base DMX Address",
+        description="Channel of the first pixel or fixture",
+        default=1,
+        min=1,
+        max=512,
+        update=_mesh_data_change
+    )
+    Mesh.artnet_fixture_type: StringProperty = StringProperty(
+        name="Fixture Type",
+        description="Fixture type of every vertex",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_fixture_spacing: IntProperty = IntProperty(
+        name="Address Spacing",
+        description="Channels from one fixture's address to the next, "
+                    "0 to patch them back to back",
+        min=0,
+        max=512,
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_width: IntProperty = IntProperty(
+        name="Width",
+        description="Pixels in each row",
+        default=1,
+        min=1,
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_height: IntProperty = IntProperty(
+        name="Height",
+        description="Rows of pixels",
+        default=1,
+        min=1,
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_order: EnumProperty = EnumProperty(
+        name="Color Order",
+        items=PIXEL_ORDERS,
+        default="RGB",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_start: EnumProperty = EnumProperty(
+        name="Start Corner",
+        items=START_CORNERS,
+        default="TOP_LEFT",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_serpentine: BoolProperty = BoolProperty(
+        name="Serpentine",
+        description="Every other row runs back the other way, as LED tape zig-zagging up a wall",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_target: EnumProperty = EnumProperty(
+        name="Target",
+        items=PIXEL_TARGETS,
+        default="IMAGE",
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_image: PointerProperty = PointerProperty(
+        name="Image",
+        description="Image the pixels are written to, one image pixel per DMX pixel. "
+                    "It isn't resized, pixels are only written while its size matches the grid",
+        type=Image,
+        update=_mesh_data_change
+    )
+    Mesh.artnet_pixel_attribute: StringProperty = StringProperty(
+        name="Color Attribute",
+        description="Color attribute the pixels are written to",
+        default="Col",
+        update=_mesh_data_change
+    )
+
+def register_scene_properties():
+    Scene.artnet_capture_path: StringProperty = StringProperty(
+        name="Capture File",
+        description="ArtNet capture that sets the lights on every frame, "
+                    "instead of listening to the network",
+        subtype='FILE_PATH',
+        update=_capture_setting_change
+    )
+    Scene.artnet_capture_timecode: BoolProperty = BoolProperty(
+        name="Use ArtTimeCode",
+        description="Place the capture on the timeline by the timecode the desk sent, "
+                    "otherwise by when it was captured",
+        default=False,
+        update=_capture_setting_change
+    )
+    Scene.artnet_capture_start_frame: IntProperty = IntProperty(
+        name="Start Frame",
+        description="Frame where the capture, or timecode 00:00:00:00, starts",
+        default=1,
+        update=_capture_setting_change
+    )
+
 def get_pan_target(self):
     return self.get("artnet_pan_target", 2)
 
@@ -218,6 +381,16 @@ def unregister():
         del old
     # unregister ui panel
     bpy.utils.unregister_class(LightArtNetPanel)
+    bpy.utils.unregister_class(MeshArtNetPanel)
+    bpy.utils.unregister_class(SelectFixtureTypeOperator)
+    bpy.utils.unregister_class(SceneArtNetPanel)
+    bpy.utils.unregister_class(ArtNetPreferences)
+    for operator in CAPTURE_OPERATORS:
+        bpy.utils.unregister_class(operator)
+    for cls in METRICS_CLASSES:
+        bpy.utils.unregister_class(cls)
+    if bpy.app.timers.is_registered(sample_metrics):
+        bpy.app.timers.unregister(sample_metrics)
     TOPBAR_MT_window.remove(draw_artnet_enabled)
     del WindowManager.addon_blender_artnet_enabled
 
@@ -231,6 +404,27 @@ def unregister():
     del Light.artnet_old_pan_target
     del Light.artnet_old_tilt_target
 
+    # remove mesh properties
+    del Mesh.artnet_enabled
+    del Mesh.artnet_mesh_mode
+    del Mesh.artnet_universe
+    del Mesh.artnet_base_address
+    del Mesh.artnet_fixture_type
+    del Mesh.artnet_fixture_spacing
+    del Mesh.artnet_pixel_width
+    del Mesh.artnet_pixel_height
+    del Mesh.artnet_pixel_order
+    del Mesh.artnet_pixel_start
+    del Mesh.artnet_pixel_serpentine
+    del Mesh.artnet_pixel_target
+    del Mesh.artnet_pixel_image
+    del Mesh.artnet_pixel_attribute
+
+    # remove scene properties
+    del Scene.artnet_capture_path
+    del Scene.artnet_capture_timecode
+    del Scene.artnet_capture_start_frame
+
 def _light_data_change(data, context):
     """One of the lights changed in the scene - update our internal data"""
     fixtures = GLOBAL_DATA["FixtureStore"]
@@ -239,6 +433,26 @@ def _light_data_change(data, context):
     # apply the DMX data to get it up to date
     universes = GLOBAL_DATA["UniverseStore"]
     if old_universe is not None:
-        universes.notify_universe_change(old_universe, range(0, 511))
+        universes.notify_universe_change(old_universe, ALL_CHANNELS)
     if data.artnet_enabled:
-        universes.notify_universe_change(data.artnet_universe, range(0, 511))
+        universes.notify_universe_change(data.artnet_universe, ALL_CHANNELS)
+
+def _mesh_data_change(data, context):
+    """One of the ArtNet meshes changed in the scene - compile it again"""
+    if data.artnet_enabled and data.artnet_mesh_mode == 'INSTANCES':
+        # made here, the compiled mesh only looks them up
+        add_instance_attributes(data)
+    fixtures = GLOBAL_DATA["FixtureStore"]
+    old_mesh = fixtures.get_mesh(context.object)
+    fixtures.update_object(context.object)
+    new_mesh = fixtures.get_mesh(context.object)
+    # apply the DMX data to get it up to date
+    universes = GLOBAL_DATA["UniverseStore"]
+    for mesh in (old_mesh, new_mesh):
+        if mesh is not None:
+            for index in mesh.universes:
+                universes.notify_universe_change(index, ALL_CHANNELS)
+
+def _capture_setting_change(scene, context):
+    """The scene's capture settings changed - load the capture again"""
+    apply_capture_timeline(scene)
@@ -0,0 +1,110 @@
+"""Micro-benchmark: vectorised parse_packet against the old per-channel loop
+
+Run from the repository root with a Python that has numpy installed:
+
+    python benchmarks/bench_parse_packet.py
+"""
+
+import os
+import random
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artnet_socket import ArtNetSocket  # noqa: E402
+from src.universe_store import UniverseStore  # noqa: E402
+
+PACKET_COUNT = 64
+ROUNDS = 200
+
+
+def make_packet(universe, data):
+    """Build an ArtDmx packet for a 0-based universe"""
+    header = bytearray(b"Art-Net\x00\x00\x50\x00\x0e\x00\x00")
+    header += bytes([universe & 0xff, universe >> 8, len(data) >> 8, len(data) & 0xff])
+    return bytes(header + data)
+
+
+def make_packets(changed_per_packet):
+    """Build a stream of packets that each change a number of channels"""
+    rng = random.Random(42)
+    data = bytearray(512)
+    packets = []
+    for _ in range(PACKET_COUNT):
+        for channel in rng.sample(range(512), changed_per_packet):
+            data[channel] = (data[channel] + 1 + rng.randrange(254)) % 256
+        packets.append(make_packet(0, data))
+    return packets
+
+
+def legacy_parse_packet(universe_store, packet):
+    """The per-channel loop parse_packet used before it was vectorised"""
+    channels = packet[16]*256 + packet[17]
+    if channels <= 512:
+        universe_index = packet[15]*256 + packet[14] + 1
+        universe = universe_store.get_universe(universe_index)
+        raw_universe = universe_store.get_raw_universe(universe_index)
+        universe_changes = []
+        for i in range(channels):
+            raw_value = packet[i+18]
+            if raw_universe[i] != raw_value:
+                raw_universe[i] = raw_value
+                universe[i] = raw_value / 255.0
+                universe_changes.append(i)
+        if len(universe_changes) > 0:
+            universe_store.notify_universe_change(universe_index, universe_changes)
+
+
+class _ListUniverseStore:
+    """Universe store holding locked lists, as the legacy loop expects"""
+
+    def __init__(self):
+        self._lists = {}
+        self.UpdatesPending = {}
+        self.UpdatesLock = threading.Lock()
+
+    def get_universe(self, index):
+        return self._lists.setdefault(index, ([0.0] * 512, [0] * 512))[0]
+
+    def get_raw_universe(self, index):
+        return self._lists.setdefault(index, ([0.0] * 512, [0] * 512))[1]
+
+    def notify_universe_change(self, index, changes):
+        with self.UpdatesLock:
+            self.UpdatesPending[index] = changes
+
+
+def run(changed_per_packet):
+    """Time both implementations over the same packet stream"""
+    packets = make_packets(changed_per_packet)
+
+    legacy_store = _ListUniverseStore()
+
+    def legacy():
+        for packet in packets:
+            legacy_parse_packet(legacy_store, packet)
+
+    # skip __init__ so that no UDP socket or thread is created
+    artnet = ArtNetSocket.__new__(ArtNetSocket)
+    artnet.universe_store = UniverseStore()
+
+    def vectorised():
+        for packet in packets:
+            artnet.parse_packet(packet)
+
+    legacy_time = timeit.timeit(legacy, number=ROUNDS)
+    vectorised_time = timeit.timeit(vectorised, number=ROUNDS)
+    packet_total = PACKET_COUNT * ROUNDS
+    print("{:>4} changed/packet  legacy {:7.2f} us/packet  "
+          "vectorised {:7.2f} us/packet  speedup {:5.1f}x".format(
+              changed_per_packet,
+              legacy_time / packet_total * 1e6,
+              vectorised_time / packet_total * 1e6,
+              legacy_time / vectorised_time))
+
+
+if __name__ == "__main__":
+    for changed in (1, 16, 128, 512):
+        run(changed)
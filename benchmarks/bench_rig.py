@@ -0,0 +1,352 @@
+"""Benchmark: the whole pipeline on synthetic rigs, outside Blender
+
+Builds rigs of N fixtures of each built-in fixture type spread over M
+universes, plays a seeded random show at them and measures
+
+* packets/s through the receiver's parse and diff
+* latency of each synchroniser tick, as percentiles
+* memory allocated while ticking, with tracemalloc
+
+Run from the repository root with a Python that has numpy installed:
+
+    python benchmarks/bench_rig.py --fixtures 10 100 --universes 4
+    python benchmarks/bench_rig.py --fixtures 300 --universes 32 --instanced
+    python benchmarks/bench_rig.py --json results.json
+
+The JSON output is stable so runs can be compared over time.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_bpy  # noqa: E402
+
+bpy = fake_bpy.install()
+
+from bench_parse_packet import make_packet  # noqa: E402
+from src.artnet_receiver import ArtNetReceiver  # noqa: E402
+from src.blender_sync import BlenderSynchroniser  # noqa: E402
+from src.fixture_instances import add_instance_attributes  # noqa: E402
+from src.fixture_store import FixtureStore  # noqa: E402
+from src.fixture_type_store import FixtureTypeStore  # noqa: E402
+from src.pixel_map import packed_addresses  # noqa: E402
+from src.universe_store import UniverseStore, CHANNELS_PER_UNIVERSE  # noqa: E402
+
+# light type each built-in fixture type is modelled with
+FIXTURE_TYPES = {
+    "wash": "AREA",
+    "spot": "SPOT",
+    "pointe": "SPOT",
+}
+ADDRESS = ("127.0.0.1", 6454)
+PERCENTILES = (50, 90, 99)
+
+
+class Rig:
+    """Fake lights patched across universes, and the channels each one uses"""
+
+    def __init__(self, fixture_types, fixtures_per_type, universe_count, instanced=False):
+        self.universe_count = universe_count
+        self.objects = []
+        self.footprints = [] # (universe row, absolute channels) per fixture
+        if instanced:
+            self._add_instancers(fixture_types, fixtures_per_type)
+            return
+        next_address = [1] * universe_count
+        number = 0
+        for fixture_type, light_type in FIXTURE_TYPES.items():
+            footprint = fixture_types.get_footprint(fixture_type)
+            size = footprint[-1] + 1
+            for _ in range(fixtures_per_type):
+                # deal fixtures out to the universes in turn
+                row = number % universe_count
+                address = next_address[row]
+                if address + size - 1 > CHANNELS_PER_UNIVERSE:
+                    raise ValueError("{} fixtures of each type don't fit in {} universes".format(
+                        fixtures_per_type, universe_count))
+                next_address[row] += size
+                name = "{}.{:04d}".format(fixture_type, number)
+                data = fake_bpy.FakeLight(name, light_type, row + 1, address, fixture_type)
+                self.objects.append(fake_bpy.FakeObject(name, data))
+                self.footprints.append((row, [address - 1 + offset for offset in footprint]))
+                number += 1
+
+    def _add_instancers(self, fixture_types, fixtures_per_type):
+        """One mesh per fixture type, its fixtures patched back to back from a new universe"""
+        row = 0
+        for fixture_type in FIXTURE_TYPES:
+            footprint = fixture_types.get_footprint(fixture_type)
+            rows, addresses = packed_addresses(fixtures_per_type, row + 1, 1, footprint[-1] + 1)
+            if rows[-1] > self.universe_count:
+                raise ValueError("{} fixtures of each type don't fit in {} universes".format(
+                    fixtures_per_type, self.universe_count))
+            data = fake_bpy.FakeMesh(fixture_type, fixtures_per_type, row + 1, 1, fixture_type)
+            # as switching the mesh to instances in the panel does
+            add_instance_attributes(data)
+            self.objects.append(fake_bpy.FakeObject(fixture_type, data))
+            for universe, address in zip(rows.tolist(), addresses.tolist()):
+                self.footprints.append((universe - 1, [address + offset for offset in footprint]))
+            row = int(rows[-1])
+
+    @property
+    def fixture_count(self):
+        return len(self.footprints)
+
+    def make_show(self, frame_count, moving, seed, extra_universes=0):
+        """Returns desk frames, each a list of (packet, address) for every universe
+
+        moving is the fraction of fixtures that change in each frame
+        extra_universes are sent as well, changing every frame, with no lights on them
+        """
+        rng = numpy.random.default_rng(seed)
+        universe_count = self.universe_count + extra_universes
+        state = numpy.zeros((universe_count, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+        changing = max(1, int(round(self.fixture_count * moving)))
+        frames = []
+        for _ in range(frame_count):
+            for fixture in rng.choice(self.fixture_count, changing, replace=False):
+                row, channels = self.footprints[fixture]
+                state[row, channels] = rng.integers(0, 256, len(channels), dtype=numpy.uint8)
+            state[self.universe_count:] = rng.integers(
+                0, 256, (extra_universes, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+            # desks resend every universe every frame, changed or not
+            frames.append([(make_packet(row, state[row].tobytes()), ADDRESS)
+                           for row in range(universe_count)])
+        return frames
+
+
+def _setup_scene(rig):
+    scene = bpy.context.scene
+    scene.objects[:] = rig.objects
+    scene.tool_settings.use_keyframe_insert_auto = False
+
+
+def _percentiles(samples):
+    samples = numpy.asarray(samples) * 1000
+    result = {"p{}".format(p): float(numpy.percentile(samples, p)) for p in PERCENTILES}
+    result["mean"] = float(samples.mean())
+    result["max"] = float(samples.max())
+    return result
+
+
+def bench_parse(show, subscribed=None):
+    """Packets per second through receive_packets"""
+    universes = UniverseStore()
+    if subscribed is not None:
+        universes.subscribe(subscribed)
+    receiver = ArtNetReceiver(universes)
+    packet_count = sum(len(batch) for batch in show)
+    start = time.perf_counter()
+    for batch in show:
+        receiver.receive_packets(batch)
+    elapsed = time.perf_counter() - start
+    return {
+        "packets": packet_count,
+        "seconds": elapsed,
+        "packets_per_second": packet_count / elapsed,
+    }
+
+
+def _make_pipeline(rig, fixture_types):
+    _setup_scene(rig)
+    universes = UniverseStore()
+    fixtures = FixtureStore(fixture_types, universes)
+    synchroniser = BlenderSynchroniser(universes, fixtures, fixture_types)
+    return ArtNetReceiver(universes), synchroniser
+
+
+def bench_ticks(rig, fixture_types, show, warmup, keyframes=None):
+    """Latency of each synchroniser tick after one desk frame
+
+    keyframes is None to leave Auto Keyframing off, otherwise whether
+    keyframes are recorded in bulk
+    """
+    receiver, synchroniser = _make_pipeline(rig, fixture_types)
+    if keyframes is not None:
+        synchroniser.add_keyframes = True
+        synchroniser.bulk_keyframes = keyframes
+    fake_bpy.FakeID.keyframe_inserts = 0
+    latencies = []
+    for frame_number, batch in enumerate(show):
+        receiver.receive_packets(batch)
+        synchroniser.frame_current = frame_number
+        start = time.perf_counter()
+        synchroniser._update_blender()
+        elapsed = time.perf_counter() - start
+        if frame_number >= warmup:
+            latencies.append(elapsed)
+    result = {
+        "ticks": len(latencies),
+        "latency_ms": _percentiles(latencies),
+        "suppressed_writes": synchroniser.suppressed_writes,
+    }
+    if keyframes is not None:
+        start = time.perf_counter()
+        synchroniser.flush_keyframes()
+        result["flush_ms"] = (time.perf_counter() - start) * 1000
+        result["keyframe_inserts"] = fake_bpy.FakeID.keyframe_inserts
+    synchroniser.shutdown()
+    return result
+
+
+def bench_allocations(rig, fixture_types, show, warmup):
+    """Memory allocated by ticks, measured apart from the timings"""
+    receiver, synchroniser = _make_pipeline(rig, fixture_types)
+    for batch in show[:warmup]:
+        receiver.receive_packets(batch)
+        synchroniser._update_blender()
+    has_reset_peak = hasattr(tracemalloc, "reset_peak")
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    peaks = []
+    for batch in show[warmup:]:
+        before = tracemalloc.get_traced_memory()[0]
+        if has_reset_peak:
+            tracemalloc.reset_peak()
+        receiver.receive_packets(batch)
+        synchroniser._update_blender()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    synchroniser.shutdown()
+    result = {
+        "retained_bytes": current - baseline,
+        "peak_bytes": peak - baseline,
+    }
+    if has_reset_peak and peaks:
+        result["peak_bytes_per_tick"] = {
+            "mean": float(numpy.mean(peaks)),
+            "max": int(max(peaks)),
+        }
+    return result
+
+
+def run(fixture_types, fixtures_per_type, universe_count, args):
+    rig = Rig(fixture_types, fixtures_per_type, universe_count, args.instanced)
+    show = rig.make_show(args.frames + args.warmup, args.moving, args.seed,
+                         args.extra_universes)
+    patched = range(1, universe_count + 1)
+    result = {
+        "fixtures_per_type": fixtures_per_type,
+        "fixtures": rig.fixture_count,
+        "universes": universe_count,
+        "extra_universes": args.extra_universes,
+        "instanced": args.instanced,
+        "parse": bench_parse(show, patched),
+        "tick": bench_ticks(rig, fixture_types, show, args.warmup),
+        "allocations": bench_allocations(rig, fixture_types, show, args.warmup),
+    }
+    if args.extra_universes:
+        result["parse_all_universes"] = bench_parse(show)
+    if args.keyframes:
+        result["tick_keyframes_bulk"] = bench_ticks(rig, fixture_types, show, args.warmup, True)
+        result["tick_keyframes_insert"] = bench_ticks(rig, fixture_types, show, args.warmup, False)
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_result(result):
+    tick = result["tick"]["latency_ms"]
+    print("{:>5} fixtures {:>3} universes  {:>9.0f} packets/s  "
+          "tick p50 {:6.3f} p90 {:6.3f} p99 {:6.3f} max {:6.3f} ms  "
+          "retained {:>8} B".format(
+              result["fixtures"], result["universes"],
+              result["parse"]["packets_per_second"],
+              tick["p50"], tick["p90"], tick["p99"], tick["max"],
+              result["allocations"]["retained_bytes"]))
+    if "parse_all_universes" in result:
+        print("      {} extra universes, {:.0f} packets/s when all are parsed".format(
+            result["extra_universes"], result["parse_all_universes"]["packets_per_second"]))
+    for name in ("tick_keyframes_bulk", "tick_keyframes_insert"):
+        if name in result:
+            keyed = result[name]
+            print("      {:<22} p50 {:6.3f} p99 {:6.3f} ms  flush {:8.3f} ms".format(
+                name, keyed["latency_ms"]["p50"], keyed["latency_ms"]["p99"],
+                keyed["flush_ms"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=int, nargs="+", default=[10, 50, 150],
+                        help="fixtures of each type, one run per value")
+    parser.add_argument("--universes", type=int, nargs="+", default=[4],
+                        help="universes to spread the rig over, one run per value")
+    parser.add_argument("--frames", type=int, default=300, help="desk frames to time")
+    parser.add_argument("--warmup", type=int, default=10, help="desk frames to play first")
+    parser.add_argument("--extra-universes", type=int, default=0,
+                        help="universes sent with no lights on them")
+    parser.add_argument("--moving", type=float, default=0.25,
+                        help="fraction of fixtures changing each desk frame")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keyframes", action="store_true",
+                        help="also time ticks with Auto Keyframing on, "
+                             "keyframe_insert costs nothing in the fake bpy")
+    parser.add_argument("--instanced", action="store_true",
+                        help="show each fixture type as one mesh of instances "
+                             "instead of a light per fixture")
+    parser.add_argument("--json", metavar="PATH",
+                        help="write results as JSON, - for stdout")
+    args = parser.parse_args(argv)
+
+    # one store for every run, it compiles its tables when created
+    fixture_types = FixtureTypeStore()
+    results = []
+    for universe_count in args.universes:
+        for fixtures_per_type in args.fixtures:
+            try:
+                # keep anything the add-on prints out of the JSON
+                with contextlib.redirect_stdout(sys.stderr):
+                    result = run(fixture_types, fixtures_per_type, universe_count, args)
+            except ValueError as err:
+                print("skipped:", err, file=sys.stderr)
+                continue
+            results.append(result)
+            if args.json != "-":
+                _print_result(result)
+
+    if args.json:
+        report = {
+            "benchmark": "rig",
+            "version": 1,
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "config": {
+                "frames": args.frames,
+                "warmup": args.warmup,
+                "moving": args.moving,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as output:
+                json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
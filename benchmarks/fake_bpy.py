@@ -0,0 +1,260 @@
+"""Just enough of bpy to run the add-on outside Blender
+
+Call install() before importing anything from src. Objects are plain
+Python, so timings measure the add-on's own work and not Blender's.
+"""
+
+import sys
+import types
+
+import numpy
+
+
+class Euler(list):
+    """rotation_euler"""
+
+
+class FakeAnimData:
+    def __init__(self):
+        self.action = None
+
+
+class FakeKeyframePoints:
+    """keyframe_points with the bulk methods the recorder uses"""
+
+    def __init__(self):
+        self.co = numpy.empty(0, dtype=numpy.float32)
+
+    def __len__(self):
+        return len(self.co) // 2
+
+    def __getitem__(self, index):
+        return index
+
+    def add(self, count):
+        self.co = numpy.concatenate((self.co, numpy.zeros(count * 2, dtype=numpy.float32)))
+
+    def remove(self, index, fast=False):
+        self.co = numpy.delete(self.co, (index * 2, index * 2 + 1))
+
+    def foreach_get(self, attribute, values):
+        values[:] = self.co
+
+    def foreach_set(self, attribute, values):
+        self.co = numpy.array(values, dtype=numpy.float32)
+
+
+class FakeFCurve:
+    def __init__(self, data_path, index):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = FakeKeyframePoints()
+
+    def update(self):
+        co = self.keyframe_points.co.reshape(-1, 2)
+        self.keyframe_points.co = co[numpy.argsort(co[:, 0], kind="stable")].ravel()
+
+
+class FakeFCurves(list):
+    def find(self, data_path, index=0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def new(self, data_path, index=0, action_group=""):
+        fcurve = FakeFCurve(data_path, index)
+        self.append(fcurve)
+        return fcurve
+
+
+class FakeAction:
+    def __init__(self, name):
+        self.name = name
+        self.fcurves = FakeFCurves()
+
+
+class FakeActions(list):
+    def new(self, name):
+        action = FakeAction(name)
+        self.append(action)
+        return action
+
+
+class FakeID:
+    """Base for data blocks, counts keyframe_insert calls"""
+
+    keyframe_inserts = 0
+
+    def __init__(self, name):
+        self.name = name
+        self.animation_data = None
+
+    def as_pointer(self):
+        return id(self)
+
+    def animation_data_create(self):
+        self.animation_data = FakeAnimData()
+        return self.animation_data
+
+    def keyframe_insert(self, data_path, frame=0, index=-1):
+        FakeID.keyframe_inserts += 1
+        return True
+
+
+class FakeLight(FakeID):
+    """Light data with the add-on's ArtNet properties"""
+
+    def __init__(self, name, light_type, universe, base_address, fixture_type):
+        super().__init__(name)
+        self.type = light_type
+        self.color = [1.0, 1.0, 1.0]
+        self.energy = 10.0
+        self.spot_size = 0.785398
+        self.artnet_enabled = True
+        self.artnet_universe = universe
+        self.artnet_base_address = base_address
+        self.artnet_fixture_type = fixture_type
+        self.artnet_pan_target = "lx"
+        self.artnet_tilt_target = "lz"
+        self.artnet_old_pan_target = "none"
+        self.artnet_old_tilt_target = "none"
+
+    def __contains__(self, key):
+        # ID properties, which the add-on's registered properties count as
+        return hasattr(self, key)
+
+
+class FakeAttributeData:
+    """Attribute values, set in bulk"""
+
+    def __init__(self, length, width):
+        self.length = length
+        self.values = numpy.zeros(length * width, dtype=numpy.float32)
+
+    def __len__(self):
+        return self.length
+
+    def foreach_set(self, attribute, values):
+        self.values[:] = values
+
+
+class FakeAttributes(dict):
+    """mesh.attributes, point domain only"""
+
+    def __init__(self, mesh):
+        super().__init__()
+        self.mesh = mesh
+
+    def new(self, name, data_type, domain):
+        width = 4 if data_type in ("FLOAT_COLOR", "BYTE_COLOR") else 1
+        attribute = types.SimpleNamespace(
+            name=name, data_type=data_type, domain=domain,
+            data=FakeAttributeData(len(self.mesh.vertices), width))
+        self[name] = attribute
+        return attribute
+
+    def remove(self, attribute):
+        del self[attribute.name]
+
+
+class FakeMesh(FakeID):
+    """Mesh data with the add-on's ArtNet properties, each vertex a fixture instance"""
+
+    def __init__(self, name, vertex_count, universe, base_address, fixture_type):
+        super().__init__(name)
+        self.vertices = [None] * vertex_count
+        self.attributes = FakeAttributes(self)
+        self.artnet_enabled = True
+        self.artnet_mesh_mode = "INSTANCES"
+        self.artnet_universe = universe
+        self.artnet_base_address = base_address
+        self.artnet_fixture_type = fixture_type
+        self.artnet_fixture_spacing = 0
+
+    def update(self):
+        pass
+
+
+class FakeObject(FakeID):
+    def __init__(self, name, data, parent=None):
+        super().__init__(name)
+        self.type = "MESH" if isinstance(data, FakeMesh) else "LIGHT"
+        self.data = data
+        self.parent = parent
+        self.rotation_euler = Euler([0.0, 0.0, 0.0])
+        self.rotation_mode = "XYZ"
+
+
+class FakeObjects(list):
+    """scene.objects, looked up by name"""
+
+    def get(self, name, default=None):
+        for obj in self:
+            if obj.name == name:
+                return obj
+        return default
+
+
+class _Timers:
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.registered.append(function)
+
+    def unregister(self, function):
+        self.registered.remove(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+
+def install():
+    """Put a fake bpy into sys.modules and return it"""
+    if "bpy" in sys.modules:
+        return sys.modules["bpy"]
+    bpy = types.ModuleType("bpy")
+
+    app = types.ModuleType("bpy.app")
+    app.background = True
+    app.timers = _Timers()
+    handlers = types.ModuleType("bpy.app.handlers")
+    handlers.persistent = lambda function: function
+    for handler in ("frame_change_pre", "save_pre", "load_post", "depsgraph_update_post"):
+        setattr(handlers, handler, [])
+    app.handlers = handlers
+
+    bpy_types = types.ModuleType("bpy.types")
+    for name in ("Light", "Scene", "Collection", "WindowManager", "ToolSettings",
+                 "Operator", "Panel", "AddonPreferences"):
+        setattr(bpy_types, name, type(name, (), {}))
+    # so the depsgraph handler sees fake objects as objects
+    bpy_types.Object = FakeObject
+    bpy_types.RenderSettings = type("RenderSettings", (), {"use_lock_interface": False})
+
+    msgbus = types.ModuleType("bpy.msgbus")
+    msgbus.clear_by_owner = lambda owner: None
+    msgbus.subscribe_rna = lambda **kwargs: None
+
+    scene = types.SimpleNamespace(
+        objects=FakeObjects(),
+        frame_current=1,
+        tool_settings=types.SimpleNamespace(use_keyframe_insert_auto=False),
+        render=types.SimpleNamespace(fps=30, fps_base=1.0),
+    )
+    bpy.context = types.SimpleNamespace(
+        scene=scene,
+        window_manager=types.SimpleNamespace(windows=[]),
+    )
+    bpy.data = types.SimpleNamespace(objects=scene.objects, actions=FakeActions())
+    bpy.app = app
+    bpy.types = bpy_types
+    bpy.msgbus = msgbus
+
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.app"] = app
+    sys.modules["bpy.app.handlers"] = handlers
+    sys.modules["bpy.types"] = bpy_types
+    sys.modules["bpy.msgbus"] = msgbus
+    return bpy
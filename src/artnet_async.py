@@ -0,0 +1,132 @@
+"""asyncio ArtNet receiver"""
+
+import asyncio
+import socket
+import threading
+import time
+
+from .artnet_receiver import ArtNetReceiver, UDP_IP, UDP_PORT
+
+class _ArtNetProtocol(asyncio.DatagramProtocol):
+    """Hands datagrams from one listening socket to the receiver"""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.queue_packet(data, addr)
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable on Windows, keep listening
+        pass
+
+
+class AsyncArtNetReceiver(ArtNetReceiver):
+    """Receives ArtNet on an asyncio event loop in one helper thread
+
+    Listens on several addresses at once, e.g. one per network card or
+    one each for the 2.x.x.x and 10.x.x.x ArtNet ranges. Shutting down
+    stops the loop straight away instead of waiting for a socket timeout.
+    """
+
+    def __init__(self, universe_store, receive_buffer_size=0, addresses=(UDP_IP,)):
+        super().__init__(universe_store)
+        # kernel receive buffer in bytes, 0 for the system default
+        self.receive_buffer_size = receive_buffer_size
+        self.addresses = tuple(addresses)
+        self._transports = []
+        self._pending = [] # (packet, address) received since the last flush
+        self._received = None # when the first of them arrived, when tracing
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        finally:
+            self._started.set()
+        self._loop.run_forever()
+        # stopped, tidy up on this thread
+        self._close_transports()
+        self._loop.close()
+
+    async def _listen(self):
+        for address in self.addresses:
+            try:
+                sock = self._make_socket(address)
+            except OSError as err:
+                print("error while connecting to", address, err)
+                continue
+            transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _ArtNetProtocol(self),
+                sock=sock
+            )
+            self._transports.append(transport)
+
+    def _make_socket(self, address):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # UDP
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.receive_buffer_size > 0:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+            sock.bind((address, UDP_PORT))
+            sock.setblocking(0)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def queue_packet(self, packet, address):
+        """Called on the loop for each datagram, parses once the loop is idle"""
+        if not self._pending:
+            # everything that arrives before this runs is parsed as one batch
+            self._loop.call_soon(self._flush)
+            if self.tracer.enabled:
+                self._received = time.perf_counter()
+        self._pending.append((packet, address))
+
+    def _flush(self):
+        packets = self._pending
+        self._pending = []
+        received = self._received
+        self._received = None
+        self.receive_packets(packets, received)
+
+    def set_receive_buffer_size(self, size):
+        """Change the kernel receive buffer, in bytes, 0 for the system default"""
+        self.receive_buffer_size = size
+        if size > 0:
+            self._call_on_loop(self._apply_receive_buffer_size)
+
+    def _apply_receive_buffer_size(self):
+        for transport in self._transports:
+            sock = transport.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+
+    def _close_transports(self):
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+
+    def _call_on_loop(self, callback):
+        # queued callbacks still run if the loop is about to start
+        try:
+            self._loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            # loop already closed
+            pass
+
+    def disconnect(self):
+        """Stop listening on all addresses"""
+        self._call_on_loop(self._close_transports)
+
+    def shutdown(self):
+        """Stop the event loop and wait for its thread to exit"""
+        self._call_on_loop(self._loop.stop)
+        self._thread.join()
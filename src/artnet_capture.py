@@ -0,0 +1,139 @@
+"""ArtNet capture and replay"""
+
+import mmap
+import struct
+import threading
+import time
+
+from .artnet_receiver import ArtNetReceiver
+
+# file starts with MAGIC, then one record per packet:
+# RECORD (monotonic seconds as a double, packet length) then the packet bytes
+MAGIC = b"ARTNCAP1"
+RECORD = struct.Struct("<dH")
+CAPTURE_EXTENSION = ".artnetcap"
+
+
+class CaptureWriter:
+    """Appends accepted ArtNet packets to a capture file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.packet_count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def write(self, packet, timestamp):
+        """Append one packet, called from the receive thread"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(timestamp, len(packet)))
+            self._file.write(packet)
+            self.packet_count += 1
+
+    def close(self):
+        """Flush and close the file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureReader:
+    """Reads a capture file through mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as capture_file:
+            self._mmap = mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("{} is not an ArtNet capture".format(path))
+
+    def __iter__(self):
+        """Yields (timestamp, offset, packet) for every complete record"""
+        return self.read_from(len(MAGIC))
+
+    def read_from(self, offset):
+        """Yields (timestamp, offset, packet) starting at a record offset"""
+        data = self._mmap
+        end = len(data)
+        while offset + RECORD.size <= end:
+            timestamp, length = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            if start + length > end:
+                # capture was cut off part way through a packet
+                return
+            yield timestamp, offset, data[start:start + length]
+            offset = start + length
+
+    def close(self):
+        """Release the mapping"""
+        self._mmap.close()
+
+
+class CaptureReplay(ArtNetReceiver):
+    """Feeds a capture file into a universe store instead of the network
+
+    Replays either in real time, keeping the gaps between packets, or as
+    fast as possible. Use it in place of the live receiver, the universe
+    store expects one source at a time.
+    """
+
+    def __init__(self, universe_store, path, realtime=True, speed=1.0, loop=False):
+        super().__init__(universe_store)
+        self.reader = CaptureReader(path)
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self.finished = False
+        self._shutdown = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Replay on a background thread"""
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def replay(self):
+        """Replay on the calling thread, returns when the capture ends"""
+        while True:
+            self._replay_once()
+            if not self.loop or self._shutdown.is_set():
+                break
+        self.finished = True
+
+    def _run(self):
+        try:
+            self.replay()
+        finally:
+            self.reader.close()
+
+    def _replay_once(self):
+        # sequence numbers start again with the capture
+        self.reset_sequences()
+        first_timestamp = None
+        started = time.perf_counter()
+        for timestamp, _offset, packet in self.reader:
+            if self._shutdown.is_set():
+                return
+            if self.realtime:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                due = started + (timestamp - first_timestamp) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0 and self._shutdown.wait(delay):
+                    return
+            if self.accept_packet(packet, None):
+                self.parse_packet(packet)
+
+    def shutdown(self):
+        """Stop replaying and wait for the thread to exit"""
+        self._shutdown.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self.reader.close()
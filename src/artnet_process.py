@@ -0,0 +1,177 @@
+"""Multi-process ArtNet ingest"""
+
+import math
+import os
+import subprocess
+import sys
+
+import numpy
+
+from .artnet_receiver import ArtNetReceiver
+from .shared_universes import SharedUniverses
+from .universe_store import changes_to_mask
+
+SHARD_BY_UNIVERSE = 'UNIVERSE'
+SHARD_BY_SOURCE = 'SOURCE'
+
+# (identifier, name, description) for the sharding preference
+SHARD_MODES = [
+    (SHARD_BY_UNIVERSE, 'Universe Range',
+     'Each worker keeps a range of universes. With more than one worker this needs '
+     'broadcast ArtNet, unicast only reaches one of them'),
+    (SHARD_BY_SOURCE, 'Sender',
+     'The system shares packets out between workers by sender, '
+     'for unicast ArtNet from several desks or nodes'),
+]
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_worker.py")
+WORKER_STOP_TIMEOUT = 2 # seconds to wait for a worker to exit before killing it
+
+
+def subscription_line(subscribed):
+    """The line telling workers which universes to keep, * for all of them"""
+    if subscribed is None:
+        return b"*\n"
+    return ",".join(str(index) for index in sorted(subscribed)).encode("ascii") + b"\n"
+
+
+class ProcessIngest(ArtNetReceiver):
+    """Receives ArtNet in worker processes sharing universes through shared memory
+
+    Workers listen, check, diff and store packets away from Blender's
+    GIL. Blender only copies the universes whose seqlock counter moved,
+    when the synchroniser asks the universe store for changes.
+
+    Sharding by universe range needs broadcast ArtNet, so every worker
+    sees every packet and keeps its own range. SO_REUSEPORT shares
+    unicast datagrams out by a hash of the sender, so sharding by sender
+    only spreads the load when there is more than one sender, and each
+    universe must only come from one of them.
+
+    Workers are sent the universe store's subscription on their stdin,
+    so they drop unpatched universes before writing them to shared memory.
+    """
+
+    can_capture = False # packets stay in the workers, only universes reach Blender
+
+    def __init__(self, universe_store, receive_buffer_size=0, workers=1,
+                 shard_by=SHARD_BY_UNIVERSE, universe_count=64, first_universe=1):
+        super().__init__(universe_store)
+        self.receive_buffer_size = receive_buffer_size
+        self.shard_by = shard_by
+        self.universes = SharedUniverses.create(first_universe, universe_count)
+        # seqlock counter of each slot when it was last published
+        self._published_seq = numpy.zeros(universe_count, dtype=numpy.uint64)
+        self._torn_reads = self.metrics.counter(
+            "ingest.torn_reads", "Shared universes that changed while being read")
+        workers = max(1, workers)
+        if shard_by == SHARD_BY_SOURCE:
+            self._shards = [(first_universe, universe_count)] * workers
+        else:
+            size = math.ceil(universe_count / workers)
+            self._shards = [(first_universe + start, min(size, universe_count - start))
+                            for start in range(0, universe_count, size)]
+        self._processes = []
+        # the subscription the workers were last sent
+        self._worker_subscription = universe_store.subscribed
+        self._start_workers()
+        # the store reads the shared universes whenever it's asked for changes
+        universe_store.external_source = self
+
+    def start_capture(self, writer, capture_only=False):
+        """Captures need the packets, which never leave the workers"""
+        writer.close()
+        raise ValueError("the Worker Processes receiver can't capture, "
+                         "use the Thread or asyncio receiver")
+
+    def _start_workers(self):
+        for first, count in self._shards:
+            self._processes.append(self._start_worker(first, count))
+
+    def _stop_workers(self):
+        for process in self._processes:
+            # workers exit when their stdin closes
+            process.stdin.close()
+        for process in self._processes:
+            try:
+                process.wait(WORKER_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+
+    def _start_worker(self, first, count):
+        command = [sys.executable, WORKER_SCRIPT, self.universes.name, str(first), str(count),
+                   "--buffer", str(self.receive_buffer_size)]
+        if self.shard_by == SHARD_BY_SOURCE:
+            command.append("--reuse-port")
+        process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self._send(process, subscription_line(self._worker_subscription))
+        return process
+
+    @staticmethod
+    def _send(process, line):
+        try:
+            process.stdin.write(line)
+            process.stdin.flush()
+        except OSError:
+            # the worker exited, e.g. it couldn't open the port
+            pass
+
+    def _send_subscription(self, subscribed):
+        """Tell the workers which universes to keep"""
+        self._worker_subscription = subscribed
+        line = subscription_line(subscribed)
+        for process in self._processes:
+            self._send(process, line)
+        # newly subscribed slots may hold data that was never published
+        self._published_seq[:] = 0
+
+    def set_receive_buffer_size(self, size):
+        """Restart the workers with a new receive buffer size"""
+        if self.universes is None or size == self.receive_buffer_size:
+            return
+        self.receive_buffer_size = size
+        self._stop_workers()
+        self._start_workers()
+
+    def poll(self):
+        """Publish the shared universes that changed, called from the main thread"""
+        universes = self.universes
+        if universes is None:
+            return
+        store = self.universe_store
+        subscribed = store.subscribed
+        if subscribed is not self._worker_subscription:
+            # the store replaces the set whole when the patch changes
+            self._send_subscription(subscribed)
+        seq = universes.seq.copy()
+        # even counters are settled, odd ones are being written and wait for the next poll
+        changed = numpy.flatnonzero((seq != self._published_seq) & (seq % 2 == 0))
+        if len(changed) == 0:
+            return
+        tracing = self.tracer.enabled
+        for slot in changed:
+            index = universes.first + int(slot)
+            if subscribed is not None and index not in subscribed:
+                # written before the workers heard of the new subscription
+                self._published_seq[slot] = seq[slot]
+                continue
+            copied = universes.read(slot, seq[slot])
+            if copied is None:
+                self._torn_reads.add()
+                continue
+            raw, received = copied
+            self._published_seq[slot] = seq[slot]
+            changes = store.get_raw_universe(index) != raw
+            if changes.any():
+                store.publish_universe(index, raw, changes_to_mask(changes),
+                                       received if tracing else None)
+
+    def shutdown(self):
+        """Stop the workers and remove the shared memory"""
+        if self.universe_store.external_source is self:
+            self.universe_store.external_source = None
+        self._stop_workers()
+        if self.universes is not None:
+            self.universes.close()
+            self.universes = None
@@ -0,0 +1,260 @@
+"""ArtNet Receiver base"""
+
+import time
+
+import numpy
+
+from .latency_tracer import TRACER, TRACK_RECEIVE
+from .metrics import METRICS, COUNT_BUCKETS
+from .universe_store import changes_to_mask
+
+UDP_IP = "0.0.0.0"
+UDP_PORT = 6454
+
+ARTNET_ID = b"Art-Net\x00"
+OP_DMX = 0x5000
+
+# why a packet was dropped, each is counted as artnet.dropped.<reason>
+DROP_SHORT = "short" # too short for an ArtDmx header
+DROP_NOT_ARTNET = "not_artnet" # some other protocol on the port
+DROP_OPCODE = "opcode" # ArtNet, but not ArtDmx, e.g. ArtPoll or ArtTimeCode
+DROP_TRUNCATED = "truncated" # fewer channels than the header says
+DROP_STALE = "stale" # arrived after a newer packet from the same source
+DROP_DUPLICATE = "duplicate" # same sequence number as the last packet
+DROP_UNSUBSCRIBED = "unsubscribed" # no lights are patched to the universe
+DROP_REASONS = (DROP_SHORT, DROP_NOT_ARTNET, DROP_OPCODE, DROP_TRUNCATED,
+                DROP_STALE, DROP_DUPLICATE, DROP_UNSUBSCRIBED)
+
+# a sequence this far behind the last one is taken as the desk restarting
+# rather than a late packet
+SEQUENCE_WINDOW = 64
+
+class ArtNetReceiver:
+    """Turns ArtNet packets into universe frames
+
+    Shared by the receive backends, which only differ in how they get
+    packets off the network. Runs on the backend's own thread and must
+    not access blender directly.
+    """
+
+    can_capture = True # false if packets never pass through receive_packets
+    capture = None # CaptureWriter that accepted packets are written to
+    capture_only = False # skip parsing while capturing
+    metrics = METRICS # registry the receiver reports to
+    tracer = TRACER # records latency spans when enabled
+
+    def __init__(self, universe_store):
+        self.universe_store = universe_store
+        metrics = self.metrics
+        self._packets_received = metrics.counter(
+            "artnet.packets_received", "Datagrams received")
+        self._packets_dropped = metrics.counter(
+            "artnet.packets_dropped", "Datagrams dropped before parsing")
+        self._drops = {reason: metrics.counter("artnet.dropped." + reason)
+                       for reason in DROP_REASONS}
+        # (port-address, source): last sequence number, 0 when the source doesn't send them
+        self._sequences = {}
+        self._packets_parsed = metrics.counter(
+            "artnet.packets_parsed", "ArtDmx packets parsed, the rest were superseded")
+        self._frames_published = metrics.counter(
+            "artnet.frames_published", "Universe updates that changed a channel")
+        self._batch_sizes = metrics.histogram(
+            "artnet.batch_size", COUNT_BUCKETS, "Datagrams handled at once")
+
+    def start_capture(self, writer, capture_only=False):
+        """Write every accepted packet to a CaptureWriter
+
+        With capture_only the packets aren't parsed, keeping the receive
+        thread as light as possible while a show is recorded.
+        """
+        self.capture_only = capture_only
+        self.capture = writer
+
+    def stop_capture(self):
+        """Stop capturing and close the capture, returns the packet count"""
+        writer = self.capture
+        self.capture = None
+        self.capture_only = False
+        if writer is None:
+            return 0
+        writer.close()
+        return writer.packet_count
+
+    def disconnect(self):
+        """Stop listening"""
+
+    def shutdown(self):
+        """Stop the backend and wait for it to exit"""
+
+    def set_receive_buffer_size(self, size):
+        """Change the kernel receive buffer, in bytes, 0 for the system default"""
+
+    @staticmethod
+    def is_art_net(packet):
+        """Return true if packet is valid ArtNet packet"""
+        return (packet[0] == 65
+                and packet[1] == 114
+                and packet[2] == 116
+                and packet[8] == 0
+                and packet[9] == 80) # known header
+
+    @staticmethod
+    def is_art_timecode(packet):
+        """Return true if packet is an ArtTimeCode packet"""
+        return (len(packet) >= 19
+                and packet[0] == 65
+                and packet[1] == 114
+                and packet[2] == 116
+                and packet[8] == 0
+                and packet[9] == 0x97)
+
+    @staticmethod
+    def read_dmx(packet):
+        """Returns (universe index, channel bytes) of an ArtDmx packet
+
+        Returns None if the packet is shorter than its channel count says.
+        """
+        channels = packet[16]*256 + packet[17]
+        # packets don't have to have all 512 channels
+        if channels > 512 or len(packet) < channels + 18:
+            return None
+        # 15-bit port-address, 1-based everywhere except in packet
+        universe_index = (packet[15] & 0x7f)*256 + packet[14] + 1
+        payload = numpy.frombuffer(memoryview(packet)[18:18+channels], dtype=numpy.uint8)
+        return universe_index, payload
+
+    @staticmethod
+    def check_header(packet):
+        """Returns why an ArtDmx packet can't be used, or None if it can"""
+        length = len(packet)
+        if length < 18:
+            return DROP_SHORT
+        if packet[:8] != ARTNET_ID:
+            return DROP_NOT_ARTNET
+        # opcode is little-endian
+        if packet[9] != OP_DMX >> 8 or packet[8] != 0:
+            return DROP_OPCODE
+        channels = packet[16]*256 + packet[17]
+        if channels == 0 or channels > 512 or length < channels + 18:
+            return DROP_TRUNCATED
+        return None
+
+    def check_sequence(self, packet, address):
+        """Returns why a packet is out of sequence for its universe and source, or None
+
+        Remembers the packet's sequence number, so call once per packet.
+        """
+        sequence = packet[12]
+        if sequence == 0:
+            # sequencing turned off by the sender
+            return None
+        key = (packet[15]*256 + packet[14], address)
+        last = self._sequences.get(key, 0)
+        if last:
+            # sequence numbers run 1-255 then wrap back to 1
+            ahead = (sequence - last) % 255
+            if ahead == 0:
+                return DROP_DUPLICATE
+            if ahead >= 255 - SEQUENCE_WINDOW:
+                return DROP_STALE
+        self._sequences[key] = sequence
+        return None
+
+    def reset_sequences(self):
+        """Forget the sequence numbers seen, e.g. when a replay starts again"""
+        self._sequences = {}
+
+    def reject_reason(self, packet, address):
+        """Returns why a received packet shouldn't be parsed, or None to parse it"""
+        reason = self.check_header(packet)
+        if reason is not None:
+            return reason
+        # captures keep every universe, the patch may change before they're replayed
+        subscribed = self.universe_store.subscribed
+        if subscribed is not None and self.capture is None:
+            # 15-bit port-address, 1-based everywhere except in packet
+            if (packet[15] & 0x7f)*256 + packet[14] + 1 not in subscribed:
+                return DROP_UNSUBSCRIBED
+        return self.check_sequence(packet, address)
+
+    def accept_packet(self, packet, address):
+        """Return true if a received packet should be parsed"""
+        return self.reject_reason(packet, address) is None
+
+    def receive_packets(self, packets, received=None):
+        """Parse a batch of (packet, address), only the newest packet per universe
+
+        received is the perf_counter time the batch was read, used when tracing
+        """
+        tracing = self.tracer.enabled
+        if tracing:
+            parse_start = time.perf_counter()
+            if received is None:
+                received = parse_start
+        else:
+            received = None
+        latest = {}
+        capture = self.capture
+        if capture is not None:
+            timestamp = time.perf_counter()
+        dropped = {}
+        parsed = 0
+        published = 0
+        for packet, address in packets:
+            reason = self.reject_reason(packet, address)
+            if reason is not None:
+                dropped[reason] = dropped.get(reason, 0) + 1
+                if (capture is not None and reason == DROP_OPCODE
+                        and self.is_art_timecode(packet)):
+                    # captures keep timecode so they can be indexed by it
+                    capture.write(packet, timestamp)
+                continue
+            if capture is not None:
+                capture.write(packet, timestamp)
+                if self.capture_only:
+                    continue
+            # a newer packet for a universe makes older ones redundant
+            port_address = packet[15]*256 + packet[14]
+            older = latest.get(port_address, None)
+            if older is not None and len(older) > len(packet):
+                # the newer packet doesn't cover every channel of the older one
+                parsed += 1
+                published += self.parse_packet(older, received)
+            latest[port_address] = packet
+        for packet in latest.values():
+            published += self.parse_packet(packet, received)
+        # once per batch, so the counters' locks stay off the per packet path
+        self._packets_received.add(len(packets))
+        if dropped:
+            for reason, count in dropped.items():
+                self._drops[reason].add(count)
+            self._packets_dropped.add(sum(dropped.values()))
+        self._packets_parsed.add(parsed + len(latest))
+        self._frames_published.add(published)
+        self._batch_sizes.observe(len(packets))
+        if tracing:
+            self.tracer.span("parse", TRACK_RECEIVE, parse_start, time.perf_counter(),
+                             {"packets": len(packets), "published": published})
+
+    def parse_packet(self, packet, received=None):
+        """Parse a valid artnet universe packet
+
+        Returns true if it changed the universe.
+        """
+        dmx = self.read_dmx(packet)
+        if dmx is not None:
+            universe_index, payload = dmx
+            # the last published bytes, to detect changes
+            # published frames are read only, so this never sees a half written packet
+            previous = self.universe_store.get_raw_universe(universe_index)
+            # diff the whole payload against the stored bytes in one pass
+            channels = len(payload)
+            changed = previous[:channels] != payload
+            if changed.any():
+                raw_universe = previous.copy()
+                raw_universe[:channels] = payload
+                # hand the new frame and its dirty mask to the main thread
+                self.universe_store.publish_universe(universe_index, raw_universe,
+                                                     changes_to_mask(changed), received)
+                return True
+        return False
@@ -1,21 +1,26 @@
 """ArtNet Socket implementation"""
 
+import select
 import socket
 import threading
 import time
 
-UDP_IP = "0.0.0.0"
-UDP_PORT = 6454
+from .artnet_receiver import ArtNetReceiver, UDP_IP, UDP_PORT
 
-class ArtNetSocket:
-    """Connects to ArtNet"""
+SOCKET_TIMEOUT = 1 # seconds to wait for data before checking for shutdown
+MAX_BATCH = 256 # most packets drained from the socket before parsing them
+
+class ArtNetSocket(ArtNetReceiver):
+    """Connects to ArtNet from a background thread"""
 
     _shutdown = False
-    _thread: threading.Thread
+    _thread: threading.Thread = None
 
-    def __init__(self, universe_store):
+    def __init__(self, universe_store, receive_buffer_size=0):
+        super().__init__(universe_store)
+        # kernel receive buffer in bytes, 0 for the system default
+        self.receive_buffer_size = receive_buffer_size
         self._socket = self.connect()
-        self.universe_store = universe_store
         if self._socket is not None:
             self._thread = threading.Thread(target=self.socket_loop)
             self._thread.daemon = True
@@ -26,16 +31,29 @@ class ArtNetSocket:
         try:
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # UDP
             self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._apply_receive_buffer_size()
             self._socket.bind((UDP_IP, UDP_PORT))
-            # blocking socket as we're listening in a background thread
-            self._socket.setblocking(1)
-            self._socket.settimeout(1) # 1 second timeout
+            # non-blocking socket so that everything queued can be drained at once
+            # the background thread waits for data with select
+            self._socket.setblocking(0)
             return self._socket
         except Exception as err:
             print("error while connecting", err)
             self.disconnect()
             return None
 
+    def set_receive_buffer_size(self, size):
+        """Change the kernel receive buffer, in bytes, 0 for the system default"""
+        self.receive_buffer_size = size
+        self._apply_receive_buffer_size()
+
+    def _apply_receive_buffer_size(self):
+        # a bigger buffer stops bursts from a desk being dropped by the kernel
+        # the kernel may cap this, e.g. net.core.rmem_max on Linux
+        sock = self._socket
+        if sock is not None and self.receive_buffer_size > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+
     def disconnect(self):
         """Disconnect from Artnet UDP socket"""
         if self._socket is not None:
@@ -45,16 +63,8 @@ class ArtNetSocket:
     def shutdown(self):
         """Kill the internal thread and wait for it to exit"""
         self._shutdown = True
-        self._thread.join()
-
-    @staticmethod
-    def is_art_net(packet):
-        """Return true if packet is valid ArtNet packet"""
-        return (packet[0] == 65
-                and packet[1] == 114
-                and packet[2] == 116
-                and packet[8] == 0
-                and packet[9] == 80) # known header
+        if self._thread is not None:
+            self._thread.join()
 
     def socket_loop(self):
         """Thread loop"""
@@ -77,6 +87,8 @@ class ArtNetSocket:
                 # do nothing
                 pass
             except socket.error:
+                self.metrics.counter("artnet.socket_errors",
+                                     "Socket errors, each followed by a reconnect").add()
                 # reconnect socket
                 self.disconnect()
                 self._socket = self.connect()
@@ -84,29 +96,20 @@ class ArtNetSocket:
                 pass
 
     def read_packet(self):
-        packet, _addr = self._socket.recvfrom(1024)
-        if len(packet) > 18 and ArtNetSocket.is_art_net(packet):
-            self.parse_packet(packet)
-
-    def parse_packet(self, packet):
-        """Parse a valid artnet universe packet"""
-        channels = packet[16]*256 + packet[17]
-        # packets don't have to have all 512 channels
-        if channels <= 512:
-            universe_index = packet[15]*256 + packet[14] + 1  # 1-based everywhere except in packet
-            # universe has float data 0-1
-            universe = self.universe_store.get_universe(universe_index)
-            # raw_universe has byte data to detect changes
-            raw_universe = self.universe_store.get_raw_universe(universe_index)
-            universe_changes = []
-            # loop through the channels
-            for i in range(channels):
-                raw_value = packet[i+18]
-                if raw_universe[i] != raw_value:
-                    # data changed since last time
-                    raw_universe[i] = raw_value
-                    universe[i] = raw_value / 255.0
-                    universe_changes.append(i)
-            # let the main thread know that there's an update
-            if len(universe_changes) > 0:
-                self.universe_store.notify_universe_change(universe_index, universe_changes)
+        """Wait for data, then drain the socket and parse the newest packet per universe"""
+        sock = self._socket
+        readable, _, _ = select.select((sock,), (), (), SOCKET_TIMEOUT)
+        if not readable:
+            return
+        packets = []
+        for _ in range(MAX_BATCH):
+            try:
+                packets.append(sock.recvfrom(1024))
+            except BlockingIOError:
+                # nothing left queued
+                break
+        else:
+            # more may be queued, the kernel buffer could be overflowing
+            self.metrics.counter("artnet.full_batches",
+                                 "Reads that filled a whole batch").add()
+        self.receive_packets(packets, time.perf_counter() if self.tracer.enabled else None)
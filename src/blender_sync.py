@@ -2,25 +2,75 @@
 
 import bpy
 
-from .color_converter import ColorConverter
-
 from timeit import default_timer as stopwatch
 from bpy.app.handlers import persistent
 
+from .fixture_binding import resolve_rotation_target
+from .keyframe_recorder import KeyframeRecorder
+from .latency_tracer import TRACER, TRACK_MAIN, TRACK_WAIT
+from .metrics import METRICS, COUNT_BUCKETS, TIME_BUCKETS_MS
+from .universe_store import ALL_CHANNELS
+from .update_scheduler import UpdateScheduler
+
+# smallest change worth writing to Blender, per property type
+# color is 0-1, energy in watts, spot size and rotation in radians
+WRITE_EPSILON = {
+    "color": 0.002,
+    "energy": 0.01,
+    "spot_size": 0.0005,
+    "rotation": 0.0005,
+}
+
+
+def _animation_playing():
+    for window in bpy.context.window_manager.windows:
+        if window.screen is not None and window.screen.is_animation_playing:
+            return True
+    return False
+
 
 class BlenderSynchroniser:
     """Writes universe data to Blender"""
 
     artnet_enabled = True
     frame_current = 0
+    metrics = METRICS # registry the synchroniser reports to
+    tracer = TRACER # records latency spans when enabled
 
     def __init__(self, universe_store, fixture_store, fixture_type_store):
         self.universe_store = universe_store
         self.fixture_store = fixture_store
         self.fixture_type_store = fixture_type_store
         self.add_keyframes = False
+        # record keyframes into buffers and write them when recording stops
+        self.bulk_keyframes = True
+        self.thin_keyframes = True
+        self.recorder = KeyframeRecorder()
+        self.scheduler = UpdateScheduler()
+        self.write_epsilon = dict(WRITE_EPSILON)
+        # writes skipped because the value didn't visibly change
+        self.suppressed_writes = 0
+        # CaptureTimeline that decides the lights on every frame, if any
+        self.timeline = None
+        self._last_traced_tick = 0.0
+        # pointers of bindings and meshes whose object raised ReferenceError this tick
+        self._deleted_pointers = set()
+        metrics = self.metrics
+        self._tick_time = metrics.histogram(
+            "sync.tick_ms", TIME_BUCKETS_MS, "Main thread time of ticks with updates")
+        self._fixtures_per_tick = metrics.histogram(
+            "sync.fixtures_per_tick", COUNT_BUCKETS, "Fixtures updated by each tick")
+        self._universes_applied = metrics.counter(
+            "sync.universes_applied", "Universe updates applied to Blender")
+        self._fixtures_updated = metrics.counter(
+            "sync.fixtures_updated", "Fixtures updated in Blender")
+        self._universes_seen = metrics.gauge(
+            "artnet.universes_seen", "Universes that ArtNet has arrived for")
+        self._suppressed_writes = metrics.gauge(
+            "sync.suppressed_writes", "Writes skipped because nothing visibly changed")
 
         bpy.app.timers.register(self.timer_tick, first_interval=0.1, persistent=True)
+        self._subscribe_keyframe_setting()
         self.is_initialised = True
 
     def __del__(self):
@@ -29,328 +79,259 @@ class BlenderSynchroniser:
     def shutdown(self):
         if self.is_initialised:
             self.is_initialised = False
+            bpy.msgbus.clear_by_owner(self)
+            self.flush_keyframes()
             # if bpy.app.timers.is_registered(self.timer_tick) doesn't like class methods
             #     bpy.app.timers.unregister(self.timer_tick)
     #        bpy.app.handlers.frame_change_pre.remove(self.frame_change_pre)
 
     def register(self):
-        bpy.app.handlers.frame_change_pre.append(self.frame_change_pre)
+        """Add the handlers, loading a file removes them so this runs again after each load"""
+        handlers = bpy.app.handlers
+        for handler_list, handler in ((handlers.frame_change_pre, self.frame_change_pre),
+                                      (handlers.save_pre, self.save_pre),
+                                      (handlers.depsgraph_update_post,
+                                       self.depsgraph_update_post)):
+            # setup and load_post both register for command line renders
+            if handler not in handler_list:
+                handler_list.append(handler)
+        # loading a file clears message bus subscriptions
+        self._subscribe_keyframe_setting()
+
+    def _subscribe_keyframe_setting(self):
+        """Follow Auto Keyframing without reading tool settings every tick"""
+        bpy.msgbus.clear_by_owner(self)
+        bpy.msgbus.subscribe_rna(
+            key=(bpy.types.ToolSettings, "use_keyframe_insert_auto"),
+            owner=self,
+            args=(),
+            notify=self._keyframe_setting_changed
+        )
+        self._keyframe_setting_changed()
+
+    def _keyframe_setting_changed(self):
+        self.add_keyframes = bpy.context.scene.tool_settings.use_keyframe_insert_auto
+        if not self.add_keyframes:
+            self.flush_keyframes()
+
+    def flush_keyframes(self):
+        """Write keyframes recorded in bulk to their fcurves"""
+        if self.recorder.is_recording:
+            self.recorder.flush(self.thin_keyframes)
+
+    def _insert_keyframe(self, id_data, data_path, value, index=-1):
+        if self.bulk_keyframes:
+            if index < 0:
+                self.recorder.record_array(id_data, data_path, self.frame_current, value)
+            else:
+                self.recorder.record(id_data, data_path, self.frame_current, value, index)
+        else:
+            id_data.keyframe_insert(data_path=data_path,
+                                    frame=self.frame_current,
+                                    index=index)
 
     def _update_blender(self):
         """main loop"""
         start = stopwatch()
         # runs in the main thread on a timer
         # find out which universes updated
-        # returns map of universe index to list of changed channels
+        # returns map of universe index to (frame, dirty mask of changed channels)
+        # each frame is a consistent snapshot of its universe
         universe_changes_pending: {} = self.universe_store.get_pending_universes()
+        if not universe_changes_pending:
+            return 0
 
         # only deal with universes that we have fixtures for
-        universes_pending = list(
-            filter(lambda x: x in self.fixture_store.fixture_universe_ids,
-                   universe_changes_pending.keys())
-        )
-
+        fixture_universes = self.fixture_store.fixture_universe_ids
+        universes_pending = {index: pending
+                             for index, pending in universe_changes_pending.items()
+                             if index in fixture_universes}
+
+        tracer = self.tracer if self.tracer.enabled else None
+        if tracer is not None:
+            # frames received before the last tick with updates were applied by it,
+            # so seeing one again means it was forced, not that it waited
+            last_tick = self._last_traced_tick
+            self._last_traced_tick = start
+        fixture_count = 0
         if self.artnet_enabled:
             bpy.types.RenderSettings.use_lock_interface = True
-            for universe_index in universes_pending:
-                self._update_blender_from_universe(universe_index,
-                                                   universe_changes_pending[universe_index])
+            if tracer is not None:
+                self._trace_waits(tracer, start, last_tick, universes_pending)
+            fixture_count = self._update_blender_from_universes(universes_pending, tracer)
             bpy.types.RenderSettings.use_lock_interface = False
         end = stopwatch()
-        ms = (end - start) * 1000
-        if ms > 1:
-            print('{:.2f}'.format(ms))
+        if tracer is not None:
+            tracer.span("tick", TRACK_MAIN, start, end,
+                        {"universes": len(universes_pending), "fixtures": fixture_count})
+        self._tick_time.observe((end - start) * 1000)
+        self._fixtures_per_tick.observe(fixture_count)
+        self._fixtures_updated.add(fixture_count)
+        self._universes_applied.add(len(universes_pending))
+        self._universes_seen.set(len(self.universe_store.universe_ids))
+        self._suppressed_writes.set(self.suppressed_writes)
+        return len(universe_changes_pending)
+
+    def _trace_waits(self, tracer, tick_start, last_tick, pending):
+        """Record how long each universe waited for this tick"""
+        for index, (frame, _) in pending.items():
+            if frame.received is not None and frame.received >= last_tick:
+                tracer.span("wait for tick", TRACK_WAIT, frame.received, tick_start,
+                            {"universe": index})
 
     def frame_change_pre(self, scene, context):
         self.add_keyframes = scene.tool_settings.use_keyframe_insert_auto
-        if self.add_keyframes:
+        timeline = self.timeline
+        if timeline is not None:
+            # the capture decides every frame, so renders come out the same each time
+            render = scene.render
+            timeline.seek_frame(scene.frame_current, render.fps / render.fps_base)
+        if self.add_keyframes or timeline is not None:
             self.frame_current = scene.frame_current
             self._update_blender()
 
+    def depsgraph_update_post(self, scene, depsgraph=None):
+        if depsgraph is None:
+            # Blender 2.80 doesn't pass the depsgraph, deleted lights are
+            # still dropped when updating them fails
+            return
+        # follow lights added, renamed and deleted without rescanning the scene
+        for index in self.fixture_store.update_from_depsgraph(scene, depsgraph):
+            self.universe_store.notify_universe_change(index, ALL_CHANNELS)
+
+    def save_pre(self, *args):
+        # don't lose keyframes still held by the recorder
+        self.flush_keyframes()
+
     def timer_tick(self):
         if not self.is_initialised:
             return None # stop
-        self.add_keyframes = bpy.context.scene.tool_settings.use_keyframe_insert_auto
-        if not self.add_keyframes:
-            self._update_blender()
-            return 0.03 # call again in 0.03 seconds - 30fps
-        return 0.01 # call again in 0.01 seconds - 10fps
-
-    def _update_blender_from_universe(self, index, channels):
-        fixtures = self.fixture_store.get_fixtures_for_universe(index)
-        universe = self.universe_store.get_universe(index)
-        raw_universe = self.universe_store.get_raw_universe(index)
+        if self.add_keyframes:
+            # frame_change_pre applies updates while recording keyframes
+            if self.recorder.is_recording and not _animation_playing():
+                # playback stopped, write what was recorded
+                self.flush_keyframes()
+            return self.scheduler.max_interval
+        universe_count = self._update_blender()
+        # call again when the next data is likely to have arrived
+        return self.scheduler.next_interval(self.universe_store.generation,
+                                            universe_count,
+                                            stopwatch())
+
+    def _update_blender_from_universes(self, pending, tracer=None):
+        """Apply changed universes, returns the fixtures updated
+
+        pending maps universe index to (frame, dirty mask of changed channels)
+        """
+        fixture_store = self.fixture_store
+        for index, (frame, changes) in pending.items():
+            fixture_store.stage_universe(index, frame.raw, changes)
+        fixture_count = 0
+        # objects deleted by a script before the depsgraph told the fixture store
+        deleted = self._deleted_pointers = set()
         # push the data to blender objects
-        deleted_object_names = []
-        for obj_name in fixtures:
-            # todo remove this try block for speed
+        for group in fixture_store.get_groups():
+            if not any(group.uses(index, changes) for index, (_, changes) in pending.items()):
+                continue
+            if tracer is None:
+                fixture_count += self.update_group(group)
+            else:
+                apply_start = stopwatch()
+                count = self.update_group(group)
+                tracer.span("apply", TRACK_MAIN, apply_start, stopwatch(),
+                            {"fixture_type": group.bindings[0].fixture_type,
+                             "fixtures": count})
+                fixture_count += count
+        for mesh in fixture_store.get_meshes():
+            if not any(mesh.uses(index, changes) for index, (_, changes) in pending.items()):
+                continue
+            # pixels and instances are written an attribute at a time,
+            # without keyframes or write suppression
+            apply_start = stopwatch()
             try:
-                mapping = fixtures[obj_name]
-                obj = mapping["object"]
-                if obj is not None:
-                    if obj.type == "LIGHT":
-                        if obj.data.type == "SPOT":
-                            self.update_spot_light(obj, mapping, universe, raw_universe, channels)
-                        elif obj.data.type == "AREA":
-                            self.update_area_light(obj, mapping, universe, raw_universe, channels)
-                        elif obj.data.type == "POINT":
-                            self.update_point_light(obj, mapping, universe, raw_universe, channels)
+                count = mesh.apply(fixture_store.staged_raw, fixture_store.staged_changes)
             except ReferenceError:
-                # object got deleted
-                deleted_object_names.append(obj_name)
-
-        for name in deleted_object_names:
-            self.fixture_store.remove_object_by_name(name)
-
-    def update_spot_light(self, obj, mapping, universe, raw_universe, channels):
-        fixture_type = self.fixture_type_store.get_fixture_type(mapping.get("fixture_type", None))
-        if fixture_type is None:
-            return
-        base_address = mapping.get("base_address", None)
-        # push the data
-        color = self._get_color(universe, raw_universe, base_address, fixture_type, channels)
-        if color is not None:
-            obj.data.color = color
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="color",
-                                         frame=self.frame_current)
-
-        energy = self._get_power(universe, base_address, fixture_type, channels)
-        if energy is not None:
-            obj.data.energy = energy
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="energy",
-                                         frame=self.frame_current)
-
-        self._set_rotation(obj, universe, base_address, fixture_type, channels)
-
-        zoom = self._get_zoom(universe, base_address, fixture_type, channels)
-        if  zoom is not None:
-            obj.data.spot_size = zoom
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="spot_size",
-                                         frame=self.frame_current)
-
-    def update_area_light(self, obj, mapping, universe, raw_universe, channels):
-        fixture_type = self.fixture_type_store.get_fixture_type(mapping.get("fixture_type", None))
-        if fixture_type is None:
-            return None
-
-        base_address = mapping.get("base_address", None)
-        if base_address is None:
-            return None
-
-        # push the data
-        color = self._get_color(universe, raw_universe, base_address, fixture_type, channels)
-        if color is not None:
-            obj.data.color = color
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="color",
-                                         frame=self.frame_current)
-
-        energy = self._get_power(universe, base_address, fixture_type, channels)
-        if energy is not None:
-            obj.data.energy = energy
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="energy",
-                                         frame=self.frame_current)
-
-        self._set_rotation(obj, universe, base_address, fixture_type, channels)
-
-    def update_point_light(self, obj, mapping, universe, raw_universe, channels):
-        fixture_type = self.fixture_type_store.get_fixture_type(mapping.get("fixture_type", None))
-        if fixture_type is None:
-            return None
-        base_address = mapping.get("base_address", None)
-        # push the data
-        color = self._get_color(universe, raw_universe, base_address, fixture_type, channels)
-        if color is not None:
-            obj.data.color = color
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="color",
-                                         frame=self.frame_current)
-
-        energy = self._get_power(universe, base_address, fixture_type, channels)
-        if energy is not None:
-            obj.data.energy = energy
-            if self.add_keyframes:
-                obj.data.keyframe_insert(data_path="energy",
-                                         frame=self.frame_current)
-
-    def _get_zoom(self, universe, base_address, fixture_type, channels):
-        zoom_channel = fixture_type.get("zoom", None)
-        if zoom_channel is None:
-            return None
-        zoom_channel += base_address
-        if zoom_channel in channels:
-            min_zoom = fixture_type.get("minZoom", 0)
-            max_zoom = fixture_type.get("maxZoom", 90)
-            zoom = universe[zoom_channel]
-            zoom_invert = fixture_type.get("zoom_invert", False)
-            if zoom_invert:
-                zoom = 1 - zoom
-            angle = min_zoom + zoom *(max_zoom-min_zoom)
-            return angle
-        return None
-
-    def _get_power(self, universe, base_address, fixture_type, channels):
-        dimmer_channel = fixture_type.get("dimmer", None)
-        if dimmer_channel is None:
-            return None
-        dimmer_channel += base_address
-        if dimmer_channel in channels:
-            dimmer = universe[dimmer_channel]
-            lumens = fixture_type["lumens"]
-            power = lumens * dimmer / 6.83
-            return power
-        return None
-
-    def _get_rotation(self, universe, base_address, fixture_type, channels):
-        pan = None
-        tilt = None
-        universe_len = len(universe)
-        pan_channel = fixture_type.get("pan", None)
-        if pan_channel is not None:
-            pan_channel += base_address
-            if pan_channel in channels:
-                pan = universe[pan_channel] if (pan_channel < universe_len) else 0
-                pan_range = fixture_type.get("panRange", 360)
-                pan -= 0.5
-                pan *= pan_range
-
-        tilt_channel = fixture_type.get("tilt", None)
-        if tilt_channel is not None:
-            tilt_channel += base_address
-            if tilt_channel in channels:
-                tilt = universe[tilt_channel] if (tilt_channel < universe_len) else 0
-                tilt_range = fixture_type.get("tiltRange", 360)
-                tilt -= 0.5
-                tilt *= tilt_range
-        return [pan, tilt]
-
-    def _set_rotation(self, obj, universe, base_address, fixture_type, channels):
-        if obj.data.artnet_old_pan_target != "none":
-            self.set_rotation_on_target(obj, obj.data.artnet_old_pan_target, 0)
-            obj.data.artnet_old_pan_target = "none"
-
-        if obj.data.artnet_old_tilt_target != "none":
-            self.set_rotation_on_target(obj, obj.data.artnet_old_tilt_target, 0)
-            obj.data.artnet_old_tilt_target = "none"
-
-        rotation = self._get_rotation(universe, base_address, fixture_type, channels)
-        pan = rotation[0]
-        tilt = rotation[1]
-        if pan is not None:
-            self.set_rotation_on_target(obj, obj.data.artnet_pan_target, pan)
-        if tilt is not None:
-            self.set_rotation_on_target(obj, obj.data.artnet_tilt_target, tilt)
-
-    def set_rotation_on_target(self, obj, target, rotation):
-        kf_target = None
-        if target == "lx":
-            obj.rotation_euler.x = rotation
-            kf_target = obj
-            kf_index = 0
-        elif target == "ly":
-            obj.rotation_euler.y = rotation
-            kf_target = obj
-            kf_index = 1
-        elif target == "lz":
-            obj.rotation_euler.z = rotation
-            kf_target = obj
-            kf_index = 2
-        elif obj.parent is not None:
-            if target == "px":
-                obj.parent.rotation_euler.x = rotation
-                kf_target = obj.parent
-                kf_index = 0
-            elif target == "py":
-                obj.parent.rotation_euler.y = rotation
-                kf_target = obj.parent
-                kf_index = 1
-            elif target == "pz":
-                obj.parent.rotation_euler.z = rotation
-                kf_target = obj.parent
-                kf_index = 2
-            elif obj.parent.parent is not None:
-                if target == "gpx":
-                    obj.parent.parent.rotation_euler.x = rotation
-                    kf_target = obj.parent.parent
-                    kf_index = 0
-                elif target == "gpy":
-                    obj.parent.parent.rotation_euler.y = rotation
-                    kf_target = obj.parent.parent
-                    kf_index = 1
-                elif target == "gpz":
-                    obj.parent.parent.rotation_euler.z = rotation
-                    kf_target = obj.parent.parent
-                    kf_index = 2
-
-        if (kf_target is not None) and self.add_keyframes:
-            kf_target.keyframe_insert(data_path="rotation_euler",
-                                      frame=self.frame_current,
-                                      index = kf_index)
-
-    def _get_color(self, universe, rawUniverse, base_address, fixture_type, channels):
-        color_mode = fixture_type.get("colorMode", None)
-        if color_mode == "rgbw":
-            red_channel = fixture_type.get("red", None)
-            green_channel = fixture_type.get("green", None)
-            blue_channel = fixture_type.get("blue", None)
-            white_channel = fixture_type.get("white", None)
-            if (red_channel is None
-                    or green_channel is None
-                    or blue_channel is None
-                    or white_channel is None):
-                return None
-            red_channel += base_address
-            green_channel += base_address
-            blue_channel += base_address
-            white_channel += base_address
-            if (red_channel in channels
-                    or green_channel in channels
-                    or blue_channel in channels
-                    or white_channel in channels):
-                universe_len = len(universe)
-                red = universe[red_channel] if (red_channel < universe_len) else 0
-                green = universe[green_channel] if (green_channel < universe_len) else 0
-                blue = universe[blue_channel] if (blue_channel < universe_len) else 0
-                white = universe[white_channel] if (white_channel < universe_len) else 0
-                return ColorConverter.rgbw_to_rgb(red, green, blue, white)
-            return None
-
-        elif color_mode == "cmy":
-            cyan_channel = fixture_type.get("cyan", None)
-            magenta_channel = fixture_type.get("magenta", None)
-            yellow_channel = fixture_type.get("yellow", None)
-            if (cyan_channel is None
-                    or magenta_channel is None
-                    or yellow_channel is None):
-                return None
-            cyan_channel += base_address
-            magenta_channel += base_address
-            yellow_channel += base_address
-            if (cyan_channel in channels
-                    or magenta_channel in channels
-                    or yellow_channel in channels):
-                universe_len = len(universe)
-                cyan = universe[cyan_channel] if (cyan_channel < universe_len) else 0
-                magenta = universe[magenta_channel] if (magenta_channel < universe_len) else 0
-                yellow = universe[yellow_channel] if (yellow_channel < universe_len) else 0
-                return ColorConverter.cmy_to_rgb(cyan, magenta, yellow)
-            return None
-
-        elif color_mode == "wheel":
-            position_channel = fixture_type.get("color", None)
-            if position_channel is None:
-                return None
-            position_channel += base_address
-            if position_channel in channels:
-                universe_len = len(universe)
-                position = rawUniverse[position_channel] if (position_channel < universe_len) else 0
-                wheel = fixture_type["colorWheel"]
-                return ColorConverter.wheel_to_rgb(wheel, position, True)
-            return None
-
-        else:
-            return None
+                deleted.add(mesh.pointer)
+                continue
+            if tracer is not None:
+                tracer.span("apply mesh", TRACK_MAIN, apply_start, stopwatch(),
+                            {"object": mesh.name, "elements": len(mesh.channels)})
+            fixture_count += count
+        if deleted:
+            # only the objects that failed are dropped or recompiled, the
+            # rest were written and their universes aren't applied again
+            fixture_store.recheck_objects(deleted)
+        fixture_store.clear_staged()
+        return fixture_count
+
+    def update_group(self, group):
+        """Apply the staged universes to a group of fixtures of one type
+
+        The group decodes every fixture at once and leaves out values
+        within write_epsilon of the last one written, along with their
+        keyframes, so Blender isn't asked to redraw for changes nobody
+        can see. A light that raises ReferenceError is left for the
+        fixture store to drop without stopping the others. Returns the
+        fixtures with changed channels.
+        """
+        deleted = self._deleted_pointers
+        if group.resets:
+            for binding in group.resets:
+                try:
+                    self._reset_rotation(binding)
+                except ReferenceError:
+                    deleted.add(binding.pointer)
+            group.resets = []
+        fixture_store = self.fixture_store
+        updates, fixture_count, skipped = group.evaluate(
+            fixture_store.staged_raw, fixture_store.staged_changes, self.write_epsilon)
+        self.suppressed_writes += skipped
+        bindings = group.bindings
+        add_keyframes = self.add_keyframes
+        for name, rows, values in updates:
+            if name == "pan" or name == "tilt":
+                target_name = name + "_target"
+                for row, value in zip(rows, values):
+                    binding = bindings[row]
+                    try:
+                        resolved = resolve_rotation_target(binding.obj,
+                                                           getattr(binding, target_name))
+                        if resolved is None:
+                            # the light has fewer parents than the target reaches
+                            continue
+                        target, axis = resolved
+                        target.rotation_euler[axis] = value
+                        if add_keyframes:
+                            self._insert_keyframe(target, "rotation_euler", value, axis)
+                    except ReferenceError:
+                        deleted.add(binding.pointer)
+            else:
+                # color, energy and spot_size are light properties of the same name
+                index = -1 if name == "color" else 0
+                for row, value in zip(rows, values):
+                    try:
+                        data = bindings[row].obj.data
+                        setattr(data, name, value)
+                        if add_keyframes:
+                            self._insert_keyframe(data, name, value, index)
+                    except ReferenceError:
+                        deleted.add(bindings[row].pointer)
+        return fixture_count
+
+    def _reset_rotation(self, binding):
+        """Zero the axes a light's pan/tilt used to drive"""
+        for target in binding.reset_targets:
+            resolved = resolve_rotation_target(binding.obj, target)
+            if resolved is not None:
+                self.set_rotation_on_target(resolved, 0)
+        binding.reset_targets = []
+        data = binding.obj.data
+        data.artnet_old_pan_target = "none"
+        data.artnet_old_tilt_target = "none"
+
+    def set_rotation_on_target(self, target, rotation):
+        """Set one rotation axis on a resolved (object, axis) target"""
+        kf_target, kf_index = target
+        kf_target.rotation_euler[kf_index] = rotation
+        if self.add_keyframes:
+            self._insert_keyframe(kf_target, "rotation_euler", rotation, kf_index)
@@ -0,0 +1,183 @@
+"""Frame accurate seeking into ArtNet captures"""
+
+import bisect
+import math
+import os
+
+import numpy
+
+from .artnet_capture import CaptureReader
+from .artnet_receiver import ArtNetReceiver
+from .universe_store import CHANNELS_PER_UNIVERSE, changes_to_mask
+
+# fewest DMX packets between full snapshots of every universe
+# the gap also grows with the universe count, so snapshots stay a
+# fraction of the capture's size
+SNAPSHOT_PACKETS = 256
+SNAPSHOT_PACKETS_PER_UNIVERSE = 4
+# most bytes of snapshots kept per timeline, past it every other
+# snapshot is dropped and the gap doubles
+SNAPSHOT_BUDGET = 64 * 1024 * 1024
+
+# frames per second of each ArtTimeCode type: film, EBU, drop frame, SMPTE
+# drop frame timecode still labels 30 frames per second
+TIMECODE_RATES = (24, 25, 30, 30)
+
+
+def capture_key(path, use_timecode):
+    """Identifies a capture file's contents and how its index was built"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, use_timecode)
+
+
+def timecode_seconds(packet):
+    """Returns the time of an ArtTimeCode packet in seconds"""
+    frames, seconds, minutes, hours, timecode_type = packet[14:19]
+    rate = TIMECODE_RATES[timecode_type & 3]
+    return hours * 3600 + minutes * 60 + seconds + frames / rate
+
+
+class CaptureTimeline(ArtNetReceiver):
+    """Rebuilds the universes at any moment of a capture
+
+    Every DMX packet in the capture gets a show time, either from the
+    ArtTimeCode the desk sent or from when it was captured. Full
+    snapshots of every universe are kept every few hundred packets, so
+    seeking is a binary search for the snapshot followed by at most one
+    gap's worth of packets read back from the capture. Snapshots are
+    thinned out once they pass SNAPSHOT_BUDGET, so long captures seek a
+    little slower rather than using more memory.
+
+    Seeking publishes to the universe store from the main thread, so it
+    replaces the live receiver while it's in use. The capture is only
+    read, so any number of Blender processes can render different frames
+    of the same capture at once.
+    """
+
+    def __init__(self, universe_store, path, use_timecode=False, start_frame=1):
+        super().__init__(universe_store)
+        self.key = capture_key(path, use_timecode)
+        self.reader = CaptureReader(path)
+        self.use_timecode = use_timecode
+        # scene frame at show time 0
+        self.start_frame = start_frame
+        # universe index: row in the state arrays, in order of first appearance
+        self._rows = {}
+        # show time and file offset of each DMX packet
+        self._times = None
+        self._offsets = None
+        # packet number each snapshot was taken before, and its state rows
+        self._snapshot_packets = []
+        self._snapshots = []
+        self._build_index()
+
+    @property
+    def duration(self):
+        """Show time of the last packet in seconds"""
+        if len(self._times) == 0:
+            return 0.0
+        return max(float(self._times[-1]), 0.0)
+
+    def _dmx_from(self, offset):
+        """Yields (universe index, channel bytes) of the DMX packets from a file offset"""
+        for _timestamp, _offset, packet in self.reader.read_from(offset):
+            # header checks only, sequence numbers would see re-reads as duplicates
+            if self.check_header(packet) is None:
+                dmx = self.read_dmx(packet)
+                if dmx is not None:
+                    yield dmx
+
+    def _build_index(self):
+        rows = self._rows
+        state = numpy.zeros((16, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+        times = []
+        offsets = []
+        clock = None # (show time, timestamp) of the last timecode
+        first_timestamp = None
+        last_time = -math.inf
+        spread = 1 # gap multiplier, doubles each time the snapshots are thinned
+        snapshot_bytes = 0
+        for timestamp, offset, packet in self.reader:
+            if self.is_art_timecode(packet):
+                if self.use_timecode:
+                    clock = (timecode_seconds(packet), timestamp)
+                continue
+            if self.check_header(packet) is not None:
+                continue
+            dmx = self.read_dmx(packet)
+            if dmx is None:
+                continue
+            index, payload = dmx
+
+            if self.use_timecode:
+                # packets before the first timecode set up the opening look
+                show_time = -math.inf if clock is None else clock[0] + timestamp - clock[1]
+            else:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                show_time = timestamp - first_timestamp
+            # a rewound timecode can't go back in time, the index has to stay sorted
+            last_time = max(show_time, last_time)
+
+            count = len(times)
+            gap = max(SNAPSHOT_PACKETS, SNAPSHOT_PACKETS_PER_UNIVERSE * len(rows)) * spread
+            if not self._snapshot_packets or count - self._snapshot_packets[-1] >= gap:
+                self._snapshot_packets.append(count)
+                self._snapshots.append(state[:len(rows)].copy())
+                snapshot_bytes += self._snapshots[-1].nbytes
+                if snapshot_bytes > SNAPSHOT_BUDGET and len(self._snapshots) > 1:
+                    self._snapshot_packets = self._snapshot_packets[::2]
+                    self._snapshots = self._snapshots[::2]
+                    snapshot_bytes = sum(snapshot.nbytes for snapshot in self._snapshots)
+                    spread *= 2
+
+            row = rows.get(index, None)
+            if row is None:
+                row = len(rows)
+                rows[index] = row
+                if row == len(state):
+                    state = numpy.concatenate((state, numpy.zeros_like(state)))
+            state[row, :len(payload)] = payload
+            times.append(last_time)
+            offsets.append(offset)
+        self._times = numpy.array(times, dtype=numpy.float64)
+        self._offsets = numpy.array(offsets, dtype=numpy.int64)
+        if not self._snapshots:
+            self._snapshot_packets.append(0)
+            self._snapshots.append(state[:0].copy())
+
+    def state_at(self, show_time):
+        """Returns {universe index: raw bytes} at a show time in seconds"""
+        # packets at or before the show time
+        count = int(numpy.searchsorted(self._times, show_time, side="right"))
+        snapshot = bisect.bisect_right(self._snapshot_packets, count) - 1
+        first = self._snapshot_packets[snapshot]
+        rows = self._rows
+        state = numpy.zeros((len(rows), CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+        snapshot_rows = self._snapshots[snapshot]
+        state[:len(snapshot_rows)] = snapshot_rows
+        if count > first:
+            remaining = count - first
+            for index, payload in self._dmx_from(int(self._offsets[first])):
+                state[rows[index], :len(payload)] = payload
+                remaining -= 1
+                if remaining == 0:
+                    break
+        return {index: state[row] for index, row in rows.items()}
+
+    def seek(self, show_time):
+        """Publish the universes at a show time in seconds"""
+        store = self.universe_store
+        for index, raw in self.state_at(show_time).items():
+            previous = store.get_raw_universe(index)
+            changed = previous != raw
+            if changed.any():
+                store.publish_universe(index, raw.copy(), changes_to_mask(changed))
+
+    def seek_frame(self, frame, fps):
+        """Publish the universes at a scene frame"""
+        self.seek((frame - self.start_frame) / fps)
+
+    def shutdown(self):
+        """Release the capture"""
+        self.reader.close()
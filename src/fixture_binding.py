@@ -0,0 +1,199 @@
+"""Fixture Binding"""
+
+from .fixture_tables import has_fine
+from .universe_store import channel_mask, CHANNELS_PER_UNIVERSE
+
+# pan/tilt target: (how many parents up, rotation axis)
+ROTATION_TARGETS = {
+    "lx": (0, 0),
+    "ly": (0, 1),
+    "lz": (0, 2),
+    "px": (1, 0),
+    "py": (1, 1),
+    "pz": (1, 2),
+    "gpx": (2, 0),
+    "gpy": (2, 1),
+    "gpz": (2, 2),
+}
+
+# channels read by each color mode, in the order they are decoded
+COLOR_PARAMETERS = {
+    "rgbw": ("red", "green", "blue", "white"),
+    "cmy": ("cyan", "magenta", "yellow"),
+    "wheel": ("color",),
+}
+
+# light types with a direction, and with a spot size
+ROTATING_LIGHT_TYPES = ("SPOT", "AREA")
+ZOOMING_LIGHT_TYPES = ("SPOT",)
+
+
+# most parents up a pan/tilt target can be
+MAX_TARGET_DEPTH = 2
+
+
+def resolve_rotation_target(obj, target):
+    """Returns (object, axis) for a (depth, axis) pan/tilt target, or None
+
+    Walks the light's parents when the value is written rather than
+    when the light is compiled, so a reparented or deleted parent is
+    never written to.
+    """
+    depth, axis = target
+    for _ in range(depth):
+        obj = obj.parent
+        if obj is None:
+            return None
+    return (obj, axis)
+
+
+def parent_chain(obj):
+    """Pointers of the parents a pan/tilt target can reach, nearest first"""
+    chain = []
+    for _ in range(MAX_TARGET_DEPTH):
+        obj = obj.parent
+        if obj is None:
+            break
+        chain.append(obj.as_pointer())
+    return tuple(chain)
+
+
+class FixtureBinding:
+    """A light compiled against its fixture type
+
+    Holds absolute channels, rotation targets as (depth, axis) and the
+    fixture type's tables, which its FixtureGroup gathers into arrays.
+    Rebuilt whenever the light's ArtNet settings or parents change.
+    """
+
+    __slots__ = (
+        "name", "pointer", "obj", "universe", "fixture_type", "base_address",
+        "channels", "mask",
+        "color_mode", "color_channels", "color_table",
+        "dimmer_channel", "dimmer_fine", "dimmer_table",
+        "zoom_channel", "zoom_fine", "zoom_table",
+        "pan_channel", "pan_fine", "pan_table", "pan_target",
+        "tilt_channel", "tilt_fine", "tilt_table", "tilt_target",
+        "reset_targets", "parents",
+    )
+
+    def __init__(self, obj, fixture_type_store):
+        data = obj.data
+        self.name = obj.name
+        self.pointer = obj.as_pointer()
+        self.obj = obj
+        self.universe = data.artnet_universe
+        self.fixture_type = data.artnet_fixture_type
+        # base address is 1-based so subtract 1 from it
+        self.base_address = data.artnet_base_address - 1
+        # the channels this fixture listens to
+        footprint = fixture_type_store.get_footprint(self.fixture_type)
+        self.channels = [channel for channel in
+                         (self.base_address + offset for offset in footprint)
+                         if 0 <= channel < CHANNELS_PER_UNIVERSE]
+        self.mask = channel_mask(self.channels)
+
+        self.color_mode = None
+        self.color_channels = None
+        self.color_table = None
+        self.dimmer_channel = None
+        self.dimmer_fine = None
+        self.dimmer_table = None
+        self.zoom_channel = None
+        self.zoom_fine = None
+        self.zoom_table = None
+        self.pan_channel = None
+        self.pan_fine = None
+        self.pan_table = None
+        self.pan_target = None
+        self.tilt_channel = None
+        self.tilt_fine = None
+        self.tilt_table = None
+        self.tilt_target = None
+        # targets to zero because the pan/tilt target moved elsewhere
+        self.reset_targets = []
+        # the parents when compiled, so the store notices a reparent
+        self.parents = parent_chain(obj)
+
+        fixture_type = fixture_type_store.get_fixture_type(self.fixture_type)
+        if fixture_type is None:
+            return
+        # the fixture type's lookup tables, shared with its other fixtures
+        tables = fixture_type_store.get_tables(self.fixture_type)
+        light_type = data.type
+        self._compile_color(fixture_type, tables)
+        self._compile_dimmer(fixture_type, tables)
+        if light_type in ZOOMING_LIGHT_TYPES:
+            self._compile_zoom(fixture_type, tables)
+        if light_type in ROTATING_LIGHT_TYPES:
+            self._compile_rotation(obj, fixture_type, tables)
+
+    def _channel(self, fixture_type, parameter):
+        """Absolute channel for a parameter, or None if it isn't patched"""
+        offset = fixture_type.get(parameter, None)
+        if offset is None:
+            return None
+        channel = self.base_address + offset
+        if 0 <= channel < CHANNELS_PER_UNIVERSE:
+            return channel
+        return None
+
+    def _parameter(self, fixture_type, parameter):
+        """(channel, fine channel or None), or None if it isn't patched"""
+        channel = self._channel(fixture_type, parameter)
+        if channel is None:
+            return None
+        if not has_fine(fixture_type, parameter):
+            return (channel, None)
+        fine = self._channel(fixture_type, parameter + "Fine")
+        if fine is None:
+            # cut off by the end of the universe, the table needs both channels
+            return None
+        return (channel, fine)
+
+    def _compile_color(self, fixture_type, tables):
+        color_mode = fixture_type.get("colorMode", None)
+        if color_mode not in COLOR_PARAMETERS:
+            return
+        parameters = COLOR_PARAMETERS[color_mode]
+        channels = tuple(self._channel(fixture_type, parameter) for parameter in parameters)
+        if None in channels:
+            return
+        self.color_channels = channels
+        self.color_mode = color_mode
+        self.color_table = tables.color_wheel
+
+    def _compile_dimmer(self, fixture_type, tables):
+        parameter = self._parameter(fixture_type, "dimmer")
+        if parameter is None or tables.dimmer is None:
+            return
+        self.dimmer_channel, self.dimmer_fine = parameter
+        self.dimmer_table = tables.dimmer
+
+    def _compile_zoom(self, fixture_type, tables):
+        parameter = self._parameter(fixture_type, "zoom")
+        if parameter is None:
+            return
+        self.zoom_channel, self.zoom_fine = parameter
+        self.zoom_table = tables.zoom
+
+    def _compile_rotation(self, obj, fixture_type, tables):
+        data = obj.data
+        for old_target in (data.artnet_old_pan_target, data.artnet_old_tilt_target):
+            target = ROTATION_TARGETS.get(old_target, None)
+            if target is not None:
+                self.reset_targets.append(target)
+
+        parameter = self._parameter(fixture_type, "pan")
+        target = ROTATION_TARGETS.get(data.artnet_pan_target, None)
+        if parameter is not None and target is not None:
+            self.pan_channel, self.pan_fine = parameter
+            self.pan_table = tables.pan
+            self.pan_target = target
+
+        parameter = self._parameter(fixture_type, "tilt")
+        target = ROTATION_TARGETS.get(data.artnet_tilt_target, None)
+        if parameter is not None and target is not None:
+            self.tilt_channel, self.tilt_fine = parameter
+            self.tilt_table = tables.tilt
+            self.tilt_target = target
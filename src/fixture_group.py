@@ -0,0 +1,153 @@
+"""Fixture Group"""
+
+import numpy
+
+from .universe_store import CHANNELS_PER_UNIVERSE
+
+# decoded value: (channels of a binding or None, binding's table, write_epsilon key)
+PARAMETERS = (
+    ("color", lambda binding: binding.color_channels, "color_table", "color"),
+    ("energy", lambda binding: _coarse_fine(binding.dimmer_channel, binding.dimmer_fine),
+     "dimmer_table", "energy"),
+    ("spot_size", lambda binding: _coarse_fine(binding.zoom_channel, binding.zoom_fine),
+     "zoom_table", "spot_size"),
+    ("pan", lambda binding: _coarse_fine(binding.pan_channel, binding.pan_fine),
+     "pan_table", "rotation"),
+    ("tilt", lambda binding: _coarse_fine(binding.tilt_channel, binding.tilt_fine),
+     "tilt_table", "rotation"),
+)
+
+
+def _coarse_fine(channel, fine_channel):
+    if channel is None:
+        return None
+    if fine_channel is None:
+        return (channel,)
+    return (channel, fine_channel)
+
+
+# matrix from 0-255 RGBW to 0-1 RGB, white adds a quarter to each of red, green and blue
+RGBW_TO_RGB = numpy.array([
+    [3 / 4, 0, 0],
+    [0, 3 / 4, 0],
+    [0, 0, 3 / 4],
+    [1 / 4, 1 / 4, 1 / 4],
+], dtype=numpy.float32) / 255
+
+
+def _decode_rgbw(values, table):
+    return values @ RGBW_TO_RGB
+
+
+def _decode_cmy(values, table):
+    # each 0-255 filter takes its complementary color away from white
+    return 1 - values * numpy.float32(1 / 255.0)
+
+
+def decode_table(values, table):
+    """Look up 8 or 16-bit DMX values, one row per fixture, in a fixture table"""
+    if values.shape[1] == 1:
+        return table[values[:, 0]]
+    # 16-bit, coarse * 256 + fine
+    return table[values[:, 0].astype(numpy.intp) * 256 + values[:, 1]]
+
+
+COLOR_DECODERS = {
+    "rgbw": _decode_rgbw,
+    "cmy": _decode_cmy,
+    "wheel": decode_table,
+}
+
+
+class FixtureGroup:
+    """Fixtures of one type, decoded together with numpy
+
+    The channels of every parameter of every fixture are columns of one
+    integer matrix into the fixture store's staged universes, so an
+    update gathers all the group's DMX with a single fancy index and
+    decodes it as arrays. Only
+    the RNA writes are left to do one fixture at a time. The values last
+    written are kept per parameter, so writes nobody would see can be
+    skipped.
+    """
+
+    def __init__(self, bindings, universe_slots):
+        self.bindings = bindings
+        # universe index: dirty mask of the channels the group uses
+        self.masks = {}
+        for binding in bindings:
+            self.masks[binding.universe] = self.masks.get(binding.universe, 0) | binding.mask
+        # lights whose old pan/tilt targets are zeroed on the next update
+        self.resets = [binding for binding in bindings if binding.reset_targets]
+        # (name, columns, decoder, table, epsilon key, last written values)
+        self.parameters = []
+        columns = []
+        position = 0
+        for name, get_channels, table_name, epsilon in PARAMETERS:
+            patched = [binding for binding in bindings if get_channels(binding) is not None]
+            if not patched:
+                continue
+            first = patched[0]
+            if name == "color":
+                decoder = COLOR_DECODERS[first.color_mode]
+            else:
+                decoder = decode_table
+            width = len(get_channels(first))
+            # unpatched rows read slot 0, which is never staged so never dirty
+            parameter_channels = numpy.zeros((len(bindings), width), dtype=numpy.intp)
+            for row, binding in enumerate(bindings):
+                channels = get_channels(binding)
+                if channels is not None:
+                    offset = universe_slots[binding.universe] * CHANNELS_PER_UNIVERSE
+                    parameter_channels[row] = [offset + channel for channel in channels]
+            columns.append(parameter_channels)
+            last = numpy.full((len(bindings), 3) if name == "color" else len(bindings),
+                              numpy.nan, dtype=numpy.float32)
+            self.parameters.append((name, slice(position, position + width),
+                                    decoder, getattr(first, table_name), epsilon, last))
+            position += width
+        if columns:
+            self.channels = numpy.concatenate(columns, axis=1)
+        else:
+            # nothing to decode, gather slot 0
+            self.channels = numpy.zeros((len(bindings), 1), dtype=numpy.intp)
+        # first column of each parameter
+        self._starts = numpy.array([parameter[1].start for parameter in self.parameters]
+                                   or [0], dtype=numpy.intp)
+
+    def uses(self, index, changes):
+        """True if the group uses a channel set in a universe's dirty mask"""
+        return self.masks.get(index, 0) & changes != 0
+
+    def evaluate(self, staged_raw, staged_changes, write_epsilon):
+        """Decode the fixtures with channels changed in the staged universes
+
+        staged_raw and staged_changes are the fixture store's copies of
+        the universes that changed, one row per universe slot.
+        Returns (updates, fixtures changed, writes skipped) where updates
+        is a list of (parameter name, rows of bindings, values to write).
+        """
+        values = staged_raw.reshape(-1)[self.channels]
+        dirty = staged_changes.reshape(-1)[self.channels]
+        # a column per parameter, true where any of its channels changed
+        dirty_parameters = numpy.logical_or.reduceat(dirty, self._starts, axis=1)
+        updates = []
+        skipped = 0
+        for parameter, (name, columns, decoder, table, epsilon, last) in enumerate(self.parameters):
+            rows = dirty_parameters[:, parameter].nonzero()[0]
+            if not len(rows):
+                continue
+            decoded = decoder(values[rows, columns], table)
+            difference = numpy.abs(decoded - last[rows])
+            if difference.ndim == 2:
+                difference = difference.max(axis=1)
+            # never written is nan, and nan <= epsilon is false
+            visible = ~(difference <= write_epsilon[epsilon])
+            rows = rows[visible]
+            skipped += len(visible) - len(rows)
+            if not len(rows):
+                continue
+            decoded = decoded[visible]
+            last[rows] = decoded
+            updates.append((name, rows.tolist(), decoded.tolist()))
+        return updates, int(numpy.count_nonzero(dirty_parameters.any(axis=1))), skipped
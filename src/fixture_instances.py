@@ -0,0 +1,158 @@
+"""Fixture Instances"""
+
+import numpy
+
+from .fixture_binding import COLOR_PARAMETERS
+from .fixture_group import COLOR_DECODERS, decode_table
+from .fixture_tables import has_fine
+from .pixel_map import packed_addresses
+from .universe_store import channel_mask, CHANNELS_PER_UNIVERSE
+
+# decoded value: (fixture type channel, table, attribute, data type, foreach_set property)
+# names match the light properties written to individual lights
+INSTANCE_PARAMETERS = (
+    ("energy", "dimmer", "dimmer", "artnet_energy", 'FLOAT', "value"),
+    ("spot_size", "zoom", "zoom", "artnet_spot_size", 'FLOAT', "value"),
+    ("pan", "pan", "pan", "artnet_pan", 'FLOAT', "value"),
+    ("tilt", "tilt", "tilt", "artnet_tilt", 'FLOAT', "value"),
+)
+COLOR_ATTRIBUTE = "artnet_color"
+# attribute: data type, for every attribute the instances can be written to
+ATTRIBUTE_TYPES = dict([(COLOR_ATTRIBUTE, 'FLOAT_COLOR')]
+                       + [(parameter[3], parameter[4]) for parameter in INSTANCE_PARAMETERS])
+
+
+def add_instance_attributes(mesh):
+    """Give a mesh the point attributes its instances are written to
+
+    Called when the mesh is switched to instances rather than when it's
+    compiled, as changing attributes from a depsgraph handler would update
+    the depsgraph again.
+    """
+    attributes = mesh.attributes
+    for name, data_type in ATTRIBUTE_TYPES.items():
+        attribute = attributes.get(name, None)
+        if attribute is not None:
+            if attribute.domain == 'POINT' and attribute.data_type == data_type:
+                continue
+            attributes.remove(attribute)
+        attributes.new(name, data_type, 'POINT')
+
+
+class FixtureInstances:
+    """Identical fixtures shown as the vertices of one mesh
+
+    Each vertex is a fixture of the mesh's fixture type, patched back to
+    back from its universe and address. Geometry nodes instance the
+    fixture model on the points and read its color, energy, spot size,
+    pan and tilt from point attributes. Like a FixtureGroup the channels
+    of every instance are one integer matrix into the fixture store's
+    staged universes, but the decoded values go to Blender with one
+    foreach_set per attribute, so the cost doesn't grow with the number
+    of fixtures. Rebuilt whenever the mesh's ArtNet settings or vertex
+    count change.
+    """
+
+    def __init__(self, obj, fixture_type_store, universe_slot):
+        mesh = obj.data
+        self.name = obj.name
+        self.pointer = obj.as_pointer()
+        self.obj = obj
+        self.fixture_type = mesh.artnet_fixture_type
+        self.count = len(mesh.vertices)
+        # (name, columns, decoder, table, attribute, foreach_set property)
+        self.parameters = []
+
+        fixture_type = fixture_type_store.get_fixture_type(self.fixture_type)
+        footprint = fixture_type_store.get_footprint(self.fixture_type)
+        # room for every channel, wider if the desk patched them further apart
+        spacing = max(mesh.artnet_fixture_spacing, footprint[-1] + 1 if footprint else 1)
+        instance_universes, first_channels = packed_addresses(
+            self.count, mesh.artnet_universe, mesh.artnet_base_address, spacing)
+        universes = numpy.unique(instance_universes)
+        self.universes = universes.tolist() or [mesh.artnet_universe]
+
+        offsets = []
+        if fixture_type is not None:
+            tables = fixture_type_store.get_tables(self.fixture_type)
+            offsets = self._compile_parameters(fixture_type, tables)
+        offsets = numpy.array(offsets, dtype=numpy.intp)
+
+        # universe index: dirty mask of the channels the instances use
+        self.masks = {}
+        for universe in universes.tolist():
+            in_universe = instance_universes == universe
+            channels = (first_channels[in_universe, None] + offsets).ravel()
+            self.masks[universe] = channel_mask(channels.tolist())
+
+        slots = numpy.array([universe_slot(universe) for universe in universes.tolist()],
+                            dtype=numpy.intp)
+        starts = slots[numpy.searchsorted(universes, instance_universes)] \
+            * CHANNELS_PER_UNIVERSE + first_channels
+        self.channels = starts[:, None] + offsets
+        # parameters without a usable attribute aren't written
+        self.parameters = [parameter for parameter in self.parameters
+                           if self._has_attribute(mesh, parameter[4])]
+
+    def _compile_parameters(self, fixture_type, tables):
+        """Add the parameters the fixture type has, returns their channel offsets"""
+        offsets = []
+        color_mode = fixture_type.get("colorMode", None)
+        if color_mode in COLOR_PARAMETERS:
+            color = [fixture_type.get(parameter, None)
+                     for parameter in COLOR_PARAMETERS[color_mode]]
+            if None not in color:
+                self.parameters.append(("color", slice(0, len(color)),
+                                        COLOR_DECODERS[color_mode], tables.color_wheel,
+                                        COLOR_ATTRIBUTE, "color"))
+                offsets += color
+        for name, channel, table_name, attribute, _, foreach in INSTANCE_PARAMETERS:
+            table = getattr(tables, table_name)
+            if fixture_type.get(channel, None) is None or table is None:
+                continue
+            channels = [fixture_type[channel]]
+            if has_fine(fixture_type, channel):
+                channels.append(fixture_type[channel + "Fine"])
+            self.parameters.append((name, slice(len(offsets), len(offsets) + len(channels)),
+                                    decode_table, table, attribute, foreach))
+            offsets += channels
+        return offsets
+
+    @staticmethod
+    def _has_attribute(mesh, name):
+        attribute = mesh.attributes.get(name, None)
+        return (attribute is not None and attribute.domain == 'POINT'
+                and attribute.data_type == ATTRIBUTE_TYPES[name])
+
+    def needs_rebuild(self):
+        """True if vertices were added or deleted since it was compiled"""
+        return len(self.obj.data.vertices) != self.count
+
+    def uses(self, index, changes):
+        """True if the instances use a channel set in a universe's dirty mask"""
+        return self.masks.get(index, 0) & changes != 0
+
+    def apply(self, staged_raw, staged_changes):
+        """Write the parameters with changed channels, returns the instances updated"""
+        values = staged_raw.reshape(-1)[self.channels]
+        dirty = staged_changes.reshape(-1)[self.channels]
+        mesh = self.obj.data
+        attributes = mesh.attributes
+        written = False
+        for name, columns, decoder, table, attribute_name, foreach in self.parameters:
+            if not dirty[:, columns].any():
+                continue
+            attribute = attributes.get(attribute_name, None)
+            if attribute is None or len(attribute.data) != self.count:
+                continue
+            decoded = decoder(values[:, columns], table)
+            if name == "color":
+                # color attributes are RGBA
+                decoded = numpy.concatenate(
+                    (decoded, numpy.ones((self.count, 1), dtype=numpy.float32)), axis=1)
+            attribute.data.foreach_set(foreach, numpy.ascontiguousarray(decoded).reshape(-1))
+            written = True
+        if not written:
+            return 0
+        mesh.update()
+        return self.count
@@ -0,0 +1,332 @@
+"""Fixture Library"""
+
+import hashlib
+import io
+import json
+import os
+import pickle
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+from .fixture_type_store import compile_fixture_type
+
+# bump when the compiled form changes, so old caches are ignored
+CACHE_VERSION = 1
+CACHE_INDEX = "index.json"
+
+# GDTF attribute: fixture type channel
+GDTF_ATTRIBUTES = {
+    "Pan": "pan",
+    "Tilt": "tilt",
+    "Dimmer": "dimmer",
+    "Zoom": "zoom",
+    "ColorAdd_R": "red",
+    "ColorAdd_G": "green",
+    "ColorAdd_B": "blue",
+    "ColorAdd_W": "white",
+    "ColorRGB_Red": "red",
+    "ColorRGB_Green": "green",
+    "ColorRGB_Blue": "blue",
+    "ColorSub_C": "cyan",
+    "ColorSub_M": "magenta",
+    "ColorSub_Y": "yellow",
+    "Color1": "color",
+}
+# fixture type channels that can have a second, fine channel
+FINE_PARAMETERS = ("panFine", "tiltFine", "zoomFine", "dimmerFine")
+# fixture type channel: keys of its lowest and highest angles, in degrees
+GDTF_RANGES = {
+    "pan": "panRange",
+    "tilt": "tiltRange",
+    "zoom": ("minZoom", "maxZoom"),
+}
+
+
+def parse_json(content):
+    """Fixture types from a JSON file mapping names to fixture types
+
+    Fixture types take the same keys as the built-in ones, angles in degrees.
+    """
+    fixture_types = json.loads(content)
+    if not isinstance(fixture_types, dict):
+        raise ValueError("expected an object of named fixture types")
+    for fixture_type in fixture_types.values():
+        if "colorWheel" in fixture_type:
+            # JSON keys are always strings
+            fixture_type["colorWheel"] = {int(start): color for start, color
+                                          in fixture_type["colorWheel"].items()}
+    return fixture_types
+
+
+def _dmx_value(text):
+    """DMX value from GDTF's value/bytes form, scaled to 8 bits"""
+    value, _, size = text.partition("/")
+    value = int(value)
+    if size and int(size) > 1:
+        value >>= 8 * (int(size) - 1)
+    return value
+
+
+def _xyy_to_rgb(text):
+    """sRGB, brightest channel at 1, from a GDTF CIE xyY color"""
+    x, y, _ = (float(part) for part in text.split(","))
+    if y <= 0:
+        return [1.0, 1.0, 1.0]
+    big_x = x / y
+    big_z = (1 - x - y) / y
+    rgb = [
+        3.2406 * big_x - 1.5372 - 0.4986 * big_z,
+        -0.9689 * big_x + 1.8758 + 0.0415 * big_z,
+        0.0557 * big_x - 0.2040 + 1.0570 * big_z,
+    ]
+    rgb = [max(channel, 0.0) for channel in rgb]
+    brightest = max(rgb) or 1.0
+    return [channel / brightest for channel in rgb]
+
+
+def parse_gdtf(content):
+    """Fixture types from a GDTF file, one per DMX mode, named fixture@mode"""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        root = ElementTree.fromstring(archive.read("description.xml"))
+    fixture = root.find("FixtureType")
+    if fixture is None:
+        raise ValueError("no FixtureType in description.xml")
+    name = fixture.get("Name", "")
+    wheels = {}
+    for wheel in fixture.iter("Wheel"):
+        wheels[wheel.get("Name")] = [_xyy_to_rgb(slot.get("Color", "0.3127,0.3290,100"))
+                                     for slot in wheel.iter("Slot")]
+    lumens = None
+    for beam in fixture.iter("Beam"):
+        if beam.get("LuminousFlux", None) is not None:
+            lumens = float(beam.get("LuminousFlux"))
+            break
+
+    fixture_types = {}
+    for mode in fixture.iter("DMXMode"):
+        fixture_type = {}
+        if lumens is not None:
+            fixture_type["lumens"] = lumens
+        for channel in mode.iter("DMXChannel"):
+            offsets = channel.get("Offset", "")
+            logical = channel.find("LogicalChannel")
+            if not offsets or logical is None:
+                # virtual channels have no offset
+                continue
+            parameter = GDTF_ATTRIBUTES.get(logical.get("Attribute", ""), None)
+            if parameter is None or parameter in fixture_type:
+                continue
+            offsets = [int(offset) - 1 for offset in offsets.split(",")]
+            fixture_type[parameter] = offsets[0]
+            if len(offsets) > 1 and parameter + "Fine" in FINE_PARAMETERS:
+                fixture_type[parameter + "Fine"] = offsets[1]
+            function = logical.find("ChannelFunction")
+            if function is None:
+                continue
+            _add_range(fixture_type, parameter, function)
+            if parameter == "color":
+                _add_wheel(fixture_type, function, wheels)
+        if {"red", "green", "blue", "white"} <= fixture_type.keys():
+            fixture_type["colorMode"] = "rgbw"
+        elif {"cyan", "magenta", "yellow"} <= fixture_type.keys():
+            fixture_type["colorMode"] = "cmy"
+        elif "colorWheel" in fixture_type:
+            fixture_type["colorMode"] = "wheel"
+        fixture_types["{}@{}".format(name, mode.get("Name", ""))] = fixture_type
+    return fixture_types
+
+
+def _add_range(fixture_type, parameter, function):
+    keys = GDTF_RANGES.get(parameter, None)
+    if keys is None:
+        return
+    low = float(function.get("PhysicalFrom", 0))
+    high = float(function.get("PhysicalTo", 1))
+    if isinstance(keys, str):
+        fixture_type[keys] = abs(high - low)
+        return
+    fixture_type[keys[0]] = min(low, high)
+    fixture_type[keys[1]] = max(low, high)
+    if high < low:
+        fixture_type["zoom_invert"] = True
+
+
+def _add_wheel(fixture_type, function, wheels):
+    slots = wheels.get(function.get("Wheel", None), None)
+    if not slots:
+        return
+    wheel = {}
+    for channel_set in function.iter("ChannelSet"):
+        index = int(channel_set.get("WheelSlotIndex", 0))
+        if 1 <= index <= len(slots):
+            wheel.setdefault(_dmx_value(channel_set.get("DMXFrom", "0")), slots[index - 1])
+    if wheel:
+        fixture_type["colorWheel"] = wheel
+
+
+PARSERS = {
+    ".json": parse_json,
+    ".gdtf": parse_gdtf,
+}
+
+
+class FixtureLibrary:
+    """Fixture types from a directory of JSON or GDTF files
+
+    Each file's types are compiled to their runtime form and pickled to
+    the cache directory under the file's SHA-1. The cache index keeps
+    each file's mtime and size, so at startup an unchanged file is only
+    stat'ed, a touched one is hashed and only a changed one is parsed.
+    Cached types are unpickled the first time a light asks for one of
+    them.
+    """
+
+    def __init__(self, directory, cache_directory):
+        self.directory = directory
+        self.cache_directory = cache_directory
+        self._sources = {} # map of file name: {"mtime", "size", "hash", "types"}
+        self._type_files = {} # map of fixture type name: file name
+        self._loaded = {} # map of file hash: map of name: compiled fixture type
+        self.scan()
+
+    @property
+    def fixture_type_names(self):
+        """Returns the names of the fixture types in the library"""
+        return self._type_files.keys()
+
+    def scan(self):
+        """Find the library's files, compiling the ones that changed"""
+        index = self._read_index()
+        sources = {}
+        for file_name in sorted(os.listdir(self.directory)):
+            extension = os.path.splitext(file_name)[1].lower()
+            if extension not in PARSERS:
+                continue
+            source = self._scan_file(file_name, index.get(file_name, None))
+            if source is not None:
+                sources[file_name] = source
+        self._sources = sources
+        self._type_files = {}
+        for file_name, source in sources.items():
+            for name in source["types"]:
+                # files are scanned in name order, the first one wins
+                self._type_files.setdefault(name, file_name)
+        if sources != index:
+            self._write_index(sources)
+            self._remove_unused_cache_files()
+
+    def _scan_file(self, file_name, cached):
+        path = os.path.join(self.directory, file_name)
+        stat = os.stat(path)
+        if cached is not None and cached["mtime"] == stat.st_mtime_ns \
+                and cached["size"] == stat.st_size and self._is_cached(cached["hash"]):
+            return cached
+        with open(path, "rb") as file:
+            content = file.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if cached is not None and cached["hash"] == digest and self._is_cached(digest):
+            # touched but not changed
+            names = cached["types"]
+        else:
+            names = sorted(self._compile(file_name, content, digest))
+        return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": digest, "types": names}
+
+    def _compile(self, file_name, content, digest):
+        """Parse and compile a file's types, and cache them"""
+        extension = os.path.splitext(file_name)[1].lower()
+        try:
+            compiled = {name: compile_fixture_type(fixture_type) for name, fixture_type
+                        in PARSERS[extension](content).items()}
+        except Exception as err:
+            # cached empty, so it isn't parsed again until it changes
+            print("skipping fixture file", file_name, err)
+            compiled = {}
+        self._write_cache(digest, compiled)
+        self._loaded[digest] = compiled
+        return compiled
+
+    def load(self, name):
+        """Returns (fixture type, footprint, tables) for a fixture type, or None"""
+        file_name = self._type_files.get(name, None)
+        if file_name is None:
+            return None
+        digest = self._sources[file_name]["hash"]
+        compiled = self._loaded.get(digest, None)
+        if compiled is None:
+            compiled = self._read_cache(digest)
+            if compiled is None:
+                # the cache went missing or can't be read, compile the file again
+                try:
+                    with open(os.path.join(self.directory, file_name), "rb") as file:
+                        compiled = self._compile(file_name, file.read(), digest)
+                except OSError as err:
+                    print("error while reading fixture file", file_name, err)
+                    return None
+            self._loaded[digest] = compiled
+        return compiled.get(name, None)
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_directory, digest + ".pickle")
+
+    def _is_cached(self, digest):
+        return os.path.exists(self._cache_path(digest))
+
+    def _read_cache(self, digest):
+        try:
+            with open(self._cache_path(digest), "rb") as file:
+                return pickle.load(file)
+        except OSError:
+            return None
+        except Exception as err:
+            # e.g. written by another version of the add-on
+            print("error while reading fixture cache", err)
+            return None
+
+    def _write_cache(self, digest, compiled):
+        try:
+            with open(self._cache_path(digest), "wb") as file:
+                pickle.dump(compiled, file, pickle.HIGHEST_PROTOCOL)
+        except OSError as err:
+            print("error while writing fixture cache", err)
+
+    def _index_path(self):
+        # one index per library directory, sharing the cached types
+        key = hashlib.sha1(os.path.abspath(self.directory).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_directory, key + "." + CACHE_INDEX)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if index.get("version", None) != CACHE_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def _write_index(self, sources):
+        try:
+            with open(self._index_path(), "w", encoding="utf-8") as file:
+                json.dump({"version": CACHE_VERSION, "files": sources}, file)
+        except OSError as err:
+            print("error while writing fixture cache", err)
+
+    def _remove_unused_cache_files(self):
+        """Delete the compiled files no library index refers to"""
+        used = set()
+        for file_name in os.listdir(self.cache_directory):
+            if file_name.endswith("." + CACHE_INDEX):
+                try:
+                    with open(os.path.join(self.cache_directory, file_name), "r",
+                              encoding="utf-8") as file:
+                        index = json.load(file)
+                except (OSError, ValueError):
+                    continue
+                used.update(source["hash"] for source in index.get("files", {}).values())
+        for file_name in os.listdir(self.cache_directory):
+            digest, extension = os.path.splitext(file_name)
+            if extension == ".pickle" and digest not in used:
+                try:
+                    os.remove(os.path.join(self.cache_directory, file_name))
+                except OSError:
+                    pass
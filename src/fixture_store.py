@@ -1,82 +1,316 @@
 """Fixture Store"""
 
 import bpy
+import numpy
+
+from .fixture_binding import FixtureBinding, parent_chain
+from .fixture_group import FixtureGroup
+from .fixture_instances import FixtureInstances
+from .pixel_map import PixelMap
+from .universe_store import CHANNELS_PER_UNIVERSE, mask_to_changes
+
+# object types that can be mapped to ArtNet
+FIXTURE_OBJECT_TYPES = ('LIGHT', 'MESH')
 
 class FixtureStore:
-    """Stores the fixtures mapped to Blender lights"""
+    """Stores the fixtures mapped to Blender lights, and the meshes showing pixels or fixtures
 
-    def __init__(self):
-        self.load_objects_from_scene()
+    Fixtures are keyed by object pointer, so finding an object's binding
+    is a dict lookup and renaming an object doesn't lose it.
+    """
 
-    _fixture_universes = {} # map of universe: map of name:fixture
-    _universe_fixtures = {} # map of universe: map of channel:fixture
+    def __init__(self, fixture_type_store, universe_store=None):
+        self.fixture_type_store = fixture_type_store
+        # told which universes have lights, so the receiver can skip the rest
+        self.universe_store = universe_store
+        self._bindings = {} # map of object pointer: binding
+        self._fixture_universes = {} # map of universe: map of object pointer:binding
+        self._meshes = {} # map of object pointer: PixelMap or FixtureInstances
+        self._patched_universes = frozenset() # universes with lights or meshes
+        self._groups = {} # map of fixture type: group
+        self._stale_groups = set() # fixture types whose groups are rebuilt on next use
+        self._children = {} # map of parent pointer: set of pointers of lights below it
+        self._reset_staging()
+        self.load_objects_from_scene()
 
     def load_objects_from_scene(self):
         """Find the ArtNet enabled objects in the scene"""
+        self._bindings = {}
+        self._fixture_universes = {}
+        self._meshes = {}
+        self._groups = {}
+        self._stale_groups = set()
+        self._children = {}
+        self._reset_staging()
         objects = bpy.context.scene.objects
         for obj in objects:
-            if obj.data and "artnet_enabled" in obj.data and obj.data.artnet_enabled:
+            # type is the cheapest test, most objects in a venue aren't lights
+            if obj.type in FIXTURE_OBJECT_TYPES and obj.data is not None \
+                    and obj.data.artnet_enabled:
                 self._add_object(obj)
+        self._publish_universes()
+
+    def _publish_universes(self):
+        """Subscribe the universe store to the universes that have lights or meshes"""
+        self._patched_universes = frozenset(
+            [index for index, fixtures in self._fixture_universes.items() if fixtures]
+            + [index for mesh in self._meshes.values() for index in mesh.universes])
+        if self.universe_store is not None:
+            self.universe_store.subscribe(self._patched_universes)
 
     @property
     def fixture_universe_ids(self):
-        """Returns a list of universe ids which have fixtures defined"""
-        return self._fixture_universes.keys()
+        """Returns the ids of the universes which have lights or meshes patched"""
+        return self._patched_universes
+
+    def _reset_staging(self):
+        self._universe_slots = {} # map of universe: row in the staged universes
+        # copies of the universes changed this tick, for the groups to gather from
+        # row 0 is never staged, unpatched parameters read it
+        self.staged_raw = numpy.zeros((1, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+        self.staged_changes = numpy.zeros((1, CHANNELS_PER_UNIVERSE), dtype=bool)
+        self._staged = []
+
+    def _add_universe_slot(self, index):
+        """Get a universe's row in the staged universes, adding it if needed"""
+        slot = self._universe_slots.get(index, None)
+        if slot is not None:
+            return slot
+        slot = len(self.staged_raw)
+        self._universe_slots[index] = slot
+        # slots are never reused, so groups built earlier stay valid
+        self.staged_raw = numpy.concatenate(
+            (self.staged_raw, numpy.zeros((1, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)))
+        self.staged_changes = numpy.concatenate(
+            (self.staged_changes, numpy.zeros((1, CHANNELS_PER_UNIVERSE), dtype=bool)))
+        return slot
+
+    def stage_universe(self, index, raw_universe, changes):
+        """Copy in a universe's data and dirty mask for the groups to decode"""
+        slot = self._universe_slots.get(index, None)
+        if slot is None:
+            return
+        self.staged_raw[slot] = raw_universe
+        self.staged_changes[slot] = mask_to_changes(changes)
+        self._staged.append(slot)
 
-    def get_fixtures_for_universe(self, index):
-        """Get the fixtures defined for a particular universe"""
-        return self._fixture_universes[index]
+    def clear_staged(self):
+        """Mark the staged universes as decoded"""
+        for slot in self._staged:
+            self.staged_changes[slot] = False
+        self._staged = []
+
+    def get_groups(self):
+        """Get the fixtures grouped by fixture type"""
+        if self._stale_groups:
+            self._build_groups()
+        return self._groups.values()
+
+    def _build_groups(self):
+        fixture_types = {fixture_type: [] for fixture_type in self._stale_groups}
+        self._stale_groups = set()
+        for binding in self._bindings.values():
+            bindings = fixture_types.get(binding.fixture_type, None)
+            if bindings is not None:
+                bindings.append(binding)
+        for fixture_type, bindings in fixture_types.items():
+            if bindings:
+                self._groups[fixture_type] = FixtureGroup(bindings, self._universe_slots)
+            else:
+                self._groups.pop(fixture_type, None)
+
+    def get_meshes(self):
+        """Get the meshes showing pixels or fixture instances"""
+        return self._meshes.values()
+
+    def get_mesh(self, obj: bpy.types.Object):
+        """Get the PixelMap or FixtureInstances for a particular scene object, or None"""
+        return self._meshes.get(obj.as_pointer(), None)
 
     def get_universe(self, obj: bpy.types.Object):
         """Get the universe index for a particular scene object"""
-        for universe_index in self._fixture_universes:
-            universe = self._fixture_universes[universe_index]
-            for name in universe:
-                if obj == universe[name]["object"]:
-                    # found it
-                    return universe_index
-        # didn't find it
-        return None
-
-    def remove_object_by_name(self, name):
-        """Remove a particular scene object"""
-        for universe_index in self._fixture_universes:
-            universe = self._fixture_universes[universe_index]
-            if name in universe:
-                del universe[name] # for safety look in all universes
+        binding = self._bindings.get(obj.as_pointer(), None)
+        if binding is None:
+            return None
+        return binding.universe
 
     def _remove_object(self, obj: bpy.types.Object):
         """Remove a particular scene object"""
-        for universe_index in self._fixture_universes:
-            universe = self._fixture_universes[universe_index]
-            for name in universe:
-                if obj == universe[name]["object"]:
-                    # found it
-                    del universe[name]
-                    return
+        return self._remove_pointer(obj.as_pointer())
+
+    def _remove_pointer(self, pointer):
+        """Remove an object by pointer, returns the universe it was in"""
+        binding = self._bindings.pop(pointer, None)
+        if binding is None:
+            return self._remove_mesh(pointer)
+        universe = self._fixture_universes.get(binding.universe, None)
+        if universe is not None:
+            universe.pop(pointer, None)
+        for parent in binding.parents:
+            children = self._children.get(parent, None)
+            if children is not None:
+                children.discard(pointer)
+                if not children:
+                    del self._children[parent]
+        self._stale_groups.add(binding.fixture_type)
+        return binding.universe
+
+    def _remove_mesh(self, pointer):
+        """Remove a mesh by pointer, returns its first universe"""
+        mesh = self._meshes.pop(pointer, None)
+        if mesh is None:
+            return None
+        return mesh.universes[0]
 
     def _add_object(self, obj: bpy.types.Object):
         """Add a scene object"""
         if obj.data.artnet_universe is None:
             return
+        pointer = obj.as_pointer()
+        # the universe may have changed, so drop the old binding wherever it is
+        self._remove_pointer(pointer)
+        if obj.type == 'MESH':
+            self._add_mesh(obj)
+            return
         if not obj.data.artnet_universe in self._fixture_universes:
             self._fixture_universes[obj.data.artnet_universe] = {}
-        # universe:fixture
-        universe = self._fixture_universes[obj.data.artnet_universe]
-        fixture = {}
-        fixture["object"] = obj
-        fixture["fixture_type"] = obj.data.artnet_fixture_type
-        # base address is 1-based so subtract 1 from it
-        fixture["base_address"] = obj.data.artnet_base_address - 1
-        universe[obj.name] = fixture
+            self._add_universe_slot(obj.data.artnet_universe)
         obj.rotation_mode = "XYZ"
-        # universe:channel:fixture
-    #    universe = self._universe_fixtures[obj.data.artnet_universe]
-    #    if obj.data.artnet_fixture_type is not None:
+        # compile the light against its fixture type once, not every tick
+        fixture = FixtureBinding(obj, self.fixture_type_store)
+        self._bindings[pointer] = fixture
+        # universe:fixture
+        self._fixture_universes[obj.data.artnet_universe][pointer] = fixture
+        for parent in fixture.parents:
+            self._children.setdefault(parent, set()).add(pointer)
+        self._stale_groups.add(fixture.fixture_type)
 
+    def _add_mesh(self, obj: bpy.types.Object):
+        """Add a mesh showing pixels or fixture instances"""
+        if obj.data.artnet_mesh_mode == 'INSTANCES':
+            mesh = FixtureInstances(obj, self.fixture_type_store, self._add_universe_slot)
+        else:
+            mesh = PixelMap(obj, self._add_universe_slot)
+        self._meshes[mesh.pointer] = mesh
 
     def update_object(self, obj: bpy.types.Object):
         """Update an object in our store after it was changed in the UI"""
         self._remove_object(obj)
         if obj.data.artnet_enabled:
             self._add_object(obj)
+        self._publish_universes()
+
+    def update_from_depsgraph(self, scene, depsgraph):
+        """Follow lights added, renamed and deleted since the last depsgraph update
+
+        Only looks at the objects the depsgraph says were updated, and at
+        the bound lights when a scene or collection changed.
+        Returns the universes whose fixtures changed.
+        """
+        changed = set()
+        linking_changed = False
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Object):
+                if id_data.type in FIXTURE_OBJECT_TYPES:
+                    self._track_object(id_data, changed)
+                children = self._children.get(id_data.as_pointer(), None)
+                if children:
+                    # a pan/tilt target may have been moved under another parent
+                    self._track_children(children, changed)
+            elif isinstance(id_data, (bpy.types.Scene, bpy.types.Collection)):
+                # objects may have been added to or deleted from the scene
+                linking_changed = True
+        if linking_changed:
+            # an object may be deleted and another added in the same update,
+            # so the bindings are checked even when the count is the same
+            changed |= self._remove_missing_objects(scene)
+        if changed:
+            self._publish_universes()
+        return changed
+
+    def _track_object(self, obj, changed):
+        pointer = obj.as_pointer()
+        binding = self._bindings.get(pointer, None) or self._meshes.get(pointer, None)
+        if binding is None:
+            # new, e.g. duplicated from a light that has ArtNet enabled
+            if obj.data is not None and obj.data.artnet_enabled:
+                self._add_object(obj)
+                changed.add(obj.data.artnet_universe)
+                if pointer in self._meshes:
+                    changed.update(self._meshes[pointer].universes)
+            return
+        if binding.name != obj.name:
+            binding.name = obj.name
+        if obj.type == 'MESH':
+            if binding.needs_rebuild():
+                # vertices were added or deleted, so compile it again
+                self._add_object(obj)
+                changed.update(self._meshes[pointer].universes)
+        else:
+            self._check_parents(obj, binding, changed)
+
+    def _track_children(self, children, changed):
+        for pointer in list(children):
+            binding = self._bindings[pointer]
+            try:
+                self._check_parents(binding.obj, binding, changed)
+            except ReferenceError:
+                # freed, dropped when the scene's update comes through
+                pass
+
+    def _check_parents(self, obj, binding, changed):
+        """Compile a light again if its parents changed since it was compiled
+
+        The targets are found when written, this is so the new parent is
+        sent the light's current pan/tilt rather than waiting for it to change.
+        """
+        if parent_chain(obj) != binding.parents:
+            self._add_object(obj)
+            changed.add(binding.universe)
+
+    def recheck_objects(self, pointers):
+        """Drop the bindings and meshes in pointers whose objects were deleted
+
+        Any still in the scene are compiled again. Returns the universes
+        whose fixtures changed.
+        """
+        objects = bpy.context.scene.objects
+        changed = set()
+        for pointer in pointers:
+            binding = self._bindings.get(pointer, None) or self._meshes.get(pointer, None)
+            if binding is None:
+                continue
+            found = self._find_object(objects, pointer, binding)
+            if found is None:
+                changed.add(self._remove_pointer(pointer))
+            elif found.data is not None and found.data.artnet_enabled:
+                self._add_object(found)
+                changed.add(found.data.artnet_universe)
+        if changed:
+            self._publish_universes()
+        return changed
+
+    @staticmethod
+    def _find_object(objects, pointer, binding):
+        """The scene object a binding or mesh was compiled from, or None if it's gone"""
+        try:
+            found = objects.get(binding.obj.name, None)
+        except ReferenceError:
+            # Blender freed the object
+            return None
+        if found is None or found.as_pointer() != pointer:
+            return None
+        return found
+
+    def _remove_missing_objects(self, scene):
+        objects = scene.objects
+        changed = set()
+        for pointer, binding in list(self._bindings.items()) + list(self._meshes.items()):
+            found = self._find_object(objects, pointer, binding)
+            if found is None:
+                changed.add(self._remove_pointer(pointer))
+            elif pointer in self._bindings:
+                # deleting a parent moves its children up
+                self._check_parents(found, binding, changed)
+        return changed
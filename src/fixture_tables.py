@@ -0,0 +1,98 @@
+"""Fixture Tables"""
+
+import numpy
+
+# DMX values a parameter can take with one channel, and with a fine channel
+COARSE_VALUES = 256
+FINE_VALUES = 65536
+
+# 0-1 level to 0-1 light output, picked by a fixture type's dimmerCurve
+DIMMER_CURVES = {
+    "linear": lambda level: level,
+    "square": lambda level: level * level,
+    "inverseSquare": lambda level: 1 - (1 - level) ** 2,
+    "sCurve": lambda level: level * level * (3 - 2 * level),
+}
+
+# lumens to Blender watts
+LUMENS_PER_WATT = 6.83
+
+
+def has_fine(fixture_type, parameter):
+    """True if a fixture type patches a fine channel for a parameter"""
+    return fixture_type.get(parameter + "Fine", None) is not None
+
+
+def _levels(fine):
+    """0-1 level for every DMX value"""
+    size = FINE_VALUES if fine else COARSE_VALUES
+    return numpy.arange(size, dtype=numpy.float64) / (size - 1)
+
+
+def _freeze(table):
+    # shared by every fixture of the type, and written to Blender as is
+    table = table.astype(numpy.float32)
+    table.flags.writeable = False
+    return table
+
+
+def wheel_table(wheel):
+    """RGB for every DMX value of a color wheel, shape (256, 3)
+
+    wheel maps the first DMX value of each slot to its color. Values
+    below the first slot show the first color.
+    """
+    starts = sorted(wheel)
+    colors = numpy.array([wheel[start] for start in starts], dtype=numpy.float64)
+    slots = numpy.searchsorted(starts, numpy.arange(COARSE_VALUES), side="right") - 1
+    return _freeze(colors[numpy.maximum(slots, 0)])
+
+
+class FixtureTables:
+    """A fixture type's Blender values for every DMX value
+
+    Compiled once per fixture type and shared by all of its fixtures, so
+    decoding a parameter is indexing a table with the raw DMX value.
+    Parameters with a fine channel get a 65536 entry table, indexed by
+    coarse * 256 + fine. Ranges are expected in radians.
+    """
+
+    __slots__ = ("color_wheel", "dimmer", "zoom", "pan", "tilt")
+
+    def __init__(self, fixture_type):
+        self.color_wheel = None
+        self.dimmer = None
+        self.zoom = None
+        self.pan = None
+        self.tilt = None
+
+        if fixture_type.get("colorMode", None) == "wheel":
+            self.color_wheel = wheel_table(fixture_type["colorWheel"])
+
+        if "lumens" in fixture_type:
+            curve = DIMMER_CURVES[fixture_type.get("dimmerCurve", "linear")]
+            levels = _levels(has_fine(fixture_type, "dimmer"))
+            self.dimmer = _freeze(curve(levels) * (fixture_type["lumens"] / LUMENS_PER_WATT))
+
+        min_zoom = fixture_type.get("minZoom", 0)
+        max_zoom = fixture_type.get("maxZoom", numpy.pi / 2)
+        levels = _levels(has_fine(fixture_type, "zoom"))
+        if fixture_type.get("zoom_invert", False):
+            self.zoom = _freeze(max_zoom + levels * (min_zoom - max_zoom))
+        else:
+            self.zoom = _freeze(min_zoom + levels * (max_zoom - min_zoom))
+
+        # centred, so DMX half way points the light straight ahead
+        pan_range = fixture_type.get("panRange", 2 * numpy.pi)
+        self.pan = _freeze((_levels(has_fine(fixture_type, "pan")) - 0.5) * pan_range)
+        tilt_range = fixture_type.get("tiltRange", 2 * numpy.pi)
+        self.tilt = _freeze((_levels(has_fine(fixture_type, "tilt")) - 0.5) * tilt_range)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        # the fixture library's cache is unpickled writeable
+        for name in self.__slots__:
+            table = state[name]
+            setattr(self, name, None if table is None else _freeze(table))
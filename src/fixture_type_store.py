@@ -2,76 +2,158 @@
 
 import math
 
-class FixtureTypeStore:
-    """Stores the fixture types from which to map the dmx data"""
-
-    def __init__(self):
-        for fixture_type in self._fixture_types:
-            f_t = self._fixture_types[fixture_type]
-            # convert degrees to radians so we don't do this every frame
-            f_t["panRange"] = math.radians(f_t["panRange"])
-            f_t["tiltRange"] = math.radians(f_t["tiltRange"])
-            f_t["minZoom"] = math.radians(f_t["minZoom"])
-            f_t["maxZoom"] = math.radians(f_t["maxZoom"])
-
-    # TODO: load these from a public store or provide a UI to edit them
-    _fixture_types = {
-        "wash": {
-            "colorMode": "rgbw",
-            "red": 4,
-            "green": 6,
-            "blue": 8,
-            "white": 10,
-            "pan": 0,
-            "tilt": 2,
-            "zoom": 15,
-            "dimmer": 13,
-            "panRange": 623,
-            "tiltRange": 295,
-            "minZoom": 7,
-            "maxZoom": 50,
-            "lumens": 5085
-        },
-        "spot": {
-            "colorMode": "cmy",
-            "cyan": 8,
-            "magenta": 9,
-            "yellow": 10,
-            "pan": 0,
-            "tilt": 2,
-            "zoom": 24,
-            "dimmer": 30,
-            "panRange": 540,
-            "tiltRange": 270,
-            "minZoom": 10,
-            "maxZoom": 45,
-            "lumens": 41000
+from .fixture_tables import FixtureTables
+
+# fixture type keys which hold a channel offset
+CHANNEL_PARAMETERS = (
+    "red", "green", "blue", "white",
+    "cyan", "magenta", "yellow",
+    "color",
+    "pan", "tilt",
+    "zoom",
+    "dimmer",
+    # optional second channels of 16-bit parameters
+    "panFine", "tiltFine",
+    "zoomFine",
+    "dimmerFine",
+)
+
+# fixture type keys which hold an angle, in degrees until compiled
+ANGLE_PARAMETERS = ("panRange", "tiltRange", "minZoom", "maxZoom")
+
+
+def compile_fixture_type(fixture_type):
+    """Runtime form of a fixture type: (fixture type, channel footprint, tables)
+
+    The fixture type is copied with its angles converted to radians, so
+    this isn't done every frame and the original is left alone.
+    """
+    fixture_type = dict(fixture_type)
+    for parameter in ANGLE_PARAMETERS:
+        if parameter in fixture_type:
+            fixture_type[parameter] = math.radians(fixture_type[parameter])
+    footprint = sorted({fixture_type[parameter] for parameter in CHANNEL_PARAMETERS
+                        if fixture_type.get(parameter, None) is not None})
+    # DMX to Blender values, shared by the type's fixtures
+    return fixture_type, footprint, FixtureTables(fixture_type)
+
+
+# always available, other types come from a fixture library folder picked in the preferences
+BUILT_IN_FIXTURE_TYPES = {
+    "wash": {
+        "colorMode": "rgbw",
+        "red": 4,
+        "green": 6,
+        "blue": 8,
+        "white": 10,
+        "pan": 0,
+        "tilt": 2,
+        "zoom": 15,
+        "dimmer": 13,
+        "panRange": 623,
+        "tiltRange": 295,
+        "minZoom": 7,
+        "maxZoom": 50,
+        "lumens": 5085
+    },
+    "spot": {
+        "colorMode": "cmy",
+        "cyan": 8,
+        "magenta": 9,
+        "yellow": 10,
+        "pan": 0,
+        "tilt": 2,
+        "zoom": 24,
+        "dimmer": 30,
+        "panRange": 540,
+        "tiltRange": 270,
+        "minZoom": 10,
+        "maxZoom": 45,
+        "lumens": 41000
+    },
+    "pointe": {
+        "colorMode": "wheel",
+        "colorWheel": {
+            0: [1, 1, 1],
+            9: [1, 0, 0],
+            18: [0, 0, 1],
+            27: [0, 1, 1],
+            37: [0.2, 1, 0.2],
+            46: [1, 0, 1]
         },
-        "pointe": {
-            "colorMode": "wheel",
-            "colorWheel": {
-                0: [1, 1, 1],
-                9: [1, 0, 0],
-                18: [0, 0, 1],
-                27: [0, 1, 1],
-                37: [0.2, 1, 0.2],
-                46: [1, 0, 1]
-            },
-            "color": 6,
-            "pan": 0,
-            "tilt": 2,
-            "zoom": 15,
-            "dimmer": 21,
-            "panRange": 540,
-            "tiltRange": 270,
-            "minZoom": 5,
-            "maxZoom": 20,
-            "lumens": 5150
-        }
+        "color": 6,
+        "pan": 0,
+        "tilt": 2,
+        "zoom": 15,
+        "dimmer": 21,
+        "panRange": 540,
+        "tiltRange": 270,
+        "minZoom": 5,
+        "maxZoom": 20,
+        "lumens": 5150
     }
+}
+
+class FixtureTypeStore:
+    """Stores the fixture types from which to map the dmx data
+
+    The built-in types are compiled when the store is created. Types
+    from a FixtureLibrary are loaded the first time a light asks for
+    them, built-in types win when the names clash.
+    """
+
+    def __init__(self, library=None):
+        self.library = library
+        self._fixture_types = {} # map of name: fixture type with angles in radians
+        self._footprints = {} # map of name: sorted channel offsets
+        self._tables = {} # map of name: FixtureTables
+        self._load_built_in_types()
+
+    def _load_built_in_types(self):
+        self._fixture_types = {}
+        self._footprints = {}
+        self._tables = {}
+        for name, fixture_type in BUILT_IN_FIXTURE_TYPES.items():
+            self._add(name, compile_fixture_type(fixture_type))
+
+    def _add(self, name, compiled):
+        fixture_type, footprint, tables = compiled
+        self._fixture_types[name] = fixture_type
+        self._footprints[name] = footprint
+        self._tables[name] = tables
+
+    def set_library(self, library):
+        """Use another fixture library, or None for just the built-in types"""
+        self.library = library
+        # forget the types loaded from the old library
+        self._load_built_in_types()
+
+    @property
+    def fixture_type_names(self):
+        """Returns the names of the built-in and library fixture types"""
+        names = set(BUILT_IN_FIXTURE_TYPES)
+        if self.library is not None:
+            names.update(self.library.fixture_type_names)
+        return sorted(names)
 
     def get_fixture_type(self, name):
         """Return a named fixture type"""
-        if name in self._fixture_types:
-            return self._fixture_types[name]
-        return None
+        fixture_type = self._fixture_types.get(name, None)
+        if fixture_type is None and self.library is not None:
+            compiled = self.library.load(name)
+            if compiled is not None:
+                self._add(name, compiled)
+                fixture_type = compiled[0]
+        return fixture_type
+
+    def get_tables(self, name):
+        """Return the lookup tables compiled for a named fixture type"""
+        if self.get_fixture_type(name) is None:
+            return None
+        return self._tables[name]
+
+    def get_footprint(self, name):
+        """Return the channel offsets used by a named fixture type"""
+        if self.get_fixture_type(name) is None:
+            return []
+        return self._footprints[name]
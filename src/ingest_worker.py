@@ -0,0 +1,107 @@
+"""ArtNet ingest worker process
+
+Run by ProcessIngest as a script with Blender's Python, never imported
+by the add-on. The add-on package imports bpy, so the modules this
+needs are imported from src directly and must stay free of bpy.
+
+    python ingest_worker.py SHARED_MEMORY_NAME FIRST COUNT [--reuse-port] [--buffer BYTES]
+
+Listens for ArtNet, keeps universes FIRST to FIRST + COUNT - 1 and
+writes their changes to the shared memory block. Each line on stdin
+lists the universes Blender wants, comma separated or * for all, and
+the worker keeps only those of its own. Exits when its stdin closes,
+which every platform does when Blender exits.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artnet_receiver import UDP_IP, UDP_PORT  # noqa: E402
+from src.artnet_socket import ArtNetSocket  # noqa: E402
+from src.shared_universes import SharedUniverses  # noqa: E402
+from src.universe_store import UniverseStore  # noqa: E402
+
+
+class SharedMemoryWriter(ArtNetSocket):
+    """ArtNetSocket that writes universes to shared memory instead of a UniverseStore"""
+
+    def __init__(self, universes, first, count, reuse_port, receive_buffer_size=0):
+        self.universes = universes
+        self.reuse_port = reuse_port
+        self.shard = frozenset(range(first, first + count))
+        # only used for its subscription, so other shards' universes are
+        # dropped straight after the header check
+        store = UniverseStore()
+        store.subscribe(self.shard)
+        super().__init__(store, receive_buffer_size)
+
+    def subscribe(self, wanted):
+        """Keep only the universes Blender wants from this shard, None for all"""
+        self.universe_store.subscribe(self.shard if wanted is None else self.shard & wanted)
+
+    def connect(self):
+        """Connect to Artnet UDP socket, sharing the port with the other workers"""
+        try:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # UDP
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                # the kernel shares datagrams out by sender
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self._apply_receive_buffer_size()
+            self._socket.bind((UDP_IP, UDP_PORT))
+            self._socket.setblocking(0)
+            return self._socket
+        except Exception as err:
+            print("error while connecting", err)
+            self.disconnect()
+            return None
+
+    def parse_packet(self, packet, received=None):
+        """Write a valid artnet universe packet to shared memory"""
+        dmx = self.read_dmx(packet)
+        if dmx is None:
+            return False
+        universe_index, payload = dmx
+        return self.universes.write(universe_index, payload, time.perf_counter())
+
+
+def parse_subscription(line):
+    """The universes in a subscription line, None for all of them"""
+    line = line.strip()
+    if line == b"*":
+        return None
+    return frozenset(int(index) for index in line.split(b",") if index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ArtNet ingest worker")
+    parser.add_argument("name")
+    parser.add_argument("first", type=int)
+    parser.add_argument("count", type=int)
+    parser.add_argument("--reuse-port", action="store_true")
+    parser.add_argument("--buffer", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    universes = SharedUniverses.attach(args.name)
+    writer = SharedMemoryWriter(universes, args.first, args.count,
+                                args.reuse_port, args.buffer)
+    try:
+        # the receive thread does the work, Blender holds the other end
+        # of stdin so reading it ends when Blender stops the worker or exits
+        for line in sys.stdin.buffer:
+            writer.subscribe(parse_subscription(line))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.shutdown()
+        universes.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Keyframe Recorder"""
+
+import bpy
+import numpy
+
+INITIAL_CAPACITY = 1024 # samples per track before the buffers grow
+THIN_EPSILON = 1e-6 # values closer than this count as unchanged when thinning
+
+# keyframe_insert puts object transforms in this group
+_ACTION_GROUPS = {
+    "rotation_euler": "Object Transforms",
+}
+
+
+class _Track:
+    """Samples of one animated property, e.g. index 2 of rotation_euler"""
+
+    __slots__ = ("id_data", "data_path", "index", "frames", "values", "count")
+
+    def __init__(self, id_data, data_path, index):
+        self.id_data = id_data
+        self.data_path = data_path
+        self.index = index
+        self.frames = numpy.empty(INITIAL_CAPACITY, dtype=numpy.float32)
+        self.values = numpy.empty(INITIAL_CAPACITY, dtype=numpy.float32)
+        self.count = 0
+
+    def append(self, frame, value):
+        count = self.count
+        if count == len(self.frames):
+            self.frames = numpy.resize(self.frames, count * 2)
+            self.values = numpy.resize(self.values, count * 2)
+        self.frames[count] = frame
+        self.values[count] = value
+        self.count = count + 1
+
+    def samples(self, thin):
+        """Returns (frames, values) sorted by frame, one sample per frame
+
+        Thinning keeps the first and last frames, so they still span the take.
+        """
+        frames = self.frames[:self.count]
+        values = self.values[:self.count]
+        # a later sample for the same frame replaces an earlier one,
+        # as keyframe_insert would
+        order = numpy.argsort(frames, kind="stable")[::-1]
+        frames, first = numpy.unique(frames[order], return_index=True)
+        values = values[order][first]
+        if thin and len(values) > 2:
+            # drop keys in the middle of a run of equal values
+            same_as_previous = numpy.abs(numpy.diff(values)) <= THIN_EPSILON
+            redundant = numpy.zeros(len(values), dtype=bool)
+            redundant[1:-1] = same_as_previous[:-1] & same_as_previous[1:]
+            frames = frames[~redundant]
+            values = values[~redundant]
+        return frames, values
+
+
+class KeyframeRecorder:
+    """Records keyframe samples in memory and writes them to fcurves in bulk
+
+    keyframe_insert per property per fixture per frame is slow while a
+    show plays. Recording into arrays and flushing with foreach_set
+    gives the same keyframes at a fraction of the cost.
+    """
+
+    def __init__(self):
+        self._tracks = {} # (id pointer, data_path, index): _Track
+
+    @property
+    def is_recording(self):
+        """True if there are samples waiting to be flushed"""
+        return bool(self._tracks)
+
+    def record(self, id_data, data_path, frame, value, index=0):
+        """Record one sample of a property"""
+        key = (id_data.as_pointer(), data_path, index)
+        track = self._tracks.get(key, None)
+        if track is None:
+            track = _Track(id_data, data_path, index)
+            self._tracks[key] = track
+        track.append(frame, value)
+
+    def record_array(self, id_data, data_path, frame, values):
+        """Record one sample of every element of an array property, e.g. color"""
+        for index, value in enumerate(values):
+            self.record(id_data, data_path, frame, value, index)
+
+    def clear(self):
+        """Discard everything recorded"""
+        self._tracks = {}
+
+    def flush(self, thin=True):
+        """Write everything recorded to fcurves and start again"""
+        tracks = self._tracks
+        self._tracks = {}
+        for track in tracks.values():
+            try:
+                fcurve = self._ensure_fcurve(track)
+            except ReferenceError:
+                # the object was deleted while recording
+                continue
+            frames, values = track.samples(thin)
+            self._write_keyframes(fcurve, frames, values)
+
+    @staticmethod
+    def _ensure_fcurve(track):
+        id_data = track.id_data
+        animation_data = id_data.animation_data or id_data.animation_data_create()
+        action = animation_data.action
+        if action is None:
+            action = bpy.data.actions.new(name=id_data.name + "Action")
+            animation_data.action = action
+        fcurve = action.fcurves.find(track.data_path, index=track.index)
+        if fcurve is None:
+            group = _ACTION_GROUPS.get(track.data_path, None)
+            if group is None:
+                fcurve = action.fcurves.new(track.data_path, index=track.index)
+            else:
+                fcurve = action.fcurves.new(track.data_path, index=track.index,
+                                            action_group=group)
+        return fcurve
+
+    @staticmethod
+    def _write_keyframes(fcurve, frames, values):
+        points = fcurve.keyframe_points
+        existing = len(points)
+        if existing:
+            co = numpy.empty(existing * 2, dtype=numpy.float32)
+            points.foreach_get("co", co)
+            # the take replaces every existing key in the frames it covers,
+            # including those between the keys left after thinning
+            existing_frames = co[0::2]
+            replaced = numpy.flatnonzero((existing_frames >= frames[0])
+                                         & (existing_frames <= frames[-1]))
+            for index in replaced[::-1]:
+                points.remove(points[int(index)], fast=True)
+            existing -= len(replaced)
+        points.add(len(frames))
+        co = numpy.empty((existing + len(frames)) * 2, dtype=numpy.float32)
+        points.foreach_get("co", co)
+        co[existing * 2::2] = frames
+        co[existing * 2 + 1::2] = values
+        points.foreach_set("co", co)
+        # sort the keys and recalculate handles
+        fcurve.update()
@@ -0,0 +1,82 @@
+"""Latency Tracer"""
+
+import collections
+import json
+import os
+
+MAX_EVENTS = 200000 # oldest spans are dropped after this many
+
+# tracks spans are drawn on, as thread ids in the trace
+TRACK_RECEIVE = 1
+TRACK_WAIT = 2
+TRACK_MAIN = 3
+TRACK_NAMES = {
+    TRACK_RECEIVE: "receive thread",
+    TRACK_WAIT: "wait for tick",
+    TRACK_MAIN: "main thread",
+}
+
+
+class LatencyTracer:
+    """Records how long DMX takes from the socket to Blender
+
+    Spans are perf_counter times recorded by the receive thread (parse)
+    and the main thread (wait for tick, apply). Appending to a deque is
+    atomic, so neither thread takes a lock. Off by default, when off the
+    hot paths only check enabled.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self._events = collections.deque(maxlen=max_events)
+
+    def start(self):
+        """Throw away earlier spans and start recording"""
+        self._events.clear()
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording, keeping the spans for export"""
+        self.enabled = False
+
+    @property
+    def event_count(self):
+        return len(self._events)
+
+    def span(self, name, track, start, end, args=None):
+        """Record a span between two perf_counter times"""
+        self._events.append((name, track, start, end, args))
+
+    def chrome_trace(self):
+        """Returns the spans as Chrome trace events"""
+        pid = os.getpid()
+        events = [{
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": track,
+            "args": {"name": name},
+        } for track, name in TRACK_NAMES.items()]
+        for name, track, start, end, args in list(self._events):
+            event = {
+                "name": name,
+                "cat": "artnet",
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": max(end - start, 0) * 1e6,
+                "pid": pid,
+                "tid": track,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """Write the spans to a Chrome trace-event JSON file"""
+        with open(path, "w") as output:
+            json.dump(self.chrome_trace(), output)
+
+
+# shared by the receivers and the synchroniser
+TRACER = LatencyTracer()
@@ -0,0 +1,194 @@
+"""Metrics"""
+
+import bisect
+import json
+import threading
+import time
+
+# upper bounds of the default histogram buckets, in milliseconds
+TIME_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# seconds between counter samples, rates are over the last whole window
+SAMPLE_SECONDS = 1.0
+
+
+class Counter:
+    """A count that only goes up"""
+
+    __slots__ = ("name", "description", "value", "_lock")
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount=1):
+        """Add to the count, from any thread"""
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class Gauge:
+    """A value that is replaced, e.g. how many universes have been seen"""
+
+    __slots__ = ("name", "description", "value")
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def set(self, value):
+        """Replace the value, assignment is atomic so this needs no lock"""
+        self.value = value
+
+    def reset(self):
+        self.value = 0
+
+
+class Histogram:
+    """Counts of values in fixed buckets
+
+    bucket n counts values up to bounds[n], the last bucket counts the
+    rest. Fixed buckets keep observing cheap and the memory constant.
+    """
+
+    __slots__ = ("name", "description", "bounds", "counts", "count", "total", "_lock")
+
+    def __init__(self, name, bounds, description=""):
+        self.name = name
+        self.description = description
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Count one value, from any thread"""
+        bucket = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += value
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding a quantile, None in the overflow bucket"""
+        counts = list(self.counts)
+        count = sum(counts)
+        if count == 0:
+            return 0.0
+        wanted = fraction * count
+        seen = 0
+        for bucket, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= wanted and bucket_count:
+                return self.bounds[bucket] if bucket < len(self.bounds) else None
+        return None
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms
+
+    Metrics are created on first use and kept for the life of the
+    registry, so hot paths can hold on to them instead of looking them
+    up by name. Counter rates come from sample(), called every
+    SAMPLE_SECONDS, so reading a snapshot never changes them.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        # (time, {counter name: value}) of the last sample
+        self._last_sample = (time.monotonic(), {})
+        # counter name: rate over the last complete window
+        self._rates = {}
+
+    def _get(self, name, factory):
+        metric = self._metrics.get(name, None)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name, None)
+                if metric is None:
+                    metric = factory()
+                    self._metrics[name] = metric
+        return metric
+
+    def counter(self, name, description=""):
+        """Returns the named counter"""
+        return self._get(name, lambda: Counter(name, description))
+
+    def gauge(self, name, description=""):
+        """Returns the named gauge"""
+        return self._get(name, lambda: Gauge(name, description))
+
+    def histogram(self, name, bounds=TIME_BUCKETS_MS, description=""):
+        """Returns the named histogram"""
+        return self._get(name, lambda: Histogram(name, bounds, description))
+
+    def reset(self):
+        """Zero every metric"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+        self._last_sample = (time.monotonic(), {})
+        self._rates = {}
+
+    def sample(self):
+        """Work out each counter's rate since the last sample"""
+        now = time.monotonic()
+        last_time, last_values = self._last_sample
+        elapsed = now - last_time
+        if elapsed <= 0:
+            return
+        values = {name: metric.value for name, metric in list(self._metrics.items())
+                  if isinstance(metric, Counter)}
+        self._rates = {name: (value - last_values.get(name, 0)) / elapsed
+                       for name, value in values.items()}
+        self._last_sample = (now, values)
+
+    def snapshot(self):
+        """Returns every metric as plain data, with counter rates from the last sample"""
+        rates = self._rates
+        result = {"counters": {}, "gauges": {}, "histograms": {}}
+        for name, metric in sorted(self._metrics.items()):
+            if isinstance(metric, Counter):
+                result["counters"][name] = {"value": metric.value,
+                                            "rate": rates.get(name, 0.0)}
+            elif isinstance(metric, Gauge):
+                result["gauges"][name] = metric.value
+            else:
+                result["histograms"][name] = {
+                    "bounds": list(metric.bounds),
+                    "counts": list(metric.counts),
+                    "count": metric.count,
+                    "mean": metric.mean,
+                    "p50": metric.quantile(0.5),
+                    "p99": metric.quantile(0.99),
+                }
+        return result
+
+    def export(self, path):
+        """Write a snapshot to a JSON file"""
+        with open(path, "w") as output:
+            json.dump(self.snapshot(), output, indent=2)
+
+
+# shared by the receivers and the synchroniser
+METRICS = MetricsRegistry()
@@ -0,0 +1,191 @@
+"""Pixel Map"""
+
+import numpy
+
+from .universe_store import channel_mask, CHANNELS_PER_UNIVERSE
+
+# (identifier, name, description) for the pixel map preferences on meshes
+PIXEL_TARGETS = [
+    ('IMAGE', 'Image', 'Write the pixels to an image, e.g. an emission texture'),
+    ('ATTRIBUTE', 'Color Attribute',
+     'Write the pixels to a color attribute, one pixel per vertex, face or face corner'),
+]
+PIXEL_ORDERS = [
+    ('RGB', 'RGB', 'Red, green, blue'),
+    ('GRB', 'GRB', 'Green, red, blue, e.g. WS2812 tape'),
+    ('BGR', 'BGR', 'Blue, green, red'),
+    ('RGBW', 'RGBW', 'Red, green, blue, white'),
+    ('GRBW', 'GRBW', 'Green, red, blue, white, e.g. SK6812 tape'),
+]
+START_CORNERS = [
+    ('TOP_LEFT', 'Top Left', 'The first pixel is top left, rows run left to right'),
+    ('TOP_RIGHT', 'Top Right', 'The first pixel is top right, rows run right to left'),
+    ('BOTTOM_LEFT', 'Bottom Left', 'The first pixel is bottom left, rows run left to right'),
+    ('BOTTOM_RIGHT', 'Bottom Right', 'The first pixel is bottom right, rows run right to left'),
+]
+
+# share of white added to each of red, green and blue, as fixture_group.RGBW_TO_RGB
+WHITE_SHARE = 1 / 4
+
+
+def color_matrix(order):
+    """Matrix from one pixel's 0-255 DMX values, in order, to 0-1 RGB"""
+    matrix = numpy.zeros((len(order), 3), dtype=numpy.float32)
+    white = "W" in order
+    for column, color in enumerate("RGB"):
+        matrix[order.index(color), column] = 1 - WHITE_SHARE if white else 1
+    if white:
+        matrix[order.index("W"), :] = WHITE_SHARE
+    return matrix / 255
+
+
+def packed_addresses(count, universe, base_address, channels_each):
+    """Universe and first channel of each of count pixels or fixtures patched back to back
+
+    None are split between universes, the next universe starts again at
+    channel 1.
+    """
+    first = base_address - 1
+    items = numpy.arange(count)
+    first_universe = max((CHANNELS_PER_UNIVERSE - first) // channels_each, 0)
+    per_universe = CHANNELS_PER_UNIVERSE // channels_each
+    later = items - first_universe
+    universes = numpy.where(later < 0, universe, universe + 1 + later // per_universe)
+    channels = numpy.where(later < 0, first + items * channels_each,
+                           (later % per_universe) * channels_each)
+    return universes, channels
+
+
+def grid_elements(width, height, start_corner, serpentine):
+    """Grid element, row by row from the bottom left, of each pixel in DMX order"""
+    pixels = numpy.arange(width * height)
+    rows = pixels // width
+    columns = pixels % width
+    if serpentine:
+        # every other row comes back the other way
+        columns = numpy.where(rows % 2 == 1, width - 1 - columns, columns)
+    if start_corner in ('TOP_RIGHT', 'BOTTOM_RIGHT'):
+        columns = width - 1 - columns
+    if start_corner in ('TOP_LEFT', 'TOP_RIGHT'):
+        # images and grids count rows from the bottom
+        rows = height - 1 - rows
+    return rows * width + columns
+
+
+class PixelMap:
+    """A mesh whose image or color attribute shows a range of DMX pixels
+
+    Compiled once into an index array from each image pixel or attribute
+    element to its DMX channels in the fixture store's staged universes,
+    so an update is one gather, one matrix multiply for the color order
+    and one foreach_set. Rebuilt whenever the mesh's ArtNet settings
+    change.
+    """
+
+    def __init__(self, obj, universe_slot):
+        data = obj.data
+        self.name = obj.name
+        self.pointer = obj.as_pointer()
+        self.obj = obj
+        self.target = data.artnet_pixel_target
+        self.attribute_name = data.artnet_pixel_attribute
+        self.image = data.artnet_pixel_image if self.target == 'IMAGE' else None
+        # image size when compiled, so a resized image is noticed
+        self.image_size = None if self.image is None else tuple(self.image.size)
+
+        width = max(data.artnet_pixel_width, 1)
+        height = max(data.artnet_pixel_height, 1)
+        self.size = (width, height)
+        order = data.artnet_pixel_order
+        channels_per_pixel = len(order)
+        self.matrix = color_matrix(order)
+        pixel_universes, first_channels = packed_addresses(
+            width * height, data.artnet_universe, data.artnet_base_address, channels_per_pixel)
+        elements = grid_elements(width, height, data.artnet_pixel_start,
+                                 data.artnet_pixel_serpentine)
+
+        # universe index: dirty mask of the channels the pixels use
+        universes = numpy.unique(pixel_universes)
+        self.masks = {}
+        for universe in universes.tolist():
+            in_universe = pixel_universes == universe
+            channels = (first_channels[in_universe, None]
+                        + numpy.arange(channels_per_pixel)).ravel()
+            self.masks[universe] = channel_mask(channels.tolist())
+        self.universes = list(self.masks)
+
+        # staged channels of each grid element, universe_slot gives a
+        # universe's row in the staged universes
+        slots = numpy.array([universe_slot(universe) for universe in self.universes],
+                            dtype=numpy.intp)
+        pixel_slots = slots[numpy.searchsorted(universes, pixel_universes)]
+        grid = numpy.zeros((width * height, channels_per_pixel), dtype=numpy.intp)
+        grid[elements] = (pixel_slots * CHANNELS_PER_UNIVERSE + first_channels)[:, None] \
+            + numpy.arange(channels_per_pixel)
+        self.channels = self._target_channels(obj, grid)
+        self.buffer = None
+
+    def _target_channels(self, obj, grid):
+        """Channels for each element of the image or attribute"""
+        if self.target == 'IMAGE':
+            # one image pixel per DMX pixel, the mesh panel shows a size mismatch
+            return grid
+        mesh = obj.data
+        attribute = mesh.attributes.get(self.attribute_name, None)
+        if attribute is None:
+            return grid[:0]
+        if attribute.domain == 'CORNER':
+            # each face corner shows its vertex's pixel
+            elements = numpy.zeros(len(mesh.loops), dtype=numpy.intp)
+            mesh.loops.foreach_get("vertex_index", elements)
+        else:
+            # one pixel per vertex or face, in index order
+            elements = numpy.arange(len(attribute.data))
+        # elements without a pixel read slot 0, which is never staged so stays black
+        channels = numpy.zeros((len(elements), grid.shape[1]), dtype=numpy.intp)
+        on_grid = elements < len(grid)
+        channels[on_grid] = grid[elements[on_grid]]
+        return channels
+
+    def needs_rebuild(self):
+        """True if the image's or color attribute's size changed since it was compiled"""
+        if self.target == 'IMAGE':
+            return self.image is not None and tuple(self.image.size) != self.image_size
+        attribute = self.obj.data.attributes.get(self.attribute_name, None)
+        return attribute is not None and len(attribute.data) != len(self.channels)
+
+    def uses(self, index, changes):
+        """True if the pixels use a channel set in a universe's dirty mask"""
+        return self.masks.get(index, 0) & changes != 0
+
+    def apply(self, staged_raw, staged_changes):
+        """Write every pixel from the fixture store's staged universes
+
+        Returns the fixtures updated, the whole pixel map counts as one.
+        """
+        colors = staged_raw.reshape(-1)[self.channels] @ self.matrix
+        if self.target == 'IMAGE':
+            image = self.image
+            if image is None or tuple(image.size) != self.size:
+                # foreach_set needs every pixel of the image
+                return 0
+            self._fill(colors, image.channels)
+            image.pixels.foreach_set(self.buffer.reshape(-1))
+            image.update()
+        else:
+            mesh = self.obj.data
+            attribute = mesh.attributes.get(self.attribute_name, None)
+            if attribute is None or len(attribute.data) != len(colors):
+                return 0
+            self._fill(colors, 4)
+            attribute.data.foreach_set("color", self.buffer.reshape(-1))
+            mesh.update()
+        return 1
+
+    def _fill(self, colors, stride):
+        buffer = self.buffer
+        if buffer is None or buffer.shape != (len(colors), stride):
+            # alpha, if there is one, stays opaque
+            buffer = numpy.ones((len(colors), stride), dtype=numpy.float32)
+            self.buffer = buffer
+        buffer[:, :3] = colors
@@ -0,0 +1,34 @@
+"""Receiver Backends"""
+
+from .artnet_async import AsyncArtNetReceiver
+from .artnet_process import ProcessIngest, SHARD_BY_UNIVERSE
+from .artnet_receiver import UDP_IP
+from .artnet_socket import ArtNetSocket
+from .shared_universes import is_available as shared_memory_available
+
+# (identifier, name, description) for the backend preference
+RECEIVER_BACKENDS = [
+    ('THREAD', 'Thread', 'Listen on all networks from a background thread'),
+    ('ASYNCIO', 'asyncio', 'Listen on one or more addresses from an asyncio event loop'),
+    ('PROCESS', 'Worker Processes',
+     'Listen from separate processes that share universes with Blender, '
+     'for many universes at high frame rates'),
+]
+
+def parse_addresses(addresses):
+    """Split a comma separated list of listening addresses"""
+    parsed = tuple(address.strip() for address in addresses.split(",") if address.strip())
+    return parsed or (UDP_IP,)
+
+def create_receiver(backend, universe_store, receive_buffer_size=0, addresses=UDP_IP,
+                    workers=1, shard_by=SHARD_BY_UNIVERSE, universe_count=64):
+    """Create the ArtNet receiver for a backend identifier"""
+    if backend == 'PROCESS':
+        if shared_memory_available():
+            return ProcessIngest(universe_store, receive_buffer_size,
+                                 workers, shard_by, universe_count)
+        print("worker processes need Python 3.8 or later, using a thread")
+    if backend == 'ASYNCIO':
+        return AsyncArtNetReceiver(universe_store, receive_buffer_size,
+                                   parse_addresses(addresses))
+    return ArtNetSocket(universe_store, receive_buffer_size)
@@ -0,0 +1,119 @@
+"""Universes in shared memory"""
+
+import struct
+
+import numpy
+
+from .universe_store import CHANNELS_PER_UNIVERSE
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python before 3.8, e.g. Blender 2.83 and older
+    shared_memory = None
+
+MAGIC = b"ARTNSHM1"
+# MAGIC, first universe index, universe count, padded to 64 bytes
+HEADER = struct.Struct("<8sII48x")
+
+# one slot per universe
+# seq is a seqlock counter, odd while a worker is writing the slot and
+# bumped by 2 for every change, received is the perf_counter time the
+# change arrived and raw the channel bytes
+SLOT = numpy.dtype([
+    ("seq", "<u8"),
+    ("received", "<f8"),
+    ("raw", "u1", CHANNELS_PER_UNIVERSE),
+])
+
+
+def is_available():
+    """True if this Python has multiprocessing.shared_memory"""
+    return shared_memory is not None
+
+
+def _attach(name):
+    try:
+        # Python 3.13 and later, don't let this process' exit remove the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        # the creator unlinks the block, the resource tracker would unlink
+        # it as soon as any process that attached exits
+        resource_tracker.unregister(block._name, "shared_memory")
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return block
+
+
+class SharedUniverses:
+    """A range of universes in a shared memory block
+
+    Worker processes write universes with write(), one writer per
+    universe, and Blender reads them with read(). The per-slot seqlock
+    lets the reader spot a slot that changed while it was copying it.
+    """
+
+    def __init__(self, block, owner):
+        self.block = block
+        self.owner = owner
+        magic, first, count = HEADER.unpack_from(block.buf, 0)
+        if magic != MAGIC:
+            raise ValueError("shared memory block {} isn't ArtNet universes".format(block.name))
+        self.first = first
+        self.count = count
+        self.slots = numpy.ndarray((count,), dtype=SLOT, buffer=block.buf, offset=HEADER.size)
+        self.seq = self.slots["seq"]
+        self.received = self.slots["received"]
+        self.raw = self.slots["raw"]
+
+    @classmethod
+    def create(cls, first, count):
+        """Create a block for universes first to first + count - 1"""
+        block = shared_memory.SharedMemory(create=True, size=HEADER.size + SLOT.itemsize * count)
+        HEADER.pack_into(block.buf, 0, MAGIC, first, count)
+        return cls(block, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open a block made by create() in another process"""
+        return cls(_attach(name), owner=False)
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def write(self, index, payload, received):
+        """Store a universe's channel bytes, returns true if any changed"""
+        slot = index - self.first
+        if slot < 0 or slot >= self.count:
+            return False
+        raw = self.raw[slot]
+        channels = len(payload)
+        if not (raw[:channels] != payload).any():
+            return False
+        seq = self.seq
+        seq[slot] += 1 # odd, the slot is being written
+        raw[:channels] = payload
+        self.received[slot] = received
+        seq[slot] += 1
+        return True
+
+    def read(self, slot, seq):
+        """Copy a slot last seen at seq, returns None if it was torn by a write"""
+        raw = self.raw[slot].copy()
+        received = float(self.received[slot])
+        if self.seq[slot] != seq:
+            return None
+        return raw, received
+
+    def close(self):
+        """Let go of the block, and remove it if this process created it"""
+        # views keep the buffer exported, release them first
+        self.slots = self.seq = self.received = self.raw = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
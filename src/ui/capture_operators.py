@@ -0,0 +1,141 @@
+import bpy
+
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+
+from ..artnet_capture import CaptureReplay, CaptureWriter, CAPTURE_EXTENSION
+from ..globals import GLOBAL_DATA
+from .preferences import get_preferences, restart_receiver
+
+def _receiver():
+    return GLOBAL_DATA.get("ArtNetSocket", None)
+
+def _is_capturing():
+    receiver = _receiver()
+    return receiver is not None and receiver.capture is not None
+
+def _is_replaying():
+    return isinstance(_receiver(), CaptureReplay)
+
+def _timeline_attached():
+    synchroniser = GLOBAL_DATA.get("BlenderSynchroniser", None)
+    return synchroniser is not None and synchroniser.timeline is not None
+
+class StartCaptureOperator(bpy.types.Operator, ExportHelper):
+    """Record incoming ArtNet to a file for replaying later"""
+    bl_idname = "artnet.start_capture"
+    bl_label = "Capture ArtNet"
+
+    filename_ext = CAPTURE_EXTENSION
+    filter_glob: bpy.props.StringProperty(default="*" + CAPTURE_EXTENSION, options={'HIDDEN'})
+    capture_only: bpy.props.BoolProperty(
+        name="Capture Only",
+        description="Don't update lights while capturing",
+        default=False
+    )
+
+    @classmethod
+    def poll(cls, context):
+        receiver = _receiver()
+        return (receiver is not None
+                and receiver.can_capture
+                and not _is_capturing()
+                and not _is_replaying()
+                and not _timeline_attached())
+
+    def execute(self, context):
+        try:
+            _receiver().start_capture(CaptureWriter(self.filepath), self.capture_only)
+        except (OSError, ValueError) as err:
+            self.report({'ERROR'}, str(err))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class StopCaptureOperator(bpy.types.Operator):
+    """Stop recording ArtNet to a file"""
+    bl_idname = "artnet.stop_capture"
+    bl_label = "Stop ArtNet Capture"
+
+    @classmethod
+    def poll(cls, context):
+        return _is_capturing()
+
+    def execute(self, context):
+        packet_count = _receiver().stop_capture()
+        self.report({'INFO'}, "Captured {} ArtNet packets".format(packet_count))
+        return {'FINISHED'}
+
+class StartReplayOperator(bpy.types.Operator, ImportHelper):
+    """Replay a captured ArtNet file instead of listening to the network"""
+    bl_idname = "artnet.start_replay"
+    bl_label = "Replay ArtNet Capture"
+
+    filename_ext = CAPTURE_EXTENSION
+    filter_glob: bpy.props.StringProperty(default="*" + CAPTURE_EXTENSION, options={'HIDDEN'})
+    realtime: bpy.props.BoolProperty(
+        name="Real Time",
+        description="Keep the timing of the capture, otherwise replay as fast as possible",
+        default=True
+    )
+    speed: bpy.props.FloatProperty(
+        name="Speed",
+        description="Replay speed when replaying in real time",
+        default=1.0,
+        min=0.01
+    )
+    loop: bpy.props.BoolProperty(
+        name="Loop",
+        default=False
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return ("UniverseStore" in GLOBAL_DATA
+                and not _is_capturing()
+                and not _timeline_attached())
+
+    def execute(self, context):
+        try:
+            replay = CaptureReplay(GLOBAL_DATA["UniverseStore"], self.filepath,
+                                   self.realtime, self.speed, self.loop)
+        except (OSError, ValueError) as err:
+            self.report({'ERROR'}, str(err))
+            return {'CANCELLED'}
+        # the universe store takes one source at a time
+        old = _receiver()
+        if old is not None:
+            old.disconnect()
+            old.shutdown()
+        GLOBAL_DATA["ArtNetSocket"] = replay
+        replay.start()
+        return {'FINISHED'}
+
+class StopReplayOperator(bpy.types.Operator):
+    """Stop replaying and listen to the network again"""
+    bl_idname = "artnet.stop_replay"
+    bl_label = "Stop ArtNet Replay"
+
+    @classmethod
+    def poll(cls, context):
+        return _is_replaying()
+
+    def execute(self, context):
+        restart_receiver(get_preferences(context))
+        return {'FINISHED'}
+
+CAPTURE_OPERATORS = (
+    StartCaptureOperator,
+    StopCaptureOperator,
+    StartReplayOperator,
+    StopReplayOperator,
+)
+
+def draw_capture_menu(layout):
+    """Add the capture and replay items to a menu"""
+    if _is_capturing():
+        layout.operator(StopCaptureOperator.bl_idname)
+    else:
+        layout.operator(StartCaptureOperator.bl_idname, text="Capture ArtNet...")
+    if _is_replaying():
+        layout.operator(StopReplayOperator.bl_idname)
+    else:
+        layout.operator(StartReplayOperator.bl_idname, text="Replay ArtNet Capture...")
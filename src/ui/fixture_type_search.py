@@ -0,0 +1,44 @@
+import bpy
+
+from ..globals import GLOBAL_DATA
+
+# Blender doesn't keep enum item strings alive, so the last items are held here
+_FIXTURE_TYPE_ITEMS = []
+
+def _fixture_type_items(self, context):
+    fixture_store = GLOBAL_DATA.get("FixtureStore", None)
+    names = [] if fixture_store is None else fixture_store.fixture_type_store.fixture_type_names
+    _FIXTURE_TYPE_ITEMS[:] = [(name, name, "") for name in names]
+    return _FIXTURE_TYPE_ITEMS
+
+class SelectFixtureTypeOperator(bpy.types.Operator):
+    """Pick the fixture type from the built-in types and the fixture library"""
+    bl_idname = "artnet.select_fixture_type"
+    bl_label = "Select Fixture Type"
+    bl_property = "fixture_type"
+
+    fixture_type: bpy.props.EnumProperty(
+        name="Fixture Type",
+        items=_fixture_type_items
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return (context.object is not None
+                and context.object.type in ('LIGHT', 'MESH')
+                and "FixtureStore" in GLOBAL_DATA)
+
+    def invoke(self, context, event):
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        # the light or mesh recompiles through the property's update callback
+        context.object.data.artnet_fixture_type = self.fixture_type
+        return {'FINISHED'}
+
+def draw_fixture_type(layout, data):
+    """The fixture type field with a button to search the known types"""
+    row = layout.row(align=True)
+    row.prop(data, "artnet_fixture_type")
+    row.operator(SelectFixtureTypeOperator.bl_idname, text="", icon='VIEWZOOM')
@@ -1,5 +1,7 @@
 import bpy
 
+from .fixture_type_search import draw_fixture_type
+
 class LightArtNetPanel(bpy.types.Panel):
     bl_idname = "OBJECT_PT_light_artnet"
     bl_label = "ArtNet Light Control"
@@ -28,7 +30,7 @@ class LightArtNetPanel(bpy.types.Panel):
             return
 
         layout = self.layout
-        layout.prop(data, "artnet_fixture_type")
+        draw_fixture_type(layout, data)
         layout.prop(data, "artnet_universe")
         layout.prop(data, "artnet_base_address")
 
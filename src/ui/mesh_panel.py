@@ -0,0 +1,55 @@
+import bpy
+
+from .fixture_type_search import draw_fixture_type
+
+class MeshArtNetPanel(bpy.types.Panel):
+    bl_idname = "OBJECT_PT_mesh_artnet"
+    bl_label = "ArtNet Mesh Control"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context = "object"
+
+    @classmethod
+    def poll(cls, context):
+        """Only show panel for mesh objects"""
+        return context.object is not None and context.object.type == 'MESH'
+
+    def draw_header(self, context):
+        layout = self.layout
+        data = context.object.data
+        layout.prop(data, "artnet_enabled", text="")
+
+    def draw(self, context):
+        data = context.object.data
+        enabled = data.artnet_enabled
+        if not enabled:
+            return
+
+        layout = self.layout
+        layout.prop(data, "artnet_mesh_mode", expand=True)
+        layout.prop(data, "artnet_universe")
+        layout.prop(data, "artnet_base_address")
+
+        if data.artnet_mesh_mode == 'INSTANCES':
+            draw_fixture_type(layout, data)
+            layout.prop(data, "artnet_fixture_spacing")
+            return
+
+        row = layout.row(align=True)
+        row.prop(data, "artnet_pixel_width")
+        row.prop(data, "artnet_pixel_height")
+        layout.prop(data, "artnet_pixel_order")
+        layout.prop(data, "artnet_pixel_start")
+        layout.prop(data, "artnet_pixel_serpentine")
+
+        layout.prop(data, "artnet_pixel_target")
+        if data.artnet_pixel_target == 'IMAGE':
+            layout.template_ID(data, "artnet_pixel_image", new="image.new", open="image.open")
+            image = data.artnet_pixel_image
+            size = (max(data.artnet_pixel_width, 1), max(data.artnet_pixel_height, 1))
+            if image is not None and tuple(image.size) != size:
+                # the image is the user's, so it isn't resized to fit
+                layout.label(text="Image is {}x{}, needs {}x{}".format(*image.size, *size),
+                             icon='ERROR')
+        else:
+            layout.prop_search(data, "artnet_pixel_attribute", data, "attributes")
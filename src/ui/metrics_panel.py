@@ -0,0 +1,136 @@
+import bpy
+
+from bpy_extras.io_utils import ExportHelper
+
+from ..latency_tracer import TRACER
+from ..metrics import METRICS, SAMPLE_SECONDS
+
+# (metric, label) shown in the panel, everything is in the export
+PANEL_COUNTERS = (
+    ("artnet.packets_received", "Packets"),
+    ("artnet.packets_dropped", "Dropped"),
+    ("artnet.dropped.stale", "Out of Order"),
+    ("artnet.frames_published", "Universe Updates"),
+    ("sync.fixtures_updated", "Fixture Updates"),
+)
+PANEL_GAUGES = (
+    ("artnet.universes_seen", "Universes"),
+    ("sync.suppressed_writes", "Skipped Writes"),
+)
+PANEL_HISTOGRAMS = (
+    ("sync.tick_ms", "Tick", "ms"),
+    ("sync.fixtures_per_tick", "Fixtures/Tick", ""),
+)
+
+def sample_metrics():
+    """Timer working out the counter rates the panel and export show"""
+    METRICS.sample()
+    return SAMPLE_SECONDS
+
+def _bucket_text(value, unit):
+    if value is None:
+        return "more"
+    return "{:g}{}".format(value, unit)
+
+class ExportMetricsOperator(bpy.types.Operator, ExportHelper):
+    """Save the ArtNet statistics to a JSON file"""
+    bl_idname = "artnet.export_metrics"
+    bl_label = "Export ArtNet Stats"
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            METRICS.export(self.filepath)
+        except OSError as err:
+            self.report({'ERROR'}, str(err))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class ResetMetricsOperator(bpy.types.Operator):
+    """Start the ArtNet statistics again from zero"""
+    bl_idname = "artnet.reset_metrics"
+    bl_label = "Reset ArtNet Stats"
+
+    def execute(self, context):
+        METRICS.reset()
+        return {'FINISHED'}
+
+class ToggleTracingOperator(bpy.types.Operator):
+    """Start or stop recording how long DMX takes from the network to Blender"""
+    bl_idname = "artnet.toggle_tracing"
+    bl_label = "Trace ArtNet Latency"
+
+    def execute(self, context):
+        if TRACER.enabled:
+            TRACER.stop()
+        else:
+            TRACER.start()
+        return {'FINISHED'}
+
+class ExportTraceOperator(bpy.types.Operator, ExportHelper):
+    """Save the latency trace for chrome://tracing or Perfetto"""
+    bl_idname = "artnet.export_trace"
+    bl_label = "Export ArtNet Latency Trace"
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return TRACER.event_count > 0
+
+    def execute(self, context):
+        try:
+            TRACER.export(self.filepath)
+        except OSError as err:
+            self.report({'ERROR'}, str(err))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class ArtNetMetricsPanel(bpy.types.Panel):
+    bl_idname = "VIEW3D_PT_artnet_metrics"
+    bl_label = "ArtNet Stats"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "ArtNet"
+
+    def draw(self, context):
+        layout = self.layout
+        snapshot = METRICS.snapshot()
+        column = layout.column(align=True)
+        counters = snapshot["counters"]
+        for name, label in PANEL_COUNTERS:
+            counter = counters.get(name, None)
+            if counter is not None:
+                column.label(text="{}: {} ({:.0f}/s)".format(
+                    label, counter["value"], counter["rate"]))
+        gauges = snapshot["gauges"]
+        for name, label in PANEL_GAUGES:
+            if name in gauges:
+                column.label(text="{}: {}".format(label, gauges[name]))
+        histograms = snapshot["histograms"]
+        for name, label, unit in PANEL_HISTOGRAMS:
+            histogram = histograms.get(name, None)
+            if histogram is not None and histogram["count"]:
+                column.label(text="{}: mean {:.2f}{}, p50 ≤ {}, p99 ≤ {}".format(
+                    label, histogram["mean"], unit,
+                    _bucket_text(histogram["p50"], unit),
+                    _bucket_text(histogram["p99"], unit)))
+        row = layout.row(align=True)
+        row.operator(ExportMetricsOperator.bl_idname, text="Export...")
+        row.operator(ResetMetricsOperator.bl_idname, text="Reset")
+        row = layout.row(align=True)
+        row.operator(ToggleTracingOperator.bl_idname,
+                     text="Stop Trace" if TRACER.enabled else "Trace Latency",
+                     depress=TRACER.enabled)
+        row.operator(ExportTraceOperator.bl_idname, text="Export Trace...")
+
+METRICS_CLASSES = (
+    ExportMetricsOperator,
+    ResetMetricsOperator,
+    ToggleTracingOperator,
+    ExportTraceOperator,
+    ArtNetMetricsPanel,
+)
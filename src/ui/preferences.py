@@ -0,0 +1,231 @@
+import os
+
+import bpy
+
+from ..artnet_process import SHARD_MODES, SHARD_BY_UNIVERSE
+from ..fixture_library import FixtureLibrary
+from ..globals import GLOBAL_DATA
+from ..receiver_backends import RECEIVER_BACKENDS, create_receiver
+from ..universe_store import ALL_UNIVERSES, ALL_CHANNELS
+from ..update_scheduler import DEFAULT_MIN_RATE, DEFAULT_MAX_RATE
+
+# the add-on's own module name, which preferences are registered under
+ADDON_NAME = __package__.split(".")[0]
+# folder in Blender's config directory holding compiled fixture types
+FIXTURE_CACHE_FOLDER = "artnet_fixture_cache"
+
+def get_preferences(context=None):
+    """Returns the add-on preferences, or None if they aren't available"""
+    context = context or bpy.context
+    addon = context.preferences.addons.get(ADDON_NAME, None)
+    if addon is None:
+        return None
+    return addon.preferences
+
+def _update_synchroniser(self, context):
+    apply_synchroniser_preferences(self)
+
+def apply_synchroniser_preferences(preferences):
+    """Push the preferences into the running synchroniser"""
+    synchroniser = GLOBAL_DATA.get("BlenderSynchroniser", None)
+    if synchroniser is None:
+        return
+    synchroniser.scheduler.set_rates(preferences.min_update_rate, preferences.max_update_rate)
+    synchroniser.bulk_keyframes = preferences.bulk_keyframes
+    synchroniser.thin_keyframes = preferences.thin_keyframes
+
+def _update_universe_filter(self, context):
+    apply_universe_filter(self)
+
+def apply_universe_filter(preferences):
+    """Push the preferences into the universe store"""
+    universes = GLOBAL_DATA.get("UniverseStore", None)
+    if universes is not None:
+        universes.set_monitor_all(preferences.monitor_all_universes)
+
+def _update_receive_buffer(self, context):
+    artnet_socket = GLOBAL_DATA.get("ArtNetSocket", None)
+    if artnet_socket is not None:
+        artnet_socket.set_receive_buffer_size(self.receive_buffer_kb * 1024)
+
+def _update_receiver(self, context):
+    restart_receiver(self)
+
+def restart_receiver(preferences):
+    """Replace the running ArtNet receiver with one using the current preferences
+
+    Without preferences the default receiver is started.
+    """
+    universes = GLOBAL_DATA.get("UniverseStore", None)
+    if universes is None:
+        # not set up yet, the receiver will be created with these preferences
+        return
+    synchroniser = GLOBAL_DATA.get("BlenderSynchroniser", None)
+    if synchroniser is not None and synchroniser.timeline is not None:
+        # a capture is driving the lights, listen again once it's removed
+        return
+    old = GLOBAL_DATA.get("ArtNetSocket", None)
+    if old is not None:
+        old.disconnect()
+        old.shutdown()
+    if preferences is None:
+        GLOBAL_DATA["ArtNetSocket"] = create_receiver('THREAD', universes)
+        return
+    GLOBAL_DATA["ArtNetSocket"] = create_receiver(
+        preferences.receiver_backend,
+        universes,
+        preferences.receive_buffer_kb * 1024,
+        preferences.listen_addresses,
+        preferences.ingest_workers,
+        preferences.ingest_shard_by,
+        preferences.ingest_universes
+    )
+
+def load_fixture_library(preferences):
+    """Returns the FixtureLibrary the preferences point at, or None"""
+    if preferences is None or not preferences.fixture_library:
+        return None
+    directory = bpy.path.abspath(preferences.fixture_library)
+    if not os.path.isdir(directory):
+        print("fixture library not found", directory)
+        return None
+    cache_directory = bpy.utils.user_resource('CONFIG', path=FIXTURE_CACHE_FOLDER, create=True)
+    return FixtureLibrary(directory, cache_directory)
+
+def _update_fixture_library(self, context):
+    fixture_store = GLOBAL_DATA.get("FixtureStore", None)
+    if fixture_store is None:
+        # not set up yet, the library will be loaded with these preferences
+        return
+    fixture_store.fixture_type_store.set_library(load_fixture_library(self))
+    # compile the lights against the new types
+    fixture_store.load_objects_from_scene()
+    universes = GLOBAL_DATA.get("UniverseStore", None)
+    if universes is not None:
+        universes.notify_universe_change(ALL_UNIVERSES, ALL_CHANNELS)
+
+class ArtNetPreferences(bpy.types.AddonPreferences):
+    bl_idname = ADDON_NAME
+
+    min_update_rate: bpy.props.FloatProperty(
+        name="Idle Update Rate",
+        description="Updates per second when no ArtNet data is arriving",
+        default=DEFAULT_MIN_RATE,
+        min=0.1,
+        max=240,
+        update=_update_synchroniser
+    )
+    max_update_rate: bpy.props.FloatProperty(
+        name="Maximum Update Rate",
+        description="Updates per second at most while ArtNet data is arriving",
+        default=DEFAULT_MAX_RATE,
+        min=0.1,
+        max=240,
+        update=_update_synchroniser
+    )
+
+    bulk_keyframes: bpy.props.BoolProperty(
+        name="Record Keyframes in Bulk",
+        description="Collect Auto Keyframing samples while playing "
+                    "and write them when playback or recording stops",
+        default=True,
+        update=_update_synchroniser
+    )
+    thin_keyframes: bpy.props.BoolProperty(
+        name="Thin Keyframes",
+        description="Leave out bulk recorded keyframes that repeat the value either side of them",
+        default=True,
+        update=_update_synchroniser
+    )
+
+    receive_buffer_kb: bpy.props.IntProperty(
+        name="Receive Buffer (KB)",
+        description="Size of the network receive buffer, "
+                    "increase if bursts from your desk get dropped. "
+                    "0 uses the system default",
+        default=0,
+        min=0,
+        max=65536,
+        update=_update_receive_buffer
+    )
+
+    monitor_all_universes: bpy.props.BoolProperty(
+        name="Monitor All Universes",
+        description="Receive every universe, not just the ones lights are patched to, "
+                    "e.g. to see them all in the stats",
+        default=False,
+        update=_update_universe_filter
+    )
+
+    receiver_backend: bpy.props.EnumProperty(
+        name="Receiver",
+        description="How ArtNet is received from the network",
+        items=RECEIVER_BACKENDS,
+        default='THREAD',
+        update=_update_receiver
+    )
+    listen_addresses: bpy.props.StringProperty(
+        name="Listen Addresses",
+        description="Comma separated addresses to listen on with the asyncio receiver, "
+                    "e.g. the address of each network card. 0.0.0.0 listens on all of them",
+        default="0.0.0.0",
+        update=_update_receiver
+    )
+    ingest_workers: bpy.props.IntProperty(
+        name="Workers",
+        description="Number of processes receiving ArtNet. More than one needs "
+                    "broadcast ArtNet, or Share Out By Sender with several senders",
+        default=1,
+        min=1,
+        max=16,
+        update=_update_receiver
+    )
+    ingest_shard_by: bpy.props.EnumProperty(
+        name="Share Out By",
+        description="How ArtNet is shared out between the worker processes",
+        items=SHARD_MODES,
+        default=SHARD_BY_UNIVERSE,
+        update=_update_receiver
+    )
+    ingest_universes: bpy.props.IntProperty(
+        name="Universes",
+        description="Number of universes the worker processes receive, starting at universe 1",
+        default=64,
+        min=1,
+        max=4096,
+        update=_update_receiver
+    )
+
+    fixture_library: bpy.props.StringProperty(
+        name="Fixture Library",
+        description="Folder of fixture types as JSON or GDTF files. "
+                    "Changed files are compiled once and cached",
+        subtype='DIR_PATH',
+        update=_update_fixture_library
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "fixture_library")
+        layout.label(text="Blender Update Rate")
+        row = layout.row()
+        row.prop(self, "min_update_rate")
+        row.prop(self, "max_update_rate")
+        layout.label(text="Keyframes")
+        row = layout.row()
+        row.prop(self, "bulk_keyframes")
+        row.prop(self, "thin_keyframes")
+        layout.label(text="Network")
+        layout.prop(self, "receiver_backend")
+        if self.receiver_backend == 'ASYNCIO':
+            layout.prop(self, "listen_addresses")
+        elif self.receiver_backend == 'PROCESS':
+            row = layout.row()
+            row.prop(self, "ingest_workers")
+            row.prop(self, "ingest_universes")
+            layout.prop(self, "ingest_shard_by")
+            if self.ingest_workers > 1 and self.ingest_shard_by == SHARD_BY_UNIVERSE:
+                # unicast only reaches one of the workers sharing the port
+                layout.label(text="Universe Range needs broadcast ArtNet", icon='INFO')
+        layout.prop(self, "receive_buffer_kb")
+        layout.prop(self, "monitor_all_universes")
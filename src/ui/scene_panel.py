@@ -0,0 +1,66 @@
+import bpy
+
+from ..capture_timeline import CaptureTimeline, capture_key
+from ..globals import GLOBAL_DATA
+from .preferences import get_preferences, restart_receiver
+
+def apply_capture_timeline(scene):
+    """Drive the lights from the scene's capture, or from the network if it has none"""
+    synchroniser = GLOBAL_DATA.get("BlenderSynchroniser", None)
+    universes = GLOBAL_DATA.get("UniverseStore", None)
+    if synchroniser is None or universes is None:
+        # not set up yet, this runs again once it is
+        return
+    timeline = None
+    if scene.artnet_capture_path:
+        path = bpy.path.abspath(scene.artnet_capture_path)
+        current = synchroniser.timeline
+        try:
+            if current is not None and current.key == capture_key(
+                    path, scene.artnet_capture_timecode):
+                # unchanged since it was indexed, e.g. setup and load_post
+                # both running for a command line render
+                current.start_frame = scene.artnet_capture_start_frame
+                current.seek_frame(scene.frame_current,
+                                   scene.render.fps / scene.render.fps_base)
+                return
+            timeline = CaptureTimeline(universes, path,
+                                       scene.artnet_capture_timecode,
+                                       scene.artnet_capture_start_frame)
+        except (OSError, ValueError) as err:
+            print("error while loading capture", err)
+    if timeline is None:
+        if synchroniser.timeline is not None:
+            synchroniser.timeline = None
+            restart_receiver(get_preferences())
+        return
+    # the timeline takes over the universe store from the receiver
+    old = GLOBAL_DATA.get("ArtNetSocket", None)
+    if old is not None:
+        old.disconnect()
+        old.shutdown()
+    GLOBAL_DATA["ArtNetSocket"] = timeline
+    synchroniser.timeline = timeline
+    timeline.seek_frame(scene.frame_current, scene.render.fps / scene.render.fps_base)
+
+class SceneArtNetPanel(bpy.types.Panel):
+    bl_idname = "SCENE_PT_artnet_capture"
+    bl_label = "ArtNet Capture"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_context = "scene"
+
+    def draw(self, context):
+        scene = context.scene
+        layout = self.layout
+        layout.prop(scene, "artnet_capture_path")
+        if not scene.artnet_capture_path:
+            return
+        layout.prop(scene, "artnet_capture_timecode")
+        layout.prop(scene, "artnet_capture_start_frame")
+        synchroniser = GLOBAL_DATA.get("BlenderSynchroniser", None)
+        timeline = None if synchroniser is None else synchroniser.timeline
+        if timeline is not None:
+            fps = scene.render.fps / scene.render.fps_base
+            end_frame = timeline.start_frame + int(timeline.duration * fps)
+            layout.label(text="Capture runs to frame {}".format(end_frame))
@@ -1,54 +1,211 @@
 """Universe Store"""
 
-import threading
+import numpy
 
 ALL_UNIVERSES = -1
+CHANNELS_PER_UNIVERSE = 512
+MAX_UNIVERSE = 0x8000 # 15-bit Art-Net port-address, 1-based here
+
+ALL_CHANNELS = (1 << CHANNELS_PER_UNIVERSE) - 1 # dirty mask with every channel set
+
+_EMPTY_RAW = numpy.zeros(CHANNELS_PER_UNIVERSE, dtype=numpy.uint8)
+
+
+def channel_mask(channels):
+    """Returns a dirty mask with the given channels set"""
+    mask = 0
+    for channel in channels:
+        if 0 <= channel < CHANNELS_PER_UNIVERSE:
+            mask |= 1 << channel
+    return mask
+
+
+def changes_to_mask(changed):
+    """Returns a dirty mask from a numpy bool array of changed channels"""
+    # packbits is big-endian only on the numpy bundled with older Blenders,
+    # so pack the reversed array and drop the padding bits
+    packed = numpy.packbits(changed[::-1]).tobytes()
+    return int.from_bytes(packed, "big") >> (-len(changed) % 8)
+
+
+def mask_to_changes(changes):
+    """Returns a numpy bool array of the channels set in a dirty mask"""
+    # the reverse of changes_to_mask, unpacking big-endian for the same reason
+    packed = numpy.frombuffer(changes.to_bytes(CHANNELS_PER_UNIVERSE // 8, "big"),
+                              dtype=numpy.uint8)
+    return numpy.unpackbits(packed)[::-1].astype(bool)
+
+
+def channel_changed(changes, channel):
+    """Returns true if a channel is set in a dirty mask"""
+    return channel >= 0 and (changes >> channel) & 1 == 1
+
+
+class UniverseFrame:
+    """Immutable snapshot of one universe
+
+    Frames are never modified after they are published, so the main
+    thread can read a whole frame without seeing half of a packet.
+    """
+
+    __slots__ = ("index", "generation", "raw", "changes", "received", "_universe")
+
+    def __init__(self, index, generation, raw, changes, received=None):
+        raw.flags.writeable = False
+        self.index = index
+        self.generation = generation
+        self.raw = raw  # uint8 byte data 0-255
+        # dirty mask of channels changed since the main thread last read
+        # this universe, bit n is channel n
+        self.changes = changes
+        # perf_counter time the oldest unread change arrived, when tracing
+        self.received = received
+        self._universe = None
+
+    @property
+    def universe(self):
+        """Float 0-1 data, made from the raw bytes on first use"""
+        universe = self._universe
+        if universe is None:
+            universe = self.raw * numpy.float32(1 / 255.0)
+            universe.flags.writeable = False
+            self._universe = universe
+        return universe
+
 
 class UniverseStore:
-    """Stores universe data with thread locking"""
+    """Stores universe data without locking
+
+    One receive thread publishes new frames and the Blender main thread
+    consumes them. Publishing replaces the frame reference for a universe,
+    which is atomic, so neither side waits on the other. Universes are
+    keyed by their 1-based index (port-address + 1) and only exist once
+    data has arrived for them.
+    """
+
+    def __init__(self):
+        # universe index: latest frame
+        # only the receive thread changes this, and replaces the whole
+        # dict when a universe is added so readers never see it resize
+        self._frames = {}
+        # universe index: last generation applied by the main thread
+        self._consumed = {}
+        # universe index: changes requested by the main thread itself
+        self._forced = {}
+        # bumped on every publish so an idle tick is a single compare
+        self.generation = 0
+        self._consumed_generation = 0
+        # frozenset of universes the receiver parses, None for all of them
+        # replaced whole by the main thread, so the receive thread reads
+        # either the old set or the new one
+        self.subscribed = None
+        self._patched = None
+        self._monitor_all = False
+        # receiver polled on the main thread for new data before pending
+        # universes are read, e.g. worker processes in shared memory
+        self.external_source = None
 
-    UpdatesPending = {} # map of universe indices : list of updated channels
-    UpdatesLock = threading.Lock()
+    @property
+    def universe_ids(self):
+        """Returns the indices of universes that have data"""
+        return self._frames.keys()
 
-    _universes = []  # float data 0-1
-    _raw_universes = []  # byte data 0-255
+    def subscribe(self, universes):
+        """Only parse data for these universes, called from the main thread"""
+        self._patched = frozenset(universes)
+        self._update_subscription()
+
+    def set_monitor_all(self, monitor_all):
+        """Parse every universe whatever is subscribed, e.g. to see them all in the stats"""
+        self._monitor_all = monitor_all
+        self._update_subscription()
+
+    def _update_subscription(self):
+        if self._monitor_all:
+            self.subscribed = None
+        else:
+            self.subscribed = self._patched
+
+    def get_frame(self, index):
+        """Returns the latest frame for a universe"""
+        frame = self._frames.get(index, None)
+        if frame is None:
+            return self._empty_frame(index)
+        return frame
 
     def get_universe(self, index):
         """Returns a universe with float 0-1 values"""
-        self._ensure_universe_exists(index)
-        return self._universes[index]
+        return self.get_frame(index).universe
 
     def get_raw_universe(self, index):
         """Returns a universe with raw byte values"""
-        self._ensure_universe_exists(index)
-        return self._raw_universes[index]
+        return self.get_frame(index).raw
+
+    def publish_universe(self, index, raw, changes, received=None):
+        """Publish new data for a universe, called from the receive thread
+
+        raw must be a new array owned by the store from now on
+        changes is a dirty mask of the channels that differ from the last frame
+        received is the perf_counter time the data arrived, when tracing
+        """
+        frames = self._frames
+        previous = frames.get(index, None)
+        if previous is None:
+            generation = 1
+        else:
+            generation = previous.generation + 1
+            if self._consumed.get(index, 0) < previous.generation:
+                # the main thread hasn't seen the previous frame, so carry its changes
+                changes |= previous.changes
+                if previous.received is not None:
+                    # and it has been waiting since the older data arrived
+                    received = previous.received
+        frame = UniverseFrame(index, generation, raw, changes, received)
+        if previous is None:
+            if index < 0 or index > MAX_UNIVERSE:
+                raise IndexError("universe {} is not a valid Art-Net universe".format(index))
+            frames = dict(frames)
+            frames[index] = frame
+            self._frames = frames
+        else:
+            frames[index] = frame
+        self.generation += 1
 
     def notify_universe_change(self, index, changes):
-        """Threadsafe notify that a universe is dirty"""
-        with self.UpdatesLock:
-            if index == ALL_UNIVERSES:
-                for i in range(len(self._universes)):
-                    self.UpdatesPending[i] = range(0, 511)
-            else:
-                self.UpdatesPending[index] = changes
+        """Ask for channels to be reapplied, called from the main thread
+
+        changes is a dirty mask, merged with any that haven't been read yet
+        """
+        if index == ALL_UNIVERSES:
+            for i in self._frames:
+                self._forced[i] = ALL_CHANNELS
+        else:
+            self._forced[index] = self._forced.get(index, 0) | changes
 
     def get_pending_universes(self):
-        """Returns a list of universes that need to be synced to Blender"""
+        """Returns a map of universe index: (frame, dirty mask)
+        for universes that need to be synced to Blender"""
+        if self.external_source is not None:
+            self.external_source.poll()
         universes_pending = {}
-        with self.UpdatesLock:
-            for universe_index in self.UpdatesPending:
-                if self.UpdatesPending[universe_index] is not None:
-                    universes_pending[universe_index] = self.UpdatesPending[universe_index]
-                    self.UpdatesPending[universe_index] = None
+        generation = self.generation
+        if generation != self._consumed_generation:
+            self._consumed_generation = generation
+            for index, frame in self._frames.items():
+                if frame.generation != self._consumed.get(index, 0):
+                    self._consumed[index] = frame.generation
+                    universes_pending[index] = (frame, frame.changes)
+        if self._forced:
+            forced = self._forced
+            self._forced = {}
+            for index, changes in forced.items():
+                pending = universes_pending.get(index, None)
+                if pending is not None:
+                    changes |= pending[1]
+                universes_pending[index] = (self.get_frame(index), changes)
         return universes_pending
 
-    def _ensure_universe_exists(self, index):
-        while len(self._universes) <= index:
-            universe = []
-            for _ in range(512):
-                universe.append(0)
-            self._universes.append(universe)
-            raw_universe = []
-            for _ in range(512):
-                raw_universe.append(0)
-            self._raw_universes.append(raw_universe)
+    @staticmethod
+    def _empty_frame(index):
+        # universes that haven't received data yet read as all zeros
+        return UniverseFrame(index, 0, _EMPTY_RAW, 0)
@@ -0,0 +1,70 @@
+"""Update Scheduler"""
+
+DEFAULT_MIN_RATE = 10.0 # ticks per second when the desk is idle
+DEFAULT_MAX_RATE = 60.0 # ticks per second when data is flowing
+SMOOTHING = 0.2 # weight of the newest sample in the packet rate
+BACKOFF = 1.5 # interval growth per idle tick
+
+
+class UpdateScheduler:
+    """Picks the interval to the next synchroniser tick
+
+    Follows the rate at which new universe data arrives, ticking twice
+    per desk frame up to the maximum rate, and backs off towards the
+    minimum rate while nothing changes. Blender timers can't be woken
+    from the receive thread, so the first tick with new data after an
+    idle spell snaps straight back to the fast rate instead.
+    """
+
+    def __init__(self, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.packet_rate = 0.0 # smoothed frames per second, per universe
+        self.interval = self.min_interval
+        self._last_generation = 0
+        self._last_time = None
+        self._last_update_time = 0.0
+
+    @property
+    def min_interval(self):
+        """Shortest time between ticks"""
+        return 1.0 / max(self.max_rate, self.min_rate)
+
+    @property
+    def max_interval(self):
+        """Longest time between ticks"""
+        return 1.0 / self.min_rate
+
+    def set_rates(self, min_rate, max_rate):
+        """Change the tick rate limits, in ticks per second"""
+        self.min_rate = max(min_rate, 0.1)
+        self.max_rate = max(max_rate, self.min_rate)
+        self.interval = self._clamp(self.interval)
+
+    def next_interval(self, generation, universe_count, now):
+        """Returns the seconds until the next tick
+
+        generation is the universe store's publish count, universe_count
+        the number of universes that had new data this tick
+        """
+        updates = generation - self._last_generation
+        self._last_generation = generation
+        elapsed = self.interval if self._last_time is None else now - self._last_time
+        self._last_time = now
+        if elapsed > 0:
+            rate = updates / max(universe_count, 1) / elapsed
+            self.packet_rate += (rate - self.packet_rate) * SMOOTHING
+
+        if updates > 0:
+            self._last_update_time = now
+        quiet = now - self._last_update_time
+        if self.packet_rate > 0 and quiet < 2.0 / self.packet_rate:
+            # data is flowing, tick twice per frame from the desk
+            # so a frame waits at most half its period to be applied
+            self.interval = self._clamp(0.5 / self.packet_rate)
+        else:
+            self.interval = self._clamp(self.interval * BACKOFF)
+        return self.interval
+
+    def _clamp(self, interval):
+        return min(max(interval, self.min_interval), self.max_interval)
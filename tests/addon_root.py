@@ -0,0 +1,14 @@
+"""pytest plugin collecting the add-on's root as a plain directory
+
+The root's __init__.py registers the add-on with Blender, so it can't
+be imported the way pytest imports a package before its tests.
+"""
+
+import pytest
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collect_directory(path, parent):
+    if path == parent.config.rootpath:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
@@ -0,0 +1,111 @@
+"""Runs the add-on's modules against the benchmarks' fake bpy"""
+
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_bpy  # noqa: E402
+
+fake_bpy.install()
+
+import numpy  # noqa: E402
+import pytest  # noqa: E402
+
+import bpy  # noqa: E402
+from src.blender_sync import BlenderSynchroniser  # noqa: E402
+from src.fixture_store import FixtureStore  # noqa: E402
+from src.fixture_type_store import FixtureTypeStore  # noqa: E402
+from src.universe_store import UniverseStore, CHANNELS_PER_UNIVERSE, changes_to_mask  # noqa: E402
+
+
+# stands in for the scene in a depsgraph update, e.g. after objects are added or deleted
+SCENE = bpy.types.Scene()
+
+
+class Rig:
+    """A fixture store and synchroniser over the fake scene's objects"""
+
+    def __init__(self):
+        self.fixture_types = FixtureTypeStore()
+        self.universes = UniverseStore()
+        self.fixture_store = FixtureStore(self.fixture_types, self.universes)
+        self.synchroniser = BlenderSynchroniser(self.universes, self.fixture_store,
+                                                self.fixture_types)
+
+    def send(self, index, channels):
+        """Publish a universe with {channel: value} set, the rest as before"""
+        previous = self.universes.get_raw_universe(index)
+        raw = numpy.zeros(CHANNELS_PER_UNIVERSE, dtype=numpy.uint8) \
+            if previous is None else previous.copy()
+        for channel, value in channels.items():
+            raw[channel] = value
+        changed = raw != (numpy.zeros_like(raw) if previous is None else previous)
+        self.universes.publish_universe(index, raw, changes_to_mask(changed))
+
+    def update(self, *ids):
+        """Send a depsgraph update listing ids, SCENE for the scene"""
+        updates = [types.SimpleNamespace(id=types.SimpleNamespace(original=id_data))
+                   for id_data in ids]
+        self.synchroniser.depsgraph_update_post(bpy.context.scene,
+                                                types.SimpleNamespace(updates=updates))
+
+    def tick(self):
+        """Apply the pending universes, returns the fixtures updated"""
+        pending = self.universes.get_pending_universes()
+        return self.synchroniser._update_blender_from_universes(pending)
+
+
+def artdmx(universe, channels, sequence=0, length=CHANNELS_PER_UNIVERSE):
+    """An ArtDmx packet for a 1-based universe with {channel: value} set"""
+    port_address = universe - 1
+    payload = bytearray(length)
+    for channel, value in channels.items():
+        payload[channel] = value
+    return (b"Art-Net\x00" + bytes([0x00, 0x50, 0, 14, sequence, 0,
+                                    port_address & 0xff, port_address >> 8,
+                                    length >> 8, length & 0xff]) + bytes(payload))
+
+
+def add_light(name, universe=1, address=1, fixture_type="spot", light_type="SPOT",
+              parent=None):
+    """Add an ArtNet enabled light to the fake scene"""
+    data = fake_bpy.FakeLight(name, light_type, universe, address, fixture_type)
+    obj = fake_bpy.FakeObject(name, data, parent)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def add_empty(name, parent=None):
+    """Add an object that isn't a light, e.g. a pan/tilt target"""
+    obj = fake_bpy.FakeObject(name, None, parent)
+    obj.type = "EMPTY"
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+class FreedObject(fake_bpy.FakeObject):
+    """An object Blender has freed, any use of it raises ReferenceError"""
+
+    def __getattribute__(self, name):
+        raise ReferenceError("StructRNA of type Object has been removed")
+
+
+def free_object(obj):
+    """Delete an object the way a script does, before the depsgraph says so"""
+    bpy.context.scene.objects.remove(obj)
+    obj.__class__ = FreedObject
+
+
+@pytest.fixture
+def scene():
+    """An empty fake scene, without Auto Keyframing"""
+    scene = bpy.context.scene
+    scene.objects[:] = []
+    scene.frame_current = 1
+    scene.tool_settings.use_keyframe_insert_auto = False
+    bpy.data.actions[:] = []
+    return scene
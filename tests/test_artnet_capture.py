@@ -0,0 +1,76 @@
+"""Capturing ArtNet to a file and replaying it"""
+
+import numpy
+import pytest
+
+from conftest import artdmx
+
+from src.artnet_capture import CaptureReader, CaptureReplay, CaptureWriter, RECORD
+from src.artnet_receiver import ArtNetReceiver
+from src.universe_store import UniverseStore
+
+SENDER = ("10.0.0.1", 6454)
+
+
+def write_capture(path, packets):
+    writer = CaptureWriter(str(path))
+    for timestamp, packet in enumerate(packets):
+        writer.write(packet, float(timestamp))
+    writer.close()
+    return str(path)
+
+
+def test_packets_read_back_in_order(tmp_path):
+    packets = [artdmx(1, {0: 1}), artdmx(2, {5: 2}, length=24)]
+    reader = CaptureReader(write_capture(tmp_path / "show.artnetcap", packets))
+    try:
+        assert [(timestamp, bytes(packet)) for timestamp, _, packet in reader] \
+            == [(0.0, packets[0]), (1.0, packets[1])]
+    finally:
+        reader.close()
+
+
+def test_cut_off_capture_stops_at_the_last_whole_packet(tmp_path):
+    path = write_capture(tmp_path / "show.artnetcap", [artdmx(1, {0: 1}), artdmx(1, {0: 2})])
+    with open(path, "r+b") as capture_file:
+        capture_file.truncate(capture_file.seek(0, 2) - RECORD.size)
+    reader = CaptureReader(path)
+    try:
+        assert len(list(reader)) == 1
+    finally:
+        reader.close()
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        CaptureReader(str(path))
+
+
+def test_capture_keeps_unsubscribed_universes(tmp_path):
+    store = UniverseStore()
+    store.subscribe({1})
+    receiver = ArtNetReceiver(store)
+    receiver.start_capture(CaptureWriter(str(tmp_path / "show.artnetcap")), capture_only=True)
+    receiver.receive_packets([(artdmx(1, {0: 1}), SENDER), (artdmx(2, {0: 2}), SENDER)])
+    assert receiver.stop_capture() == 2
+    # capture_only leaves parsing to the replay
+    assert store.get_pending_universes() == {}
+
+
+def test_replay_rebuilds_the_universes(tmp_path):
+    path = write_capture(tmp_path / "show.artnetcap",
+                         [artdmx(1, {0: 1}, sequence=1), artdmx(1, {0: 2}, sequence=2),
+                          artdmx(3, {9: 3}, sequence=1)])
+    store = UniverseStore()
+    replay = CaptureReplay(store, path, realtime=False)
+    replay.replay()
+    assert store.get_raw_universe(1)[0] == 2
+    assert store.get_raw_universe(3)[9] == 3
+
+    # replaying again starts the sequence numbers again too
+    store.publish_universe(1, numpy.zeros(512, dtype=numpy.uint8), 1)
+    replay.replay()
+    replay.shutdown()
+    assert store.get_raw_universe(1)[0] == 2
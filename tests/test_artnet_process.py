@@ -0,0 +1,69 @@
+"""Worker processes sharing universes with Blender"""
+
+import io
+
+import numpy
+
+from src.artnet_process import ProcessIngest, subscription_line
+from src.ingest_worker import parse_subscription
+from src.universe_store import UniverseStore
+
+
+class Worker:
+    """Stands in for a worker process, keeping what it was sent"""
+
+    def __init__(self):
+        self.stdin = io.BytesIO()
+
+    def lines(self):
+        return self.stdin.getvalue().splitlines()
+
+
+def start_ingest(monkeypatch, store):
+    workers = []
+
+    def start_worker(self, first, count):
+        worker = Worker()
+        self._send(worker, subscription_line(self._worker_subscription))
+        workers.append(worker)
+        return worker
+
+    monkeypatch.setattr(ProcessIngest, "_start_worker", start_worker)
+    monkeypatch.setattr(ProcessIngest, "_stop_workers", lambda self: None)
+    return ProcessIngest(store, universe_count=4), workers
+
+
+def test_subscription_lines_round_trip():
+    assert parse_subscription(subscription_line(None)) is None
+    assert parse_subscription(subscription_line(frozenset())) == frozenset()
+    assert parse_subscription(subscription_line({3, 1})) == {1, 3}
+
+
+def test_workers_are_sent_the_subscription(monkeypatch):
+    store = UniverseStore()
+    store.subscribe({1})
+    ingest, workers = start_ingest(monkeypatch, store)
+    try:
+        store.subscribe({1, 2})
+        ingest.poll()
+        assert workers[0].lines() == [b"1", b"1,2"]
+    finally:
+        ingest.shutdown()
+
+
+def test_unsubscribed_slot_is_not_read_again(monkeypatch):
+    store = UniverseStore()
+    store.subscribe({1})
+    ingest, _ = start_ingest(monkeypatch, store)
+    try:
+        ingest.universes.write(2, numpy.full(512, 7, dtype=numpy.uint8), 0.0)
+        ingest.poll()
+        assert store.get_pending_universes() == {}
+        assert ingest._published_seq[1] == ingest.universes.seq[1]
+
+        # subscribing reads what the worker wrote before
+        store.subscribe({1, 2})
+        ingest.poll()
+        assert list(store.get_pending_universes()) == [2]
+    finally:
+        ingest.shutdown()
@@ -0,0 +1,156 @@
+"""Parsing ArtDmx packets into universe frames"""
+
+import socket
+import threading
+import time
+
+from conftest import artdmx
+
+from src.artnet_async import AsyncArtNetReceiver
+from src.artnet_receiver import (ArtNetReceiver, DROP_DUPLICATE, DROP_OPCODE, DROP_STALE,
+                                  DROP_TRUNCATED, SEQUENCE_WINDOW)
+from src.artnet_socket import ArtNetSocket
+from src.metrics import MetricsRegistry
+from src.universe_store import UniverseStore, channel_mask
+
+SENDER = ("10.0.0.1", 6454)
+
+
+def receive(receiver, *packets, address=SENDER):
+    receiver.receive_packets([(packet, address) for packet in packets])
+
+
+def reject(receiver, packet):
+    return receiver.reject_reason(packet, SENDER)
+
+
+def test_only_changed_channels_are_dirty():
+    store = UniverseStore()
+    receiver = ArtNetReceiver(store)
+    receive(receiver, artdmx(1, {0: 10, 5: 20}))
+    store.get_pending_universes()
+    receive(receiver, artdmx(1, {0: 10, 5: 21, 7: 1}))
+    (frame, changes), = store.get_pending_universes().values()
+    assert changes == channel_mask([5, 7])
+    assert frame.raw[5] == 21
+
+
+def test_unchanged_packet_publishes_nothing():
+    store = UniverseStore()
+    receiver = ArtNetReceiver(store)
+    receive(receiver, artdmx(1, {0: 10}))
+    store.get_pending_universes()
+    receive(receiver, artdmx(1, {0: 10}))
+    assert store.get_pending_universes() == {}
+
+
+def test_short_packet_leaves_later_channels():
+    store = UniverseStore()
+    receiver = ArtNetReceiver(store)
+    receive(receiver, artdmx(1, {0: 10, 300: 30}))
+    receive(receiver, artdmx(1, {0: 11}, length=100))
+    raw = store.get_raw_universe(1)
+    assert (raw[0], raw[300]) == (11, 30)
+
+
+
+class PairedSocket(ArtNetSocket):
+    """ArtNetSocket reading one end of a socket pair instead of the network"""
+
+    def __init__(self, universe_store):
+        self.metrics = MetricsRegistry()
+        super().__init__(universe_store)
+        # set after connecting, so no receive thread is started
+        self.sender, self._socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def connect(self):
+        return None
+
+    def close(self):
+        self.sender.close()
+        self.disconnect()
+
+
+def test_newest_queued_packet_per_universe_is_parsed():
+    store = UniverseStore()
+    receiver = PairedSocket(store)
+    try:
+        for value in (1, 2, 3):
+            receiver.sender.send(artdmx(1, {0: value}))
+        receiver.sender.send(artdmx(2, {0: 9}))
+        receiver.read_packet()
+    finally:
+        receiver.close()
+    metrics = receiver.metrics
+    assert metrics.counter("artnet.packets_received").value == 4
+    assert metrics.counter("artnet.packets_parsed").value == 2
+    assert store.get_raw_universe(1)[0] == 3
+    assert store.get_raw_universe(2)[0] == 9
+
+
+def test_shorter_newer_packet_keeps_the_older_ones_channels():
+    store = UniverseStore()
+    receiver = ArtNetReceiver(store)
+    receive(receiver, artdmx(1, {300: 30}), artdmx(1, {0: 1}, length=100))
+    raw = store.get_raw_universe(1)
+    assert (raw[0], raw[300]) == (1, 30)
+
+
+def test_async_receiver_parses_a_loop_iteration_as_one_batch():
+    store = UniverseStore()
+    receiver = AsyncArtNetReceiver(store, addresses=())
+    parsed = threading.Event()
+    parsed_before = receiver._packets_parsed.value
+
+    def datagrams_arrive():
+        for value in (1, 2):
+            receiver.queue_packet(artdmx(1, {0: value}), SENDER)
+        # runs after the batch is parsed
+        receiver._loop.call_soon(parsed.set)
+
+    receiver._loop.call_soon_threadsafe(datagrams_arrive)
+    assert parsed.wait(5)
+    started = time.perf_counter()
+    receiver.shutdown()
+    # the loop stops without waiting for a socket timeout
+    assert time.perf_counter() - started < 0.5
+    assert store.get_raw_universe(1)[0] == 2
+    assert receiver._packets_parsed.value == parsed_before + 1
+
+
+def test_sequence_window_wraps_past_255():
+    receiver = ArtNetReceiver(UniverseStore())
+    assert receiver.check_sequence(artdmx(1, {}, sequence=254), SENDER) is None
+    assert receiver.check_sequence(artdmx(1, {}, sequence=255), SENDER) is None
+    # 255 wraps to 1, 0 means unsequenced
+    assert receiver.check_sequence(artdmx(1, {}, sequence=1), SENDER) is None
+    assert receiver.check_sequence(artdmx(1, {}, sequence=1), SENDER) == DROP_DUPLICATE
+    assert receiver.check_sequence(artdmx(1, {}, sequence=250), SENDER) == DROP_STALE
+
+
+def test_far_behind_sequence_is_a_restart():
+    receiver = ArtNetReceiver(UniverseStore())
+    receiver.check_sequence(artdmx(1, {}, sequence=200), SENDER)
+    # more than SEQUENCE_WINDOW behind, the desk started again
+    assert receiver.check_sequence(artdmx(1, {}, sequence=200 - SEQUENCE_WINDOW - 1),
+                                   SENDER) is None
+
+
+def test_sequences_are_per_universe_and_sender():
+    receiver = ArtNetReceiver(UniverseStore())
+    receiver.check_sequence(artdmx(1, {}, sequence=10), SENDER)
+    assert receiver.check_sequence(artdmx(2, {}, sequence=5), SENDER) is None
+    assert receiver.check_sequence(artdmx(1, {}, sequence=5), ("10.0.0.2", 6454)) is None
+    assert receiver.check_sequence(artdmx(1, {}, sequence=0), SENDER) is None
+
+
+def test_stale_packet_is_dropped_before_parsing():
+    store = UniverseStore()
+    receiver = ArtNetReceiver(store)
+    receive(receiver, artdmx(1, {0: 2}, sequence=2))
+    receive(receiver, artdmx(1, {0: 1}, sequence=1))
+    assert store.get_raw_universe(1)[0] == 2
+    assert reject(receiver, artdmx(1, {0: 3}, sequence=2)) == DROP_DUPLICATE
+    assert reject(receiver, b"Art-Net\x00\x00\x20" + bytes(10)) == DROP_OPCODE
+    assert reject(receiver, artdmx(1, {})[:100]) == DROP_TRUNCATED
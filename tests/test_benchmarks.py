@@ -0,0 +1,26 @@
+"""The benchmarks still run and report in their stable format"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("options", [[], ["--instanced", "--keyframes"]])
+def test_rig_benchmark_reports_json(tmp_path, options):
+    output = tmp_path / "results.json"
+    subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "bench_rig.py"),
+                    "--fixtures", "4", "--universes", "3", "--frames", "5", "--warmup", "1",
+                    "--json", str(output)] + options,
+                   check=True, capture_output=True)
+    report = json.loads(output.read_text())
+    assert (report["benchmark"], report["version"]) == ("rig", 1)
+    result, = report["results"]
+    assert result["fixtures"] == 12
+    assert result["instanced"] == ("--instanced" in options)
+    assert result["tick"]["latency_ms"]["p50"] > 0
+    assert ("tick_keyframes_bulk" in result) == ("--keyframes" in options)
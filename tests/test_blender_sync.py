@@ -0,0 +1,74 @@
+"""Applying universes to lights, with lights deleted behind the store's back"""
+
+from conftest import Rig, add_light, free_object
+
+SPOT_DIMMER = 30
+WASH_DIMMER = 13
+
+
+def test_deleted_light_does_not_stop_the_others(scene):
+    first = add_light("first", address=1)
+    deleted = add_light("deleted", address=101)
+    last = add_light("last", address=201)
+    wash = add_light("wash", address=301, fixture_type="wash", light_type="POINT")
+    rig = Rig()
+    free_object(deleted)
+    rig.send(1, {SPOT_DIMMER: 255, 100 + SPOT_DIMMER: 255, 200 + SPOT_DIMMER: 255,
+                 300 + WASH_DIMMER: 255})
+    assert rig.tick() == 4
+    assert first.data.energy > 0
+    assert last.data.energy > 0
+    assert wash.data.energy > 0
+    # only the deleted light is dropped
+    assert len(rig.fixture_store._bindings) == 3
+
+
+def test_failed_universe_is_not_applied_again(scene):
+    add_light("first")
+    deleted = add_light("deleted", address=101)
+    rig = Rig()
+    free_object(deleted)
+    rig.send(1, {SPOT_DIMMER: 255, 100 + SPOT_DIMMER: 255})
+    rig.tick()
+    assert rig.universes.get_pending_universes() == {}
+
+
+def test_only_fixtures_with_dirty_channels_are_written(scene):
+    lights = [add_light("spot %d" % index, address=1 + 100 * index) for index in range(4)]
+    rig = Rig()
+    rig.send(1, {100 * index + SPOT_DIMMER: 255 for index in range(4)})
+    rig.tick()
+    for light in lights:
+        light.data.energy = 0
+
+    rig.send(1, {200 + SPOT_DIMMER: 128})
+    assert rig.tick() == 1
+    assert [light.data.energy > 0 for light in lights] == [False, False, True, False]
+
+
+def test_group_skips_universes_it_does_not_use(scene):
+    add_light("spot", universe=1)
+    rig = Rig()
+    group, = rig.fixture_store.get_groups()
+    assert group.uses(1, 1 << SPOT_DIMMER)
+    assert not group.uses(1, 1 << 400)
+    assert not group.uses(2, 1 << SPOT_DIMMER)
+
+
+def test_invisible_changes_are_not_written(scene):
+    cyan = 8
+    light = add_light("spot")
+    rig = Rig()
+    rig.synchroniser.write_epsilon["color"] = 0.01
+    rig.send(1, {cyan: 100})
+    rig.tick()
+    written = list(light.data.color)
+
+    rig.send(1, {cyan: 101})
+    rig.tick()
+    assert list(light.data.color) == written
+    assert rig.synchroniser.suppressed_writes == 1
+
+    rig.send(1, {cyan: 110})
+    rig.tick()
+    assert list(light.data.color) != written
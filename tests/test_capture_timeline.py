@@ -0,0 +1,89 @@
+"""Seeking to any moment of a capture"""
+
+import random
+
+import numpy
+import pytest
+
+from conftest import artdmx
+
+from src.artnet_capture import CaptureWriter
+from src.capture_timeline import CaptureTimeline, SNAPSHOT_PACKETS
+from src.universe_store import UniverseStore
+
+
+def timecode(seconds, frames=0, timecode_type=1):
+    """An ArtTimeCode packet, 25 fps by default"""
+    return (b"Art-Net\x00" + bytes([0x00, 0x97, 0, 14, 0, 0])
+            + bytes([frames, seconds % 60, seconds // 60 % 60, seconds // 3600, timecode_type]))
+
+
+def write_capture(path, records):
+    writer = CaptureWriter(str(path))
+    for timestamp, packet in records:
+        writer.write(packet, timestamp)
+    writer.close()
+    return str(path)
+
+
+def test_state_matches_replaying_every_packet(tmp_path):
+    rng = random.Random(3)
+    records = []
+    expected = [] # state after each packet
+    state = {}
+    for number in range(SNAPSHOT_PACKETS * 5 + 7):
+        universe = rng.randint(1, 3)
+        channels = {rng.randrange(512): rng.randrange(256) for _ in range(4)}
+        records.append((100 + number * 0.01, artdmx(universe, channels)))
+        # each packet carries the whole universe
+        raw = state[universe] = numpy.zeros(512, dtype=numpy.uint8)
+        for channel, value in channels.items():
+            raw[channel] = value
+        expected.append({index: raw.copy() for index, raw in state.items()})
+    timeline = CaptureTimeline(UniverseStore(), write_capture(tmp_path / "show.artnetcap", records))
+    try:
+        assert timeline.duration == pytest.approx((len(records) - 1) * 0.01)
+        # forwards and backwards, on and between snapshots
+        for number in (len(records) - 1, 0, SNAPSHOT_PACKETS, SNAPSHOT_PACKETS * 3 + 1, 5):
+            state_at = timeline.state_at(number * 0.01 + 0.001)
+            for index, raw in expected[number].items():
+                assert (state_at[index] == raw).all()
+    finally:
+        timeline.shutdown()
+
+
+def test_seek_frame_publishes_only_changes(tmp_path):
+    path = write_capture(tmp_path / "show.artnetcap",
+                         [(10.0, artdmx(1, {0: 1})), (11.0, artdmx(1, {0: 2, 1: 5}))])
+    store = UniverseStore()
+    timeline = CaptureTimeline(store, path, start_frame=1)
+    try:
+        timeline.seek_frame(1 + 25, fps=25)
+        store.get_pending_universes()
+        timeline.seek_frame(1, fps=25)
+        (frame, changes), = store.get_pending_universes().values()
+        assert changes == 0b11
+        assert list(frame.raw[:2]) == [1, 0]
+    finally:
+        timeline.shutdown()
+
+
+def test_timecode_decides_the_show_time(tmp_path):
+    path = write_capture(tmp_path / "show.artnetcap", [
+        (0.0, artdmx(1, {0: 9})), # before any timecode, the opening look
+        (5.0, timecode(60)),
+        (5.5, artdmx(1, {0: 1})), # 60.5s
+        (7.0, timecode(30)), # the desk went back
+        (7.25, artdmx(1, {0: 2})),
+    ])
+    timeline = CaptureTimeline(UniverseStore(), path, use_timecode=True)
+    try:
+        assert timeline.state_at(0)[1][0] == 9
+        assert timeline.state_at(60.4)[1][0] == 9
+        # a rewound timecode can't move packets before those already
+        # indexed, the last packet lands with the one before it
+        assert timeline.state_at(30.6)[1][0] == 9
+        assert timeline.state_at(60.5)[1][0] == 2
+        assert timeline.duration == pytest.approx(60.5)
+    finally:
+        timeline.shutdown()
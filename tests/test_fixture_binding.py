@@ -0,0 +1,49 @@
+"""Pan/tilt targets follow the light's parents as they are when written"""
+
+from conftest import Rig, add_empty, add_light
+
+from src.fixture_binding import FixtureBinding, resolve_rotation_target
+
+PAN = 0 # spot's pan channel
+X = 0 # rotation_euler axis of the "px" target
+
+
+def test_pan_target_is_depth_and_axis(scene):
+    parent = add_empty("truss")
+    light = add_light("spot", parent=parent)
+    light.data.artnet_pan_target = "px"
+    binding = FixtureBinding(light, Rig().fixture_types)
+    assert binding.pan_target == (1, X)
+    assert binding.parents == (parent.as_pointer(),)
+    assert resolve_rotation_target(light, binding.pan_target) == (parent, X)
+
+
+def test_reparented_light_rotates_its_new_parent(scene):
+    old_parent = add_empty("old truss")
+    new_parent = add_empty("new truss")
+    light = add_light("spot", parent=old_parent)
+    light.data.artnet_pan_target = "px"
+    rig = Rig()
+    rig.send(1, {PAN: 200})
+    rig.tick()
+    moved = old_parent.rotation_euler[X]
+    assert moved != 0
+
+    light.parent = new_parent
+    rig.send(1, {PAN: 10})
+    rig.tick()
+    assert new_parent.rotation_euler[X] != 0
+    assert old_parent.rotation_euler[X] == moved
+
+
+def test_light_without_the_targeted_parent_is_skipped(scene):
+    parent = add_empty("truss")
+    light = add_light("spot", parent=parent)
+    light.data.artnet_pan_target = "gpx"
+    other = add_light("other", address=101)
+    rig = Rig()
+    rig.send(1, {PAN: 200, 100: 200})
+    # no grandparent, so the pan is dropped without stopping the other light
+    assert rig.tick() == 2
+    assert parent.rotation_euler[X] == 0
+    assert other.rotation_euler[X] != 0
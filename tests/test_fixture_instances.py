@@ -0,0 +1,51 @@
+"""Identical fixtures written to a mesh's point attributes"""
+
+import bpy
+import fake_bpy
+
+from conftest import Rig
+
+from src.fixture_instances import add_instance_attributes
+
+SPOT_DIMMER = 30
+SPACING = 31 # the spot's highest channel offset is 30
+
+
+def add_instances(name, count, universe=1, address=1):
+    mesh = fake_bpy.FakeMesh(name, count, universe, address, "spot")
+    add_instance_attributes(mesh)
+    obj = fake_bpy.FakeObject(name, mesh)
+    bpy.context.scene.objects.append(obj)
+    return obj
+
+
+def test_instances_are_written_an_attribute_at_a_time(scene):
+    obj = add_instances("spots", 3)
+    rig = Rig()
+    rig.send(1, {SPACING + SPOT_DIMMER: 255})
+    assert rig.tick() == 3
+    energy = obj.data.attributes["artnet_energy"].data.values
+    assert energy[0] == 0 and energy[2] == 0
+    assert energy[1] > 0
+    # only the dimmer changed
+    assert not obj.data.attributes["artnet_pan"].data.values.any()
+
+
+def test_added_vertices_recompile_the_instances(scene):
+    obj = add_instances("spots", 2)
+    rig = Rig()
+    obj.data.vertices.append(None)
+    for attribute in list(obj.data.attributes.values()):
+        obj.data.attributes.remove(attribute)
+    add_instance_attributes(obj.data)
+    rig.update(obj)
+    rig.send(1, {2 * SPACING + SPOT_DIMMER: 255})
+    rig.tick()
+    assert obj.data.attributes["artnet_energy"].data.values[2] > 0
+
+
+def test_instances_are_patched_without_splitting_universes(scene):
+    # 16 spots fill universe 1 to channel 496, the 17th starts universe 2
+    add_instances("spots", 17)
+    rig = Rig()
+    assert rig.fixture_store.fixture_universe_ids == {1, 2}
@@ -0,0 +1,106 @@
+"""Fixture types from a library folder, compiled once and cached"""
+
+import io
+import json
+import math
+import os
+import zipfile
+
+import pytest
+
+from src import fixture_library
+from src.fixture_library import FixtureLibrary, parse_gdtf
+from src.fixture_type_store import FixtureTypeStore
+
+
+@pytest.fixture
+def folders(tmp_path):
+    library = tmp_path / "library"
+    cache = tmp_path / "cache"
+    library.mkdir()
+    cache.mkdir()
+    return library, cache
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Names of the files parsed, in order"""
+    files = []
+    parse_json = fixture_library.parse_json
+
+    def counting_parse_json(content):
+        files.append(json.loads(content)["_file"])
+        return {name: fixture_type for name, fixture_type in parse_json(content).items()
+                if name != "_file"}
+
+    monkeypatch.setitem(fixture_library.PARSERS, ".json", counting_parse_json)
+    return files
+
+
+def write_types(library, file_name, fixture_types, mtime=None):
+    path = library / file_name
+    path.write_text(json.dumps(dict(fixture_types, _file=file_name)))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_types_are_compiled_and_offered(folders, parsed):
+    library, cache = folders
+    write_types(library, "movers.json", {"mover": {"pan": 0, "panRange": 180},
+                                         "spot": {"dimmer": 0}})
+    store = FixtureTypeStore(FixtureLibrary(str(library), str(cache)))
+    assert "mover" in store.fixture_type_names
+    assert store.get_fixture_type("mover")["panRange"] == pytest.approx(math.pi)
+    # built-in types win when the names clash
+    assert store.get_fixture_type("spot")["dimmer"] == 30
+
+
+def test_unchanged_files_come_from_the_cache(folders, parsed):
+    library, cache = folders
+    write_types(library, "movers.json", {"mover": {"pan": 0}}, mtime=10**18)
+    FixtureLibrary(str(library), str(cache))
+    # touched but not changed
+    os.utime(library / "movers.json", ns=(2 * 10**18, 2 * 10**18))
+    again = FixtureLibrary(str(library), str(cache))
+    assert again.load("mover")[0]["pan"] == 0
+    assert parsed == ["movers.json"]
+
+
+def test_changed_file_is_compiled_again(folders, parsed):
+    library, cache = folders
+    write_types(library, "movers.json", {"mover": {"pan": 0}}, mtime=10**18)
+    FixtureLibrary(str(library), str(cache))
+    write_types(library, "movers.json", {"mover": {"pan": 4}}, mtime=2 * 10**18)
+    again = FixtureLibrary(str(library), str(cache))
+    assert again.load("mover")[0]["pan"] == 4
+    assert parsed == ["movers.json", "movers.json"]
+    # the first version's compiled types are no longer used
+    assert len([name for name in os.listdir(cache) if name.endswith(".pickle")]) == 1
+
+
+def test_missing_cache_is_compiled_again(folders, parsed):
+    library, cache = folders
+    write_types(library, "movers.json", {"mover": {"pan": 0}})
+    FixtureLibrary(str(library), str(cache))
+    again = FixtureLibrary(str(library), str(cache))
+    for name in os.listdir(cache):
+        if name.endswith(".pickle"):
+            os.remove(cache / name)
+    assert again.load("mover")[0]["pan"] == 0
+    assert parsed == ["movers.json", "movers.json"]
+
+
+def test_gdtf_modes_become_fixture_types():
+    description = """<GDTF><FixtureType Name="Beam">
+      <PhysicalDescriptions/>
+      <DMXModes><DMXMode Name="Std"><DMXChannels>
+        <DMXChannel Offset="1,2"><LogicalChannel Attribute="Pan">
+          <ChannelFunction PhysicalFrom="-270" PhysicalTo="270"/></LogicalChannel></DMXChannel>
+        <DMXChannel Offset="3"><LogicalChannel Attribute="Dimmer"/></DMXChannel>
+      </DMXChannels></DMXMode></DMXModes>
+    </FixtureType></GDTF>"""
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as archive:
+        archive.writestr("description.xml", description)
+    assert parse_gdtf(content.getvalue()) == {
+        "Beam@Std": {"pan": 0, "panFine": 1, "panRange": 540.0, "dimmer": 2}}
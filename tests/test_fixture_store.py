@@ -0,0 +1,83 @@
+"""The store follows the scene through depsgraph updates"""
+
+from conftest import SCENE, Rig, add_empty, add_light, artdmx
+
+from src.artnet_receiver import ArtNetReceiver, DROP_UNSUBSCRIBED
+
+PAN = 0 # spot's pan channel
+X = 0 # rotation_euler axis of the "px" target
+SENDER = ("10.0.0.1", 6454)
+
+
+def test_delete_and_add_in_one_update(scene):
+    deleted = add_light("deleted")
+    rig = Rig()
+    scene.objects.remove(deleted)
+    added = add_light("added", address=101)
+    # the scene has as many objects as before
+    rig.update(SCENE, added)
+    assert list(rig.fixture_store._bindings) == [added.as_pointer()]
+
+
+def test_reparent_recompiles_the_light(scene):
+    old_parent = add_empty("old truss")
+    new_parent = add_empty("new truss")
+    light = add_light("spot", parent=old_parent)
+    light.data.artnet_pan_target = "px"
+    rig = Rig()
+    rig.send(1, {PAN: 200})
+    rig.tick()
+
+    light.parent = new_parent
+    rig.update(light)
+    binding = rig.fixture_store._bindings[light.as_pointer()]
+    assert binding.parents == (new_parent.as_pointer(),)
+    # the new parent is sent the current pan without it changing
+    rig.tick()
+    assert new_parent.rotation_euler[X] == old_parent.rotation_euler[X] != 0
+
+
+def test_parent_moved_under_another_parent(scene):
+    old_truss = add_empty("old truss")
+    new_truss = add_empty("new truss")
+    yoke = add_empty("yoke", parent=old_truss)
+    light = add_light("spot", parent=yoke)
+    light.data.artnet_pan_target = "gpx"
+    rig = Rig()
+    rig.send(1, {PAN: 200})
+    rig.tick()
+
+    # only the yoke is in the update, not the light
+    yoke.parent = new_truss
+    rig.update(yoke)
+    rig.tick()
+    assert new_truss.rotation_euler[X] == old_truss.rotation_euler[X] != 0
+
+
+def test_deleted_parent(scene):
+    parent = add_empty("truss")
+    light = add_light("spot", parent=parent)
+    light.data.artnet_pan_target = "px"
+    rig = Rig()
+    scene.objects.remove(parent)
+    light.parent = None
+    rig.update(SCENE)
+    binding = rig.fixture_store._bindings[light.as_pointer()]
+    assert binding.parents == ()
+    rig.send(1, {PAN: 200})
+    assert rig.tick() == 1
+
+
+def test_receiver_only_parses_patched_universes(scene):
+    light = add_light("spot", universe=2)
+    rig = Rig()
+    assert rig.universes.subscribed == {2}
+    receiver = ArtNetReceiver(rig.universes)
+    assert receiver.reject_reason(artdmx(1, {}), SENDER) == DROP_UNSUBSCRIBED
+    assert receiver.reject_reason(artdmx(2, {}), SENDER) is None
+
+    light.data.artnet_universe = 3
+    rig.fixture_store.update_object(light)
+    assert rig.universes.subscribed == {3}
+    rig.universes.set_monitor_all(True)
+    assert rig.universes.subscribed is None
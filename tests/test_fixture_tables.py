@@ -0,0 +1,58 @@
+"""DMX to Blender values through the fixture type's tables"""
+
+import math
+
+import numpy
+import pytest
+
+from src.fixture_group import decode_table, COLOR_DECODERS
+from src.fixture_tables import FixtureTables, wheel_table
+from src.fixture_type_store import compile_fixture_type
+
+
+def dmx(*rows):
+    return numpy.array(rows, dtype=numpy.uint8)
+
+
+def test_wheel_slots_start_at_their_dmx_value():
+    table = wheel_table({10: [1, 0, 0], 20: [0, 0, 1]})
+    assert table.shape == (256, 3)
+    # below the first slot shows the first color
+    assert decode_table(dmx([0], [19], [20], [255]), table).tolist() \
+        == [[1, 0, 0], [1, 0, 0], [0, 0, 1], [0, 0, 1]]
+
+
+def test_pan_is_centred_and_16_bit_with_a_fine_channel():
+    fixture_type, _, tables = compile_fixture_type({"pan": 0, "panFine": 1, "panRange": 540})
+    assert len(tables.pan) == 65536
+    pan = decode_table(dmx([0, 0], [128, 0], [255, 255]), tables.pan)
+    assert pan[0] == pytest.approx(-math.radians(270))
+    assert pan[1] == pytest.approx(0, abs=0.01)
+    assert pan[2] == pytest.approx(math.radians(270))
+    assert fixture_type["panRange"] == pytest.approx(math.radians(540))
+
+
+def test_zoom_can_be_inverted():
+    tables = FixtureTables({"minZoom": 0.2, "maxZoom": 0.8, "zoom_invert": True})
+    assert len(tables.zoom) == 256
+    assert list(decode_table(dmx([0], [255]), tables.zoom)) == pytest.approx([0.8, 0.2])
+
+
+def test_dimmer_scales_to_the_fixture_lumens():
+    bright = FixtureTables({"lumens": 20000})
+    dim = FixtureTables({"lumens": 10000})
+    assert bright.dimmer[0] == 0
+    assert bright.dimmer[255] == pytest.approx(2 * dim.dimmer[255])
+
+
+def test_tables_are_shared_read_only():
+    tables = FixtureTables({"lumens": 1000})
+    with pytest.raises(ValueError):
+        tables.dimmer[0] = 1
+
+
+def test_color_decoders():
+    rgbw = COLOR_DECODERS["rgbw"](dmx([255, 0, 0, 0], [0, 0, 0, 255]).astype(numpy.float32), None)
+    assert rgbw == pytest.approx(numpy.array([[0.75, 0, 0], [0.25, 0.25, 0.25]]))
+    cmy = COLOR_DECODERS["cmy"](dmx([255, 0, 0]), None)
+    assert cmy == pytest.approx(numpy.array([[0, 1, 1]]))
@@ -0,0 +1,50 @@
+"""Recorded takes written to fcurves"""
+
+import bpy
+
+from conftest import add_light
+
+from src.keyframe_recorder import KeyframeRecorder
+
+
+def record_take(light, values, first_frame=1):
+    recorder = KeyframeRecorder()
+    for frame, value in enumerate(values, first_frame):
+        recorder.record(light.data, "energy", frame, value)
+    recorder.flush()
+
+
+def keys(light):
+    fcurve = light.data.animation_data.action.fcurves.find("energy")
+    return fcurve.keyframe_points.co.reshape(-1, 2).tolist()
+
+
+def test_thinning_keeps_the_ends_of_runs(scene):
+    light = add_light("spot")
+    record_take(light, [1, 1, 1, 5, 5, 5, 5, 2])
+    assert keys(light) == [[1, 1], [3, 1], [4, 5], [7, 5], [8, 2]]
+
+
+def test_later_sample_for_a_frame_wins(scene):
+    light = add_light("spot")
+    recorder = KeyframeRecorder()
+    recorder.record(light.data, "energy", 1, 3)
+    recorder.record(light.data, "energy", 1, 4)
+    recorder.flush()
+    assert keys(light) == [[1, 4]]
+
+
+def test_flat_take_replaces_a_ramp(scene):
+    light = add_light("spot")
+    record_take(light, range(1, 11))
+    record_take(light, [5] * 10)
+    assert keys(light) == [[1, 5], [10, 5]]
+
+
+def test_keys_outside_the_take_are_kept(scene):
+    light = add_light("spot")
+    record_take(light, range(1, 11))
+    record_take(light, [5] * 4, first_frame=4)
+    assert keys(light) == [[1, 1], [2, 2], [3, 3], [4, 5], [7, 5],
+                           [8, 8], [9, 9], [10, 10]]
+    assert len(bpy.data.actions) == 1
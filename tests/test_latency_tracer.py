@@ -0,0 +1,48 @@
+"""Latency spans from the socket to Blender"""
+
+import json
+
+from conftest import Rig, add_light, artdmx
+
+from src.artnet_receiver import ArtNetReceiver
+from src.latency_tracer import LatencyTracer, TRACK_MAIN, TRACK_RECEIVE, TRACK_WAIT
+
+
+def test_spans_follow_a_packet_to_the_lights(scene, tmp_path):
+    add_light("spot")
+    rig = Rig()
+    tracer = LatencyTracer()
+    receiver = ArtNetReceiver(rig.universes)
+    receiver.tracer = rig.synchroniser.tracer = tracer
+    tracer.start()
+    receiver.receive_packets([(artdmx(1, {30: 255}), ("10.0.0.1", 6454))])
+    rig.synchroniser._update_blender()
+    tracer.stop()
+
+    path = tmp_path / "trace.json"
+    tracer.export(str(path))
+    spans = [(event["name"], event["tid"]) for event in json.loads(path.read_text())["traceEvents"]
+             if event["ph"] == "X"]
+    assert spans == [("parse", TRACK_RECEIVE), ("wait for tick", TRACK_WAIT),
+                     ("apply", TRACK_MAIN), ("tick", TRACK_MAIN)]
+
+
+def test_nothing_is_recorded_when_stopped(scene):
+    add_light("spot")
+    rig = Rig()
+    tracer = LatencyTracer()
+    receiver = ArtNetReceiver(rig.universes)
+    receiver.tracer = rig.synchroniser.tracer = tracer
+    receiver.receive_packets([(artdmx(1, {30: 255}), ("10.0.0.1", 6454))])
+    rig.synchroniser._update_blender()
+    assert tracer.event_count == 0
+    # and frames don't carry a receive time
+    assert rig.universes.get_frame(1).received is None
+
+
+def test_oldest_spans_are_dropped():
+    tracer = LatencyTracer(max_events=2)
+    for start in range(3):
+        tracer.span("tick", TRACK_MAIN, start, start + 1)
+    assert [event["ts"] for event in tracer.chrome_trace()["traceEvents"]
+            if event["ph"] == "X"] == [1e6, 2e6]
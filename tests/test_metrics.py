@@ -0,0 +1,50 @@
+"""Counters, gauges and histograms in the metrics registry"""
+
+import json
+
+from src.metrics import MetricsRegistry
+
+
+def test_metrics_are_created_once():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("packets", "Packets")
+    counter.add(3)
+    assert metrics.counter("packets") is counter
+    assert metrics.snapshot()["counters"]["packets"]["value"] == 3
+
+
+def test_histogram_quantiles_are_bucket_bounds():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram("tick", bounds=(1, 2, 5))
+    for value in (0.5, 0.5, 1.5, 4, 9):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.5) == 2
+    # beyond the last bound
+    assert histogram.quantile(1.0) is None
+    assert histogram.mean == 3.1
+
+
+def test_rates_come_from_samples(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("src.metrics.time.monotonic", lambda: clock[0])
+    metrics = MetricsRegistry()
+    counter = metrics.counter("packets")
+    counter.add(50)
+    clock[0] += 2
+    metrics.sample()
+    counter.add(10)
+    # reading doesn't change the rate until the next sample
+    assert metrics.snapshot()["counters"]["packets"]["rate"] == 25
+
+
+def test_reset_and_export(tmp_path):
+    metrics = MetricsRegistry()
+    metrics.counter("packets").add(4)
+    metrics.gauge("universes").set(2)
+    metrics.reset()
+    path = tmp_path / "metrics.json"
+    metrics.export(str(path))
+    snapshot = json.loads(path.read_text())
+    assert snapshot["counters"]["packets"] == {"value": 0, "rate": 0.0}
+    assert snapshot["gauges"]["universes"] == 0
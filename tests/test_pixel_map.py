@@ -0,0 +1,75 @@
+"""LED pixels written to an image through a mesh's pixel map"""
+
+import types
+
+import numpy
+
+from src.pixel_map import PixelMap, grid_elements, packed_addresses
+from src.universe_store import CHANNELS_PER_UNIVERSE
+
+
+class Image:
+    """An RGBA image, pixels set in bulk"""
+
+    def __init__(self, width, height):
+        self.size = [width, height]
+        self.channels = 4
+        self.pixels = types.SimpleNamespace(foreach_set=self._set)
+        self.written = None
+
+    def _set(self, values):
+        self.written = numpy.array(values).reshape(self.size[1], self.size[0], 4)
+
+    def update(self):
+        pass
+
+
+def pixel_map(image, width=2, height=2, order="RGB", universe=1, base_address=1):
+    data = types.SimpleNamespace(
+        artnet_pixel_target='IMAGE', artnet_pixel_attribute="", artnet_pixel_image=image,
+        artnet_pixel_width=width, artnet_pixel_height=height, artnet_pixel_order=order,
+        artnet_pixel_start='BOTTOM_LEFT', artnet_pixel_serpentine=False,
+        artnet_universe=universe, artnet_base_address=base_address)
+    obj = types.SimpleNamespace(name="wall", data=data, as_pointer=lambda: 1)
+    slots = {}
+    return PixelMap(obj, lambda index: slots.setdefault(index, len(slots) + 1)), slots
+
+
+def staged(slots, universes):
+    raw = numpy.zeros((len(slots) + 1, CHANNELS_PER_UNIVERSE), dtype=numpy.uint8)
+    for index, channels in universes.items():
+        for channel, value in channels.items():
+            raw[slots[index], channel] = value
+    return raw, raw != 0
+
+
+def test_serpentine_rows_come_back():
+    # 3 wide, from the top left, rows counted from the bottom
+    assert grid_elements(3, 2, 'TOP_LEFT', True).tolist() == [3, 4, 5, 2, 1, 0]
+
+
+def test_pixels_are_not_split_between_universes():
+    universes, channels = packed_addresses(3, 1, 508, 3)
+    assert universes.tolist() == [1, 2, 2]
+    assert channels.tolist() == [507, 0, 3]
+
+
+def test_pixels_are_written_to_the_image():
+    image = Image(2, 2)
+    pixels, slots = pixel_map(image, order="GRB")
+    # first pixel green, last pixel blue
+    raw, changes = staged(slots, {1: {0: 255, 11: 255}})
+    assert pixels.uses(1, 1 << 11)
+    assert pixels.apply(raw, changes) == 1
+    assert image.written[0, 0].tolist() == [0, 1, 0, 1]
+    assert image.written[1, 1].tolist() == [0, 0, 1, 1]
+
+
+def test_resized_image_is_left_alone():
+    image = Image(2, 2)
+    pixels, slots = pixel_map(image)
+    image.size = [4, 4]
+    assert pixels.needs_rebuild()
+    raw, changes = staged(slots, {1: {0: 255}})
+    assert pixels.apply(raw, changes) == 0
+    assert image.written is None and image.size == [4, 4]
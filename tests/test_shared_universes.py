@@ -0,0 +1,52 @@
+"""Universes shared between the workers and Blender"""
+
+import numpy
+import pytest
+
+from src.shared_universes import SharedUniverses, is_available
+
+pytestmark = pytest.mark.skipif(not is_available(), reason="needs multiprocessing.shared_memory")
+
+
+@pytest.fixture
+def universes():
+    universes = SharedUniverses.create(5, 4)
+    yield universes
+    universes.close()
+
+
+def test_worker_writes_are_read_by_blender(universes):
+    worker = SharedUniverses.attach(universes.name)
+    try:
+        assert (worker.first, worker.count) == (5, 4)
+        assert worker.write(6, numpy.full(10, 3, dtype=numpy.uint8), 1.5)
+        # even once written
+        assert universes.seq[1] == 2
+        raw, received = universes.read(1, universes.seq[1])
+        assert list(raw[:11]) == [3] * 10 + [0]
+        assert received == 1.5
+    finally:
+        worker.close()
+
+
+def test_only_changes_bump_the_counter(universes):
+    payload = numpy.full(512, 7, dtype=numpy.uint8)
+    assert universes.write(5, payload, 0.0)
+    assert not universes.write(5, payload, 0.0)
+    assert universes.seq[0] == 2
+    # outside the block's range
+    assert not universes.write(9, payload, 0.0)
+    assert not universes.write(4, payload, 0.0)
+
+
+def test_read_torn_by_a_write_is_refused(universes):
+    universes.write(5, numpy.full(512, 1, dtype=numpy.uint8), 0.0)
+    seen = universes.seq[0]
+    universes.write(5, numpy.full(512, 2, dtype=numpy.uint8), 0.0)
+    assert universes.read(0, seen) is None
+
+
+def test_other_blocks_are_refused(universes):
+    universes.block.buf[:8] = b"\0" * 8
+    with pytest.raises(ValueError):
+        SharedUniverses.attach(universes.name)
@@ -0,0 +1,78 @@
+"""Universes published by the receive thread and read by the main thread"""
+
+import numpy
+import pytest
+
+from src.universe_store import (UniverseStore, CHANNELS_PER_UNIVERSE, MAX_UNIVERSE,
+                                channel_mask, changes_to_mask, mask_to_changes)
+
+
+def frame_of(value):
+    return numpy.full(CHANNELS_PER_UNIVERSE, value, dtype=numpy.uint8)
+
+
+def test_universes_exist_once_data_arrives():
+    store = UniverseStore()
+    assert list(store.universe_ids) == []
+    assert not store.get_raw_universe(7).any()
+    store.publish_universe(7, frame_of(1), 1)
+    assert list(store.universe_ids) == [7]
+    assert store.get_raw_universe(7)[0] == 1
+
+
+def test_universe_outside_art_net_is_refused():
+    store = UniverseStore()
+    with pytest.raises(IndexError):
+        store.publish_universe(MAX_UNIVERSE + 1, frame_of(1), 1)
+
+
+def test_published_frames_are_read_only_snapshots():
+    store = UniverseStore()
+    store.publish_universe(1, frame_of(1), 1)
+    (frame, _), = store.get_pending_universes().values()
+    with pytest.raises(ValueError):
+        frame.raw[0] = 2
+    store.publish_universe(1, frame_of(2), 1)
+    # the frame the main thread holds doesn't change under it
+    assert frame.raw[0] == 1
+    assert store.get_raw_universe(1)[0] == 2
+
+
+def test_idle_store_has_nothing_pending():
+    store = UniverseStore()
+    store.publish_universe(1, frame_of(1), 1)
+    store.get_pending_universes()
+    assert store.get_pending_universes() == {}
+
+
+def test_unread_changes_are_merged():
+    store = UniverseStore()
+    store.publish_universe(1, frame_of(1), channel_mask([0]))
+    store.publish_universe(1, frame_of(1), channel_mask([3]))
+    (frame, changes), = store.get_pending_universes().values()
+    assert changes == channel_mask([0, 3])
+
+    # read changes aren't carried into the next frame
+    store.publish_universe(1, frame_of(1), channel_mask([5]))
+    (_, changes), = store.get_pending_universes().values()
+    assert changes == channel_mask([5])
+
+
+def test_notified_changes_join_received_ones():
+    store = UniverseStore()
+    store.publish_universe(1, frame_of(1), channel_mask([0]))
+    store.notify_universe_change(1, channel_mask([9]))
+    store.notify_universe_change(2, channel_mask([1]))
+    pending = store.get_pending_universes()
+    assert pending[1][1] == channel_mask([0, 9])
+    # universes without data are applied as zeros
+    assert pending[2][1] == channel_mask([1])
+    assert not pending[2][0].raw.any()
+
+
+def test_mask_and_changes_round_trip():
+    changed = numpy.zeros(CHANNELS_PER_UNIVERSE, dtype=bool)
+    changed[[0, 8, 511]] = True
+    mask = changes_to_mask(changed)
+    assert mask == channel_mask([0, 8, 511])
+    assert (mask_to_changes(mask) == changed).all()
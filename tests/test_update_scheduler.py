@@ -0,0 +1,43 @@
+"""Tick intervals following the desk's frame rate"""
+
+import pytest
+
+from src.update_scheduler import UpdateScheduler
+
+
+def run(scheduler, desk_rate, seconds, now=0.0, universes=1):
+    """Tick the scheduler while a desk sends at desk_rate, returns the time"""
+    start = now
+    first_generation = scheduler._last_generation
+    while now < start + seconds:
+        now += scheduler.interval
+        # every frame the desk sent since start
+        generation = first_generation + int(desk_rate * (now - start)) * universes
+        scheduler.next_interval(generation, universes, now)
+    return now
+
+
+def test_ticks_twice_per_desk_frame():
+    scheduler = UpdateScheduler(min_rate=10, max_rate=100)
+    run(scheduler, desk_rate=20, seconds=5)
+    assert scheduler.interval == pytest.approx(1 / 40, rel=0.1)
+
+
+def test_fastest_tick_is_the_max_rate():
+    scheduler = UpdateScheduler(min_rate=10, max_rate=60)
+    run(scheduler, desk_rate=44, seconds=5)
+    assert scheduler.interval == pytest.approx(1 / 60)
+
+
+def test_idle_backs_off_to_the_min_rate():
+    scheduler = UpdateScheduler(min_rate=10, max_rate=60)
+    now = run(scheduler, desk_rate=30, seconds=2)
+    run(scheduler, desk_rate=0, seconds=5, now=now)
+    assert scheduler.interval == pytest.approx(1 / 10)
+
+
+def test_rates_are_kept_in_order():
+    scheduler = UpdateScheduler()
+    scheduler.set_rates(30, 5)
+    assert scheduler.max_rate == 30
+    assert scheduler.min_interval == scheduler.max_interval == pytest.approx(1 / 30)